@@ -0,0 +1,21 @@
+const API_BASE = 'http://localhost:5000';
+
+// Stored alternatives for a generic or brand name (case-insensitive).
+// Resolves with { drug, alternatives, generics }.
+export const getAlternatives = async (name) => {
+  const response = await fetch(`${API_BASE}/get-alternatives/${encodeURIComponent(name)}`);
+  if (!response.ok) {
+    throw new Error(`HTTP error! Status: ${response.status}`);
+  }
+  return response.json();
+};
+
+// Type-ahead over generic and brand names; resolves with [{ name, type, generics }].
+export const searchDrugs = async (query, limit = 8, signal) => {
+  const params = new URLSearchParams({ q: query, limit: String(limit) });
+  const response = await fetch(`${API_BASE}/search-alternatives?${params}`, { signal });
+  if (!response.ok) {
+    throw new Error(`HTTP error! Status: ${response.status}`);
+  }
+  return (await response.json()).results;
+};
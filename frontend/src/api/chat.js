@@ -0,0 +1,39 @@
+const API_BASE = 'http://localhost:5000';
+
+// Sends a chat message and streams the reply. onToken receives each chunk of
+// text as it arrives; resolves with { text, history, session_id } when done.
+export const streamChat = async ({ chat, sessionId, history }, onToken = () => {}) => {
+  const response = await fetch(`${API_BASE}/chat-gemini`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify({ chat, session_id: sessionId, history, stream: true }),
+  });
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.error || 'Failed to process chat request');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = block.match(/^data: (.*)$/m)?.[1];
+      if (!data) continue;
+      const payload = JSON.parse(data);
+      if (event === 'token') onToken(payload.text);
+      if (event === 'done') return payload;
+      if (event === 'failed') throw new Error(payload.error);
+    }
+  }
+  throw new Error('Chat stream ended unexpectedly');
+};
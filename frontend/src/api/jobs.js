@@ -0,0 +1,52 @@
+const API_BASE = 'http://localhost:5000';
+
+// Waits for a background /upload job to finish. Stage results are passed to
+// onStage as they arrive (e.g. OCR text before the AI analysis is ready).
+export const waitForJob = (jobId, onStage = () => {}) =>
+  new Promise((resolve, reject) => {
+    const source = new EventSource(`${API_BASE}/jobs/${jobId}/events`);
+
+    source.addEventListener('stage', (event) => {
+      const { stage, result } = JSON.parse(event.data);
+      onStage(stage, result);
+    });
+
+    source.addEventListener('done', (event) => {
+      source.close();
+      resolve(JSON.parse(event.data));
+    });
+
+    source.addEventListener('failed', (event) => {
+      source.close();
+      reject(new Error(JSON.parse(event.data).error || 'Failed to process file'));
+    });
+
+    // Fall back to polling if the event stream drops
+    source.onerror = () => {
+      source.close();
+      pollJob(jobId).then(resolve, reject);
+    };
+  });
+
+const pollJob = async (jobId, interval = 1000) => {
+  for (;;) {
+    const response = await fetch(`${API_BASE}/jobs/${jobId}`);
+    if (!response.ok) throw new Error('Failed to fetch job status');
+    const job = await response.json();
+    if (job.status === 'done') return job.result;
+    if (job.status === 'failed') throw new Error(job.error || 'Failed to process file');
+    await new Promise((r) => setTimeout(r, interval));
+  }
+};
+
+// Uploads a prescription and resolves with the full analysis once the job completes.
+export const uploadPrescription = async (file, onStage) => {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await fetch(`${API_BASE}/upload`, { method: 'POST', body: formData });
+  const data = await response.json();
+  if (!response.ok) throw new Error(data.error || 'Failed to upload prescription');
+
+  return waitForJob(data.job_id, onStage);
+};
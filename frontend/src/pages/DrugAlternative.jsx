@@ -1,12 +1,16 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
-import { CircleSlash, ArrowDown, Pill, AlertCircle, AlertTriangle, DollarSign } from 'lucide-react';
+import { CircleSlash, ArrowDown, Pill, AlertCircle, AlertTriangle, DollarSign, Search } from 'lucide-react';
+import { getAlternatives, searchDrugs } from '../api/alternatives';
 
 const DrugAlternatives = ({ currentMedications }) => {
   const [alternatives, setAlternatives] = useState({});
   const [loading, setLoading] = useState({});
   const [expanded, setExpanded] = useState({});
   const [error, setError] = useState(null);
+  const [query, setQuery] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
+  const [selected, setSelected] = useState(null);
 
   // Function to fetch drug alternatives from backend API
   const fetchAlternatives = async (medication) => {
@@ -15,16 +19,28 @@ const DrugAlternatives = ({ currentMedications }) => {
     setLoading(prev => ({ ...prev, [medication.id]: true }));
     
     try {
-      // Call your Flask backend endpoint
-      const response = await axios.post('http://localhost:5000/find-alternatives', {
-        drugs: [medication.name]
-      });
-      
-      if (!response.data || !response.data.alternatives) {
-        throw new Error("Invalid response format from API");
+      // Stored alternatives come straight from the backend index; RxNav is only asked on a miss
+      let alternatives = [];
+      try {
+        alternatives = (await getAlternatives(medication.name)).alternatives;
+      } catch (lookupError) {
+        console.error(`Stored alternatives lookup failed for ${medication.name}:`, lookupError);
+      }
+
+      if (alternatives.length === 0) {
+        const response = await axios.post('http://localhost:5000/find-alternatives', {
+          drugs: [medication.name]
+        });
+
+        if (!response.data || !response.data.alternatives) {
+          throw new Error("Invalid response format from API");
+        }
+
+        // Keys keep the spelling they were stored with, so match case-insensitively
+        const key = Object.keys(response.data.alternatives)
+          .find(name => name.toLowerCase() === medication.name.toLowerCase());
+        alternatives = key ? response.data.alternatives[key] : [];
       }
-      
-      const alternatives = response.data.alternatives[medication.name.toLowerCase()] || [];
       
       // For each alternative, fetch additional details if needed
       const enhancedAlternatives = alternatives.map(altName => {
@@ -112,6 +128,36 @@ const DrugAlternatives = ({ currentMedications }) => {
     }
   }, [currentMedications]);
 
+  // Type-ahead: ask the backend once typing pauses, cancelling stale requests
+  useEffect(() => {
+    if (query.trim().length < 2) {
+      setSuggestions([]);
+      return undefined;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      searchDrugs(query.trim(), 8, controller.signal)
+        .then(setSuggestions)
+        .catch(searchError => {
+          if (searchError.name !== 'AbortError') console.error('Error searching drugs:', searchError);
+        });
+    }, 200);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query]);
+
+  const selectSuggestion = async (suggestion) => {
+    setQuery(suggestion.name);
+    setSuggestions([]);
+    try {
+      setSelected(await getAlternatives(suggestion.name));
+    } catch (lookupError) {
+      setError(`Failed to fetch alternatives: ${lookupError.message}`);
+    }
+  };
+
   // Get the status indicator color
   const getInteractionRiskColor = (risk) => {
     switch (risk?.toLowerCase()) {
@@ -138,6 +184,52 @@ const DrugAlternatives = ({ currentMedications }) => {
         </div>
       </div>
 
+      <div className="relative mb-6">
+        <div className="flex items-center bg-gray-700/30 border border-gray-700/30 rounded-lg px-3">
+          <Search className="w-4 h-4 text-gray-400 mr-2" />
+          <input
+            type="text"
+            value={query}
+            onChange={(e) => { setQuery(e.target.value); setSelected(null); }}
+            placeholder="Search a generic or brand name"
+            className="w-full bg-transparent py-2 text-white placeholder-gray-500 focus:outline-none"
+          />
+        </div>
+        {suggestions.length > 0 && (
+          <ul className="absolute z-10 mt-1 w-full bg-gray-800 border border-gray-700/50 rounded-lg overflow-hidden shadow-xl">
+            {suggestions.map((suggestion) => (
+              <li
+                key={`${suggestion.type}-${suggestion.name}`}
+                onClick={() => selectSuggestion(suggestion)}
+                className="px-3 py-2 cursor-pointer hover:bg-gray-700/40 flex justify-between"
+              >
+                <span className="text-white">{suggestion.name}</span>
+                <span className="text-gray-400 text-xs">
+                  {suggestion.type === 'brand' ? `Brand of ${suggestion.generics.join(', ')}` : 'Generic'}
+                </span>
+              </li>
+            ))}
+          </ul>
+        )}
+        {selected && (
+          <div className="mt-3 p-4 bg-gray-700/20 border border-gray-700/30 rounded-lg">
+            <h4 className="text-white font-semibold mb-1">{selected.drug}</h4>
+            {selected.generics.length > 0 && (
+              <p className="text-gray-400 text-sm mb-2">Contains: {selected.generics.join(', ')}</p>
+            )}
+            {selected.alternatives.length > 0 ? (
+              <div className="flex flex-wrap gap-2">
+                {selected.alternatives.map((name) => (
+                  <span key={name} className="px-2 py-1 rounded-md text-xs bg-blue-500/20 text-blue-300">{name}</span>
+                ))}
+              </div>
+            ) : (
+              <p className="text-gray-400 text-sm">No alternatives stored for this medication.</p>
+            )}
+          </div>
+        )}
+      </div>
+
       {error && (
         <div className="mb-4 p-4 bg-red-500/20 border border-red-700/30 rounded-lg text-red-300">
           <p className="font-medium">{error}</p>
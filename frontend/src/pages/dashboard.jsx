@@ -2,6 +2,7 @@ import React, { useState, useEffect, useContext } from 'react';
 import { Calendar, Clock, AlertCircle, PieChart, Activity, User } from 'lucide-react';
 import Sidebar from '../../components/sidebar';
 import { AppContext } from '../context/AppContext.jsx';
+import { uploadPrescription } from '../api/jobs';
 
 const MedicationDashboard = () => {
   const { prescriptionHistory, setPrescriptionHistory, medicationData, setMedicationData, reminders, setReminders } = useContext(AppContext);
@@ -371,26 +372,19 @@ const MedicationDashboard = () => {
     const file = event.target.files[0];
     if (!file) return;
 
-    const formData = new FormData();
-    formData.append('file', file);
-
     setLoading(true);
 
     try {
-      const response = await fetch('http://localhost:5000/upload', {
-        method: 'POST',
-        body: formData,
-      });
-
-      if (!response.ok) throw new Error('Failed to upload prescription');
-
-      const data = await response.json();
+      const data = await uploadPrescription(file);
 
       if (data.generic_predictions) {
-        const newMedications = Object.entries(data.generic_predictions).map(([name, type]) => ({
+        const newMedications = Object.entries(data.generic_predictions).map(([name, prediction]) => ({
           id: Date.now() + Math.random(),
           name,
-          description: type,
+          // distance > 0 means the name was matched approximately; never show that as certain
+          description: prediction.distance
+            ? `${prediction.generic} (closest match: ${prediction.matched}, please verify)`
+            : prediction.generic,
           caution: 'Take as directed by your physician',
           sideEffects: 'Consult your doctor about potential side effects',
         }));
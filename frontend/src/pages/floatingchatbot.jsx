@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from "react";
 import { MessageCircle, Send, X, BotIcon, ArrowRight, ChevronLeft } from "lucide-react";
-import axios from "axios";
+import { streamChat } from "../api/chat";
 
 // Enhanced text formatting function
 const renderFormattedText = (text) => {
@@ -23,6 +23,7 @@ const FloatingChatbot = () => {
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
   const [chatHistory, setChatHistory] = useState([]);
+  const [sessionId, setSessionId] = useState(null);
   const [currentView, setCurrentView] = useState("categories");
   const [selectedCategory, setSelectedCategory] = useState(null);
 
@@ -107,30 +108,34 @@ const FloatingChatbot = () => {
     setIsLoading(true);
 
     try {
-      const response = await axios.post(
-        "http://localhost:5000/chat-gemini",
-        {
-          chat: formattedMessage,
-          history: chatHistory,
-        },
-        { timeout: 30000 }
+      // The reply is shown as it streams in; the last message is replaced with each chunk
+      let streamed = "";
+      const botMessage = { text: "", sender: "bot", timestamp: new Date() };
+      const data = await streamChat(
+        { chat: formattedMessage, sessionId, history: chatHistory },
+        (token) => {
+          streamed += token;
+          const partial = { ...botMessage, text: streamed, streaming: true };
+          setMessages((prev) =>
+            prev[prev.length - 1]?.streaming ? [...prev.slice(0, -1), partial] : [...prev, partial]
+          );
+        }
       );
 
-      const botMessage = {
-        text: response.data.text || "No response received.",
-        sender: "bot",
-        timestamp: new Date(),
-      };
-
-      setMessages((prev) => [...prev, botMessage]);
-      setChatHistory(response.data.history || chatHistory);
+      const finalMessage = { ...botMessage, text: data.text || "No response received." };
+      setMessages((prev) =>
+        prev[prev.length - 1]?.streaming ? [...prev.slice(0, -1), finalMessage] : [...prev, finalMessage]
+      );
+      setChatHistory(data.history || chatHistory);
+      setSessionId(data.session_id || null);
 
       setCurrentView("categories");
       setSelectedCategory(null);
     } catch (error) {
       console.error("Error sending message:", error);
       const errorMessage = {
-        text: error.response?.data?.error || "Failed to connect to the server. Please check your network or try again later.",
+        // fetch rejects with a TypeError when the server can't be reached
+        text: (!(error instanceof TypeError) && error.message) || "Failed to connect to the server. Please check your network or try again later.",
         sender: "bot",
         timestamp: new Date(),
       };
@@ -235,7 +240,7 @@ const FloatingChatbot = () => {
                 </div>
               </div>
             ))}
-            {isLoading && (
+            {isLoading && !messages[messages.length - 1]?.streaming && (
               <div className="flex items-start">
                 <div className="bg-gray-100 text-gray-800 p-3 rounded-2xl max-w-[80%]">Typing...</div>
               </div>
@@ -4,6 +4,7 @@ import { FileText, AlertTriangle, Upload, Clock, Sparkles, Stethoscope, AlertCir
 import { motion, AnimatePresence } from 'framer-motion';
 import Sidebar from '../../components/sidebar';
 import { AppContext } from "../context/AppContext";
+import { uploadPrescription } from '../api/jobs';
 import { QRCodeSVG } from 'qrcode.react';
 
 const PrescriptionAnalyzer = () => {
@@ -220,13 +221,15 @@ const PrescriptionAnalyzer = () => {
     setWellnessTips('');
     setCurrentMedications([]);
 
-    const formData = new FormData();
-    formData.append('file', file);
-
     try {
-      const response = await axios.post('http://localhost:5000/upload', formData, {
-        headers: { 'Content-Type': 'multipart/form-data' },
+      const result = await uploadPrescription(file, (stage, data) => {
+        if (stage === 'ocr') setProcessingStatus('Text extracted, analyzing with AI...');
+        if (stage === 'analysis') {
+          setStructuredText(data.structured_text || 'Unable to structure text');
+          setProcessingStatus('Finding alternatives...');
+        }
       });
+      const response = { data: result };
 
       if (response.data.error) throw new Error(response.data.error);
 
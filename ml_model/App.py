@@ -1,22 +1,40 @@
+# Heavy dependencies (cv2, pytesseract, pandas, google.generativeai, reportlab)
+# and the model pickles are loaded lazily on first use; see preload().
+import io
 import os
-import cv2
-import pytesseract
-import numpy as np
-import google.generativeai as genai
+import gc
+import importlib
 import pickle
-import pandas as pd
 import json
 import requests
-import secrets
+import hashlib
 import re
-from collections import defaultdict
-from flask import Flask, request, jsonify, send_from_directory
+import time
+import logging
+from datetime import datetime, timedelta
+from flask import Flask, Request, Response, request, jsonify, send_file, send_from_directory, stream_with_context
+from flask.logging import default_handler
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 from dotenv import load_dotenv
+from storage import Store
+from reminders import ReminderSchedule, parse_time
+from responses import VersionedResponses
+from lazy import Lazy, Versioned
+from drug_matcher import FuzzyMatcher
+from drug_names import DrugNameScanner
+from alternatives_index import AlternativesIndex
+from jobs import JobQueue, QueueFull
+from cache import DiskCache, MemoryCache, MISSING
+from rxnav import RxNavClient, RXNAV_BASE_URL
+from pharmacies import PharmacyFinder, GEOAPIFY_BASE_URL, parse_coordinates
+from rxnorm_index import RxNormIndex
+from uploads import UploadArchive, UploadBuffer, read_upload, sniff_format
+from llm import PrescriptionAnalyzer, SingleFlight
+from chat import ChatSessions, message, trim_history
+from metrics import registry, timed, trace_id, new_trace_id, TraceIdFilter
+from profiler import SamplingProfiler
 
 # Load environment variables
 load_dotenv()
@@ -25,175 +43,442 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})  # Allow all origins to prevent CORS issues
 
-# Load the trained model and label encoders
-try:
-    with open(r"C:\Users\kanishkhaa\OneDrive\Desktop\codher\ml_model\medicine_model.pkl", "rb") as model_file:
-        model = pickle.load(model_file)
-    with open(r"C:\Users\kanishkhaa\OneDrive\Desktop\codher\ml_model\label_encoders.pkl", "rb") as le_file:
-        label_encoders = pickle.load(le_file)
-except FileNotFoundError as e:
-    app.logger.error(f"Model or label encoder file not found: {e}")
-    raise
-
-# Configure Google Generative AI API
+# Every log line carries the id of the request (or upload job) it belongs to. The handler sits on
+# the root logger, so module loggers (rxnav, jobs, ocr, ...) get it too; app.logger propagates there
+default_handler.addFilter(TraceIdFilter())
+default_handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s [%(trace_id)s] in %(module)s: %(message)s"))
+app.logger.removeHandler(default_handler)
+logging.getLogger().addHandler(default_handler)
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+# Model artifacts, relative paths resolve against this directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MEDICINE_MODEL_PATH = os.path.join(BASE_DIR, os.getenv("MEDICINE_MODEL_PATH", "medicine_model.pkl"))
+LABEL_ENCODERS_PATH = os.path.join(BASE_DIR, os.getenv("LABEL_ENCODERS_PATH", "label_encoders.pkl"))
+MEDICINE_MAPPING_FILE = os.path.join(BASE_DIR, os.getenv("MEDICINE_MAPPING_FILE", "medicine_mapping.json"))
+MAX_PREDICT_NAMES = int(os.getenv("MAX_PREDICT_NAMES", "1000"))
+
+def load_medicine_mapping():
+    with open(MEDICINE_MAPPING_FILE, "r") as mapping_file:
+        return {row["doctor_written_name"]: row["actual_name"] for row in json.load(mapping_file)}
+
+def load_generic_table():
+    from generic_names import GenericNameTable
+
+    # Load the trained model and label encoders
+    try:
+        with open(MEDICINE_MODEL_PATH, "rb") as model_file:
+            model = pickle.load(model_file)
+        with open(LABEL_ENCODERS_PATH, "rb") as le_file:
+            label_encoders = pickle.load(le_file)
+    except FileNotFoundError as e:
+        app.logger.error(f"Model or label encoder file not found: {e}")
+        raise
+
+    # Precompute brand -> generic for every known medicine so lookups are a dict hit;
+    # names that miss are matched to the closest known medicine to absorb OCR errors
+    medicine_mapping = load_medicine_mapping()
+    medicine_matcher = FuzzyMatcher(medicine_mapping, max_distance=int(os.getenv("FUZZY_MAX_DISTANCE", "1")))
+    return GenericNameTable.from_model(model, label_encoders, matcher=medicine_matcher, fallback=medicine_mapping)
+
+generic_table = Lazy(load_generic_table)
+
+# Google Generative AI is imported and configured on the first AI request
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    app.logger.error("Gemini API key not set in environment variables")
-    raise ValueError("GEMINI_API_KEY is required")
-genai.configure(api_key=GEMINI_API_KEY)
+
+def load_genai():
+    if not GEMINI_API_KEY:
+        app.logger.error("Gemini API key not set in environment variables")
+        raise ValueError("GEMINI_API_KEY is required")
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
+genai_client = Lazy(load_genai)
+
+# Model used to structure prescriptions; GEMINI_BACKEND=stub answers offline (tests, benchmarks)
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "api")
+ANALYSIS_MODEL = os.getenv("ANALYSIS_MODEL", "gemini-1.5-pro")
+
+def load_analysis_model():
+    if GEMINI_BACKEND == "stub":
+        from stubs.gemini import StubGenerativeModel
+        return StubGenerativeModel(ANALYSIS_MODEL, latency=float(os.getenv("GEMINI_STUB_LATENCY", "0")))
+    return genai_client.get().GenerativeModel(ANALYSIS_MODEL)
+
+analysis_model = Lazy(load_analysis_model)
+
+# Chat shares one model object across requests; prompts are trimmed to CHAT_TOKEN_BUDGET
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gemini-1.5-flash")
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "4000"))
+
+def load_chat_model():
+    if GEMINI_BACKEND == "stub":
+        from stubs.gemini import StubGenerativeModel
+        return StubGenerativeModel(CHAT_MODEL, latency=float(os.getenv("GEMINI_STUB_LATENCY", "0")),
+                                   chunk_latency=float(os.getenv("GEMINI_STUB_CHUNK_LATENCY", "0")))
+    return genai_client.get().GenerativeModel(CHAT_MODEL)
+
+chat_model = Lazy(load_chat_model)
 
 # Folder configurations
 UPLOAD_FOLDER = "uploads"
 OUTPUT_FOLDER = "output"
 DATA_FOLDER = "data"
 DOCS_FOLDER = "docs"
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'tif', 'tiff'}
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["OUTPUT_FOLDER"] = OUTPUT_FOLDER
 app.config["DATA_FOLDER"] = DATA_FOLDER
 app.config["DOCS_FOLDER"] = DOCS_FOLDER
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 os.makedirs(DATA_FOLDER, exist_ok=True)
 os.makedirs(DOCS_FOLDER, exist_ok=True)
 
-# File paths for persistent storage
-PRESCRIPTIONS_FILE = os.path.join(DATA_FOLDER, 'prescriptions.json')
-MEDICATIONS_FILE = os.path.join(DATA_FOLDER, 'medications.json')
-REMINDERS_FILE = os.path.join(DATA_FOLDER, 'reminders.json')
-ALTERNATIVES_FILE = os.path.join(DATA_FOLDER, 'drug_alternatives.json')
+# Uploads are parsed into memory and decoded from there; UPLOAD_FOLDER is only
+# written to when ARCHIVE_UPLOADS is on.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_REQUEST_BYTES", str(64 * 1024 * 1024)))
+ARCHIVE_UPLOADS = os.getenv("ARCHIVE_UPLOADS", "false").lower() == "true"
+upload_archive = None
+if ARCHIVE_UPLOADS:
+    upload_archive = UploadArchive(UPLOAD_FOLDER,
+                                   max_files=int(os.getenv("UPLOAD_ARCHIVE_MAX_FILES", "1000")),
+                                   max_bytes=int(os.getenv("UPLOAD_ARCHIVE_MAX_BYTES", str(1024 * 1024 * 1024))))
+
+class UploadRequest(Request):
+    # Werkzeug spools larger files to a temp file; keep every file in a checked memory buffer
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadBuffer(MAX_UPLOAD_BYTES)
+
+app.request_class = UploadRequest
+
+# Persistent storage (SQLite, WAL mode); legacy data/*.json files are imported once
+DATABASE_FILE = os.getenv("SMARTRX_DB", os.path.join(DATA_FOLDER, 'smartrx.db'))
+store = Store(DATABASE_FILE)
+imported = store.import_json(DATA_FOLDER)
+if imported:
+    app.logger.info(f"Imported legacy JSON data: {imported}")
+reminder_schedule = ReminderSchedule(store)
+# Read endpoints answer from bytes cached until the next write, with ETag/304 and compression
+versioned = VersionedResponses(store, lambda data: app.json.response(data).get_data())
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+CACHE_FOLDER = os.getenv("CACHE_FOLDER", "cache")
+
+# Background pipeline for /upload. Job state is mirrored to a file shared by all
+# worker processes, so /jobs/<id> works whichever worker the poll reaches.
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "16"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "200"))
+job_snapshots = DiskCache(os.path.join(CACHE_FOLDER, "jobs.db"),
+                          default_ttl=int(os.getenv("JOB_SNAPSHOT_TTL", "3600")))
+UPLOAD_QUEUE_DEPTH = registry.gauge("smartrx_upload_queue_depth", "Upload jobs waiting for a worker")
+upload_jobs = JobQueue(workers=UPLOAD_WORKERS, max_queued=UPLOAD_QUEUE_SIZE, retention=JOB_RETENTION,
+                       shared=job_snapshots, on_depth=UPLOAD_QUEUE_DEPTH.set)
+
+# Chat histories live in a file shared by all worker processes, like job state,
+# so a conversation carries on whichever worker its next message reaches
+chat_sessions = ChatSessions(DiskCache(os.path.join(CACHE_FOLDER, "chat.db"),
+                                       max_entries=int(os.getenv("CHAT_MAX_SESSIONS", "1000")),
+                                       default_ttl=int(os.getenv("CHAT_SESSION_TTL", "3600"))),
+                             max_tokens=CHAT_TOKEN_BUDGET)
+
+# Optional offline RxNorm index (built with rxnorm_index.py); RxNav online is the fallback
+RXNORM_INDEX = os.getenv("RXNORM_INDEX")
+rxnorm_index = None
+if RXNORM_INDEX:
+    try:
+        rxnorm_index = RxNormIndex(RXNORM_INDEX)
+    except FileNotFoundError:
+        app.logger.warning(f"RxNorm index {RXNORM_INDEX} not found, using RxNav online")
+
+# RxNav client with pooled connections and a persistent lookup cache
+rxnav_cache = DiskCache(os.path.join(CACHE_FOLDER, "rxnav.db"),
+                        max_entries=int(os.getenv("RXNAV_CACHE_ENTRIES", "20000")))
+rxnav = RxNavClient(rxnav_cache,
+                    base_url=os.getenv("RXNAV_BASE_URL", RXNAV_BASE_URL),
+                    max_workers=int(os.getenv("RXNAV_CONCURRENCY", "8")),
+                    ttl=int(os.getenv("RXNAV_CACHE_TTL", str(7 * 24 * 3600))),
+                    negative_ttl=int(os.getenv("RXNAV_NEGATIVE_TTL", str(24 * 3600))),
+                    index=rxnorm_index,
+                    online_fallback=os.getenv("RXNORM_ONLINE_FALLBACK", "true").lower() == "true")
+# Start RxNav lookups for drugs spotted in the OCR text while Gemini is still analysing it
+RXNAV_PREFETCH = os.getenv("RXNAV_PREFETCH", "true").lower() == "true"
+
+# Pharmacy search cached per geohash cell, so nearby and repeated requests share Geoapify lookups
+pharmacy_cache = DiskCache(os.path.join(CACHE_FOLDER, "pharmacies.db"),
+                           max_entries=int(os.getenv("PHARMACY_CACHE_ENTRIES", "5000")))
+pharmacy_finder = PharmacyFinder(pharmacy_cache, os.getenv("GEOAPIFY_API_KEY"),
+                                 base_url=os.getenv("GEOAPIFY_BASE_URL", GEOAPIFY_BASE_URL),
+                                 radius=int(os.getenv("PHARMACY_RADIUS_M", "50000")),
+                                 max_precision=int(os.getenv("PHARMACY_TILE_PRECISION", "6")),
+                                 max_fetches=int(os.getenv("PHARMACY_MAX_FETCHES", "3")),
+                                 limit=int(os.getenv("PHARMACY_RESULTS", "10")),
+                                 tile_limit=int(os.getenv("PHARMACY_TILE_LIMIT", "50")),
+                                 ttl=int(os.getenv("PHARMACY_CACHE_TTL", str(24 * 3600))),
+                                 timeout=float(os.getenv("GEOAPIFY_TIMEOUT", "10")))
+
+# Process pool for batch OCR, sized to the machine by default
+OCR_PROCESSES = int(os.getenv("OCR_PROCESSES", "0")) or os.cpu_count()
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+
+def load_ocr_pool():
+    from ocr import OcrPool
+    return OcrPool(OCR_PROCESSES)
+
+ocr_pool = Lazy(load_ocr_pool)
+
+# Content-addressed cache of OCR + AI analysis, keyed by the SHA-256 of the upload.
+# Bump ANALYSIS_CACHE_VERSION when preprocessing, the prompt or the prediction format changes.
+ANALYSIS_CACHE_VERSION = "3"
+analysis_cache = DiskCache(os.path.join(CACHE_FOLDER, "analysis.db"),
+                           max_entries=int(os.getenv("ANALYSIS_CACHE_ENTRIES", "5000")),
+                           max_bytes=int(os.getenv("ANALYSIS_CACHE_BYTES", str(64 * 1024 * 1024))),
+                           default_ttl=int(os.getenv("ANALYSIS_CACHE_TTL", str(30 * 24 * 3600))))
+
+# AI answers keyed by normalized OCR text, so re-scans of the same prescription skip the model
+llm_cache = DiskCache(os.path.join(CACHE_FOLDER, "llm.db"),
+                      max_entries=int(os.getenv("LLM_CACHE_ENTRIES", "5000")),
+                      max_bytes=int(os.getenv("LLM_CACHE_BYTES", str(32 * 1024 * 1024))))
+analyzer = PrescriptionAnalyzer(analysis_model.get, llm_cache, ANALYSIS_MODEL,
+                                ttl=int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))))
+
+# Emergency PDFs are addressed by a hash of their payload. Rendered bytes live in
+# memory; payloads are kept on disk so a shared link can be re-rendered after eviction.
+doc_cache = MemoryCache(max_bytes=int(os.getenv("DOC_CACHE_BYTES", str(64 * 1024 * 1024))),
+                        ttl=int(os.getenv("DOC_CACHE_TTL", "3600")))
+doc_payloads = DiskCache(os.path.join(CACHE_FOLDER, "docs.db"),
+                         max_entries=int(os.getenv("DOC_LINK_ENTRIES", "10000")),
+                         default_ttl=int(os.getenv("DOC_LINK_TTL", str(30 * 24 * 3600))))
+doc_renders = SingleFlight()
+
+# Prometheus metrics at /metrics, summed over workers under gunicorn; stage timings are recorded with metrics.timed()
+HTTP_REQUESTS = registry.counter("smartrx_http_requests_total", "HTTP requests handled",
+                                 ("method", "endpoint", "status"))
+HTTP_SECONDS = registry.histogram("smartrx_http_request_duration_seconds",
+                                  "Time to produce a response, per route", ("endpoint",))
+
+# Sampling profiler, switched on at runtime through /admin/profiler when enabled. It samples
+# only the process that gets the request, so it is refused when gunicorn runs several workers.
+PROFILER_ENABLED = os.getenv("ENABLE_PROFILER", "false").lower() == "true"
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+profiler = SamplingProfiler()
+
+@app.before_request
+def start_trace():
+    # Reuse the caller's request id when it looks sane so logs line up across services
+    incoming = request.headers.get("X-Request-ID", "")
+    trace_id.set(incoming if re.fullmatch(r"[\w.-]{1,64}", incoming) else new_trace_id())
+    request.environ["smartrx.start"] = time.perf_counter()
+
+@app.after_request
+def finish_trace(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    started = request.environ.get("smartrx.start")
+    if started is not None:
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    response.headers["X-Request-ID"] = trace_id.get()
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+@app.errorhandler(UnsupportedMediaType)
+def upload_rejected(e):
+    # Raised while the form is parsed, before the route runs
+    return jsonify({"error": e.description}), e.code
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def preprocess_image(image_path):
-    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    if image is None:
-        raise ValueError(f"Could not read image: {image_path}")
-    image = cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-    processed = cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 2)
-    return processed
-
-def extract_text(image_path):
+def extract_text(source):
     try:
-        processed_image = preprocess_image(image_path)
-        custom_config = r'--oem 3 --psm 6'
-        extracted_text = pytesseract.image_to_string(processed_image, config=custom_config)
-        return extracted_text.strip() or "No text extracted"
+        from ocr import iter_page_texts
+
+        # Pages are rasterized one at a time, so long PDFs never sit in memory as images
+        with timed("ocr"):
+            page_texts = [text for _, text in iter_page_texts(source) if text]
+        extracted_text = "\n\n".join(page_texts)
+        return extracted_text or "No text extracted"
     except Exception as e:
         app.logger.error(f"Error extracting text: {e}")
         return "Error extracting text"
 
+# Predictions are {"generic", "matched", "distance"}; distance > 0 marks a fuzzy match
+PREDICTION_ERROR = {"generic": "Prediction Error", "matched": None, "distance": None}
+
 def predict_generic_name(medicine_name):
     try:
-        if medicine_name in label_encoders["MEDICINE_NAME"].classes_:
-            medicine_encoded = label_encoders["MEDICINE_NAME"].transform([medicine_name])
-            predicted_label = model.predict(pd.DataFrame({"MEDICINE_NAME": medicine_encoded}))
-            generic_name = label_encoders["GENERIC_NAME"].inverse_transform(predicted_label)[0]
-            return generic_name
-        return "Unknown Medicine"
+        with timed("predict_generic_name"):
+            return generic_table.get().predict(medicine_name)
     except Exception as e:
         app.logger.error(f"Error predicting generic name: {e}")
-        return "Prediction Error"
+        return dict(PREDICTION_ERROR)
+
+def predict_generic_names(medicine_names):
+    try:
+        with timed("predict_generic_name"):
+            return generic_table.get().predict_many(medicine_names)
+    except Exception as e:
+        app.logger.error(f"Error predicting generic names: {e}")
+        return [dict(PREDICTION_ERROR) for _ in medicine_names]
 
 def organize_text_with_ai(text):
     try:
-        model = genai.GenerativeModel("gemini-1.5-pro")
-        prompt = f"""
-        Organize the following prescription text into a structured format with clearly labeled sections:
-        - *Patient Information* (Name, Age, Gender if available)
-        - *Doctor Information* (Name, Hospital/Clinic, License Number if available)
-        - *Medications* (Medicine Name, Dosage, Frequency)
-        - *Special Instructions* (Dietary advice, warnings, or extra instructions)
-        Prescription Text: {text}
-        """
-        response = model.generate_content(prompt)
-        structured_text = response.text.strip() if response.text else "No response from AI."
-        
-        extracted_medicines = []
-        for line in structured_text.split('\n'):
-            if "Medicine Name" in line:
-                med_name = line.split("Medicine Name:")[-1].split(",")[0].strip()
-                extracted_medicines.append(med_name)
-        
-        generic_predictions = {med: predict_generic_name(med) for med in extracted_medicines}
+        # Cached and coalesced; the model answers in JSON, so medicines come from a list, not text parsing
+        with timed("organize_text_with_ai"):
+            analysis = analyzer.analyze(text)
+        structured_text = analysis["structured_text"]
+        extracted_medicines = analysis["medications"]
+
+        generic_predictions = dict(zip(extracted_medicines, predict_generic_names(extracted_medicines)))
         return {"structured_text": structured_text, "generic_predictions": generic_predictions}
     except Exception as e:
         app.logger.error(f"Error organizing text with AI: {e}")
         return {"structured_text": "Error processing text", "generic_predictions": {}}
 
-def load_json(file_path, default=[]):
+# Drug alternatives functionality
+def load_known_drug_names():
+    names = []
     try:
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        return default
-    except Exception as e:
-        app.logger.error(f"Error loading JSON from {file_path}: {e}")
-        return default
+        with open(LABEL_ENCODERS_PATH, "rb") as le_file:
+            label_encoders = pickle.load(le_file)
+        for column in ("GENERIC_NAME", "MEDICINE_NAME"):
+            names.extend(str(name) for name in label_encoders[column].classes_)
+    except FileNotFoundError as e:
+        app.logger.warning(f"Label encoders not found, drug vocabulary is incomplete: {e}")
+    medicine_mapping = load_medicine_mapping()
+    names.extend(medicine_mapping.values())
+    names.extend(medicine_mapping)
+    return names
 
-def save_json(file_path, data):
-    try:
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=4)
-    except Exception as e:
-        app.logger.error(f"Error saving JSON to {file_path}: {e}")
+known_drug_names = Lazy(load_known_drug_names)
+# Stored alternatives are part of the vocabulary, so the automaton is rebuilt when they change
+drug_scanner = Versioned(store, "drug_alternatives",
+                         lambda: DrugNameScanner(list(store.all_alternatives()) + known_drug_names.get()))
+
+# Forward, reverse (brand -> generic) and type-ahead lookups over the stored alternatives
+alternatives_index = Versioned(store, "drug_alternatives", lambda: AlternativesIndex(store.all_alternatives()))
+MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "50"))
 
-# Drug alternatives functionality
 def extract_drug_names(text):
-    # Tokenize and clean
-    words = re.findall(r'\b[a-zA-Z]+\b', text.lower())
-    # Filter out common non-medical words
-    blacklist = {"take", "tablet", "for", "days", "and", "if", "the", "a", "of", "to", "patient", "should", "is"}
-    potential_drugs = [word for word in words if word not in blacklist and len(word) > 3]
-    return list(set(potential_drugs))
+    # Known drug names with their offsets; ordinary words never reach RxNav
+    return drug_scanner.get().find(text)
 
 def get_rxcui(drug_name):
-    url = f"https://rxnav.nlm.nih.gov/REST/rxcui.json?name={drug_name}"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("idGroup", {}).get("rxnormId", [None])[0]
-    except Exception as e:
-        app.logger.error(f"Error getting RxCUI for {drug_name}: {e}")
-    return None
+    return rxnav.get_rxcui(drug_name)
 
 def get_brand_names(rxcui):
-    if not rxcui:
-        return []
-    
-    url = f"https://rxnav.nlm.nih.gov/REST/rxcui/{rxcui}/related.json?tty=BN"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            concept_group = data.get("relatedGroup", {}).get("conceptGroup", [])
-            brands = []
-            for group in concept_group:
-                concepts = group.get("conceptProperties", [])
-                for concept in concepts:
-                    brands.append(concept["name"])
-            return brands
-    except Exception as e:
-        app.logger.error(f"Error getting brand names for RxCUI {rxcui}: {e}")
-    return []
+    return rxnav.get_brand_names(rxcui)
 
 def fetch_alternatives(drug_names):
-    result = defaultdict(list)
-    for drug in drug_names:
-        app.logger.info(f"Searching alternatives for: {drug}...")
-        rxcui = get_rxcui(drug)
-        if not rxcui:
-            app.logger.warning(f"RxCUI not found for '{drug}'")
-            continue
-        brands = get_brand_names(rxcui)
-        if brands:
-            app.logger.info(f"Found {len(brands)} alternatives for '{drug}'")
-            result[drug] = brands
-        else:
-            app.logger.warning(f"No brand names found for '{drug}'")
-    return result
+    with timed("alternatives"):
+        return rxnav.fetch_alternatives(drug_names)
+
+def prefetch_alternatives(text):
+    # Gemini decides the final drug list, but names spotted in the raw text can be
+    # looked up meanwhile, so the two services' latencies overlap instead of adding up
+    if not RXNAV_PREFETCH:
+        return
+    try:
+        rxnav.prefetch(mention["name"] for mention in extract_drug_names(text))
+    except Exception as e:
+        app.logger.error(f"Error prefetching alternatives: {e}")
+
+def save_upload(filename, structured_data, alternatives):
+    # Update prescriptions
+    store.insert("prescriptions", {
+        "filename": filename,
+        "date": datetime.now().strftime('%Y-%m-%d'),
+        "structured_text": structured_data["structured_text"],
+        "generic_predictions": structured_data["generic_predictions"]
+    })
+
+    # Update medications; a fuzzy match says which known name it was taken from
+    for med_name, predicted in structured_data["generic_predictions"].items():
+        description = predicted["generic"]
+        if predicted["distance"]:
+            description = f"{description} (closest match: {predicted['matched']}, please verify)"
+        store.add_medication({
+            "name": med_name,
+            "description": description,
+            "caution": "Take as directed",
+            "sideEffects": "Consult doctor"
+        })
+
+    # Update reminders
+    today = datetime.now().strftime('%Y-%m-%d')
+    refill_date = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    for i, med_name in enumerate(structured_data["generic_predictions"]):
+        store.insert("reminders", {
+            "medication": med_name,
+            "title": f"Take {med_name}",
+            "date": today,
+            "time": f"{8 + i}:00",
+            "recurring": "daily",
+            "completed": False
+        })
+        store.insert("reminders", {
+            "medication": med_name,
+            "title": f"Refill {med_name}",
+            "date": refill_date,
+            "time": "09:00",
+            "recurring": "none",
+            "completed": False
+        })
+
+    # Save alternatives
+    store.update_alternatives(alternatives)
+
+def read_and_hash(file):
+    with timed("file_read"):
+        data = read_upload(file)
+        return data, hashlib.sha256(data).hexdigest()
+
+def archive_upload(content_hash, filename, data):
+    if upload_archive is not None:
+        upload_archive.submit(content_hash, filename, data)
+
+def analysis_cache_key(content_hash):
+    return f"v{ANALYSIS_CACHE_VERSION}:{content_hash}"
+
+def process_upload(job, filename, data, content_hash):
+    cached = analysis_cache.get(analysis_cache_key(content_hash), None)
+    if cached:
+        app.logger.info(f"Analysis cache hit for {content_hash[:12]}")
+        extracted_text = cached["extracted_text"]
+        structured_data = {key: cached[key] for key in ("structured_text", "generic_predictions")}
+        job.add_stage("ocr", {"extracted_text": extracted_text})
+        job.add_stage("analysis", structured_data)
+    else:
+        extracted_text = extract_text(data)
+        job.add_stage("ocr", {"extracted_text": extracted_text})
+
+        prefetch_alternatives(extracted_text)
+        structured_data = organize_text_with_ai(extracted_text)
+        job.add_stage("analysis", structured_data)
+
+        # Failed OCR or AI runs are not cached so a re-upload retries them
+        if extracted_text != "Error extracting text" and structured_data["structured_text"] != "Error processing text":
+            analysis_cache.set(analysis_cache_key(content_hash), {"extracted_text": extracted_text, **structured_data})
+
+    # Find alternatives for medications before taking the write lock
+    drug_names = list(structured_data["generic_predictions"].keys())
+    alternatives = fetch_alternatives(drug_names)
+    job.add_stage("alternatives", {"alternatives": alternatives})
+
+    # Persist everything from this upload in one transaction
+    with timed("store_write"), store.transaction():
+        save_upload(filename, structured_data, alternatives)
+
+    return {
+        "filename": filename,
+        "content_hash": content_hash,
+        "extracted_text": extracted_text,
+        "structured_text": structured_data["structured_text"],
+        "generic_predictions": structured_data["generic_predictions"],
+        "alternatives": alternatives
+    }
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
@@ -205,88 +490,159 @@ def upload_file():
         return jsonify({"error": "Invalid file"}), 400
     
     filename = secure_filename(file.filename)
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     try:
-        file.save(filepath)
-        extracted_text = extract_text(filepath)
-        structured_data = organize_text_with_ai(extracted_text)
-
-        # Load existing data
-        prescriptions = load_json(PRESCRIPTIONS_FILE)
-        medications = load_json(MEDICATIONS_FILE)
-        reminders = load_json(REMINDERS_FILE)
-
-        # Update prescriptions
-        new_prescription = {
-            "id": len(prescriptions) + 1,
-            "filename": filename,
-            "date": pd.Timestamp.now().strftime('%Y-%m-%d'),
-            "structured_text": structured_data["structured_text"],
-            "generic_predictions": structured_data["generic_predictions"]
-        }
-        prescriptions.append(new_prescription)
-        save_json(PRESCRIPTIONS_FILE, prescriptions)
-
-        # Update medications
-        for med_name, generic_name in structured_data["generic_predictions"].items():
-            if not any(m['name'] == med_name for m in medications):
-                medications.append({
-                    "id": len(medications) + 1,
-                    "name": med_name,
-                    "description": generic_name,
-                    "caution": "Take as directed",
-                    "sideEffects": "Consult doctor"
-                })
-        save_json(MEDICATIONS_FILE, medications)
-
-        # Update reminders
-        today = pd.Timestamp.now().strftime('%Y-%m-%d')
-        refill_date = (pd.Timestamp.now() + pd.Timedelta(days=30)).strftime('%Y-%m-%d')
-        for i, (med_name, _) in enumerate(structured_data["generic_predictions"].items()):
-            reminders.append({
-                "id": len(reminders) + 1 + i,
-                "medication": med_name,
-                "title": f"Take {med_name}",
-                "date": today,
-                "time": f"{8 + i}:00",
-                "recurring": "daily",
-                "completed": False
-            })
-            reminders.append({
-                "id": len(reminders) + 1 + i + 100,
-                "medication": med_name,
-                "title": f"Refill {med_name}",
-                "date": refill_date,
-                "time": "09:00",
-                "recurring": "none",
-                "completed": False
-            })
-        save_json(REMINDERS_FILE, reminders)
-
-        # Find alternatives for medications
-        drug_names = list(structured_data["generic_predictions"].keys())
-        alternatives = fetch_alternatives(drug_names)
-        
-        # Save alternatives
-        alternatives_data = load_json(ALTERNATIVES_FILE, {})
-        alternatives_data.update(alternatives)
-        save_json(ALTERNATIVES_FILE, alternatives_data)
-
-        return jsonify({
-            "filename": filename,
-            "extracted_text": extracted_text,
-            "structured_text": structured_data["structured_text"],
-            "generic_predictions": structured_data["generic_predictions"],
-            "alternatives": alternatives
-        })
+        data, content_hash = read_and_hash(file)
+        # Files too short to have been checked while parsing
+        if sniff_format(data) is None:
+            return jsonify({"error": "Unsupported file format"}), 415
+        job = upload_jobs.submit(process_upload, filename, data, content_hash)
+        archive_upload(content_hash, filename, data)
+    except QueueFull:
+        app.logger.warning("Upload queue is full, rejecting request")
+        return jsonify({"error": "Server busy, try again shortly"}), 503, {"Retry-After": "5"}
     except Exception as e:
         app.logger.error(f"Error processing upload: {e}")
         return jsonify({"error": "Failed to process file"}), 500
 
+    return job_response(job)
+
+def job_response(job):
+    # ?wait=true keeps the old blocking behaviour for simple clients
+    if request.args.get('wait', '').lower() == 'true':
+        job.wait()
+        if job.error:
+            return jsonify({"error": "Failed to process file"}), 500
+        return jsonify(job.result)
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }), 202
+
+def process_batch(job, uploads):
+    from ocr import count_pages
+
+    # Expand every file into pages and OCR them across the process pool
+    pages = [(filename, data, page)
+             for filename, data in uploads
+             for page in range(count_pages(data))]
+    texts = [None] * len(pages)
+    for index, text, error in ocr_pool.get().ocr_pages([(data, page) for _, data, page in pages]):
+        if error is not None:
+            app.logger.error(f"Error extracting text from {pages[index][0]} page {pages[index][2] + 1}: {error}")
+            text = "Error extracting text"
+        texts[index] = text or "No text extracted"
+        job.add_stage(f"page_{index + 1}", {
+            "filename": pages[index][0],
+            "page": pages[index][2] + 1,
+            "extracted_text": texts[index]
+        })
+
+    page_results = [{"filename": filename, "page": page + 1, "extracted_text": text}
+                     for (filename, _, page), text in zip(pages, texts)]
+    extracted_text = "\n\n".join(text for text in texts
+                                  if text not in ("Error extracting text", "No text extracted"))
+
+    prefetch_alternatives(extracted_text)
+    structured_data = organize_text_with_ai(extracted_text or "No text extracted")
+    job.add_stage("analysis", structured_data)
+
+    drug_names = list(structured_data["generic_predictions"].keys())
+    alternatives = fetch_alternatives(drug_names)
+    job.add_stage("alternatives", {"alternatives": alternatives})
+
+    filename = ", ".join(dict.fromkeys(filename for filename, _ in uploads))
+    with timed("store_write"), store.transaction():
+        save_upload(filename, structured_data, alternatives)
+
+    return {
+        "filename": filename,
+        "pages": page_results,
+        "extracted_text": extracted_text,
+        "structured_text": structured_data["structured_text"],
+        "generic_predictions": structured_data["generic_predictions"],
+        "alternatives": alternatives
+    }
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    files = request.files.getlist('files') or request.files.getlist('file')
+    if not files:
+        return jsonify({"error": "No file part"}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({"error": f"At most {MAX_BATCH_FILES} files per batch"}), 400
+    if any(file.filename == '' or not allowed_file(file.filename) for file in files):
+        return jsonify({"error": "Invalid file"}), 400
+
+    uploads = []
+    try:
+        for file in files:
+            filename = secure_filename(file.filename)
+            data, content_hash = read_and_hash(file)
+            if sniff_format(data) is None:
+                return jsonify({"error": f"Unsupported file format: {filename}"}), 415
+            uploads.append((filename, data, content_hash))
+        job = upload_jobs.submit(process_batch, [(filename, data) for filename, data, _ in uploads])
+        for filename, data, content_hash in uploads:
+            archive_upload(content_hash, filename, data)
+    except QueueFull:
+        app.logger.warning("Upload queue is full, rejecting batch")
+        return jsonify({"error": "Server busy, try again shortly"}), 503, {"Retry-After": "5"}
+    except Exception as e:
+        app.logger.error(f"Error processing batch upload: {e}")
+        return jsonify({"error": "Failed to process files"}), 500
+
+    return job_response(job)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        index = 0
+        while True:
+            events, finished = job.events_since(index, timeout=15)
+            if not events and not finished:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            index += len(events)
+            if finished:
+                break
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/predict-generic', methods=['POST'])
+def predict_generic():
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('names'), list):
+            return jsonify({"error": "A list of medicine names is required"}), 400
+        names = [str(name) for name in data['names']]
+        if len(names) > MAX_PREDICT_NAMES:
+            return jsonify({"error": f"At most {MAX_PREDICT_NAMES} names per request"}), 400
+        return jsonify({"predictions": dict(zip(names, predict_generic_names(names)))})
+    except Exception as e:
+        app.logger.error(f"Error predicting generic names: {str(e)}")
+        return jsonify({"error": f"Failed to predict generic names: {str(e)}"}), 500
+
 @app.route('/prescriptions', methods=['GET'])
 def get_prescriptions():
     try:
-        return jsonify(load_json(PRESCRIPTIONS_FILE))
+        return versioned.respond(request, "prescriptions", "prescriptions", lambda: store.all("prescriptions"))
     except Exception as e:
         app.logger.error(f"Error fetching prescriptions: {e}")
         return jsonify({"error": "Failed to fetch prescriptions"}), 500
@@ -294,85 +650,104 @@ def get_prescriptions():
 @app.route('/medications', methods=['GET'])
 def get_medications():
     try:
-        return jsonify(load_json(MEDICATIONS_FILE))
+        return versioned.respond(request, "medications", "medications", lambda: store.all("medications"))
     except Exception as e:
         app.logger.error(f"Error fetching medications: {e}")
         return jsonify({"error": "Failed to fetch medications"}), 500
 
+def page_limit(default=50):
+    return max(1, min(int(request.args.get('limit', default)), MAX_PAGE_SIZE))
+
 @app.route('/reminders', methods=['GET'])
 def get_reminders():
+    args = request.args
     try:
-        return jsonify(load_json(REMINDERS_FILE))
+        # ?start=&end= lists occurrences in a time range, with recurring reminders expanded
+        if 'start' in args or 'end' in args:
+            start = parse_time(args['start']) if 'start' in args else datetime.now().replace(second=0, microsecond=0)
+            end = parse_time(args['end'], end=True) if 'end' in args else start + timedelta(days=7)
+            completed = args.get('completed')
+            items, next_cursor = reminder_schedule.between(
+                start, end, limit=page_limit(), cursor=args.get('cursor'),
+                completed=None if completed is None else completed.lower() == 'true'
+            )
+            return jsonify({"reminders": items, "next_cursor": next_cursor})
+        # ?limit= pages through the stored reminders by id
+        if 'limit' in args:
+            items = store.page("reminders", int(args.get('cursor', 0)), page_limit())
+            next_cursor = items[-1]["id"] if len(items) == page_limit() else None
+            return jsonify({"reminders": items, "next_cursor": next_cursor})
+        return versioned.respond(request, "reminders", "reminders", lambda: store.all("reminders"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid reminder query: {e}"}), 400
     except Exception as e:
         app.logger.error(f"Error fetching reminders: {e}")
         return jsonify({"error": "Failed to fetch reminders"}), 500
 
+@app.route('/reminders/next', methods=['GET'])
+def next_reminders():
+    try:
+        after = parse_time(request.args['after']) if 'after' in request.args else datetime.now().replace(second=0, microsecond=0)
+        return jsonify(reminder_schedule.next_due(after, limit=page_limit(default=10)))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid reminder query: {e}"}), 400
+    except Exception as e:
+        app.logger.error(f"Error fetching next reminders: {e}")
+        return jsonify({"error": "Failed to fetch reminders"}), 500
+
 @app.route('/reminders/<int:id>/complete', methods=['POST'])
 def complete_reminder(id):
     try:
-        reminders = load_json(REMINDERS_FILE)
-        for reminder in reminders:
-            if reminder['id'] == id:
-                reminder['completed'] = True
-                break
-        save_json(REMINDERS_FILE, reminders)
+        # For a recurring reminder, "date" completes one occurrence instead of the whole series
+        data = request.get_json(silent=True) or {}
+        date = data.get('date') or request.args.get('date')
+        if not reminder_schedule.complete(id, date):
+            return jsonify({"error": "Reminder not found"}), 404
         return jsonify({"status": "success"})
+    except ValueError as e:
+        return jsonify({"error": f"Invalid date: {e}"}), 400
     except Exception as e:
         app.logger.error(f"Error completing reminder {id}: {e}")
         return jsonify({"error": "Failed to complete reminder"}), 500
 
+def render_prescription_doc(doc_id, data):
+    pdf = doc_cache.get(doc_id)
+    if pdf is not MISSING:
+        return pdf
+
+    def render():
+        from prescription_pdf import render
+        with timed("render_pdf"):
+            pdf = render(data)
+        doc_cache.set(doc_id, pdf)
+        return pdf
+
+    # Identical documents requested at the same time are rendered once
+    return doc_renders.do(doc_id, render)
+
+def pdf_response(doc_id, pdf):
+    return send_file(io.BytesIO(pdf), mimetype="application/pdf", download_name=f"{doc_id}.pdf",
+                     etag=doc_id, max_age=24 * 3600, conditional=True)
+
 @app.route('/generate-prescription-doc', methods=['POST'])
 def generate_prescription_doc():
+    from prescription_pdf import payload_hash
+
     try:
         data = request.get_json()
         if not data:
             return jsonify({"error": "No data provided"}), 400
+        data.setdefault('timestamp', datetime.now().strftime('%Y-%m-%d'))
+
+        doc_id = payload_hash(data)
+        pdf = render_prescription_doc(doc_id, data)
+        doc_payloads.set(doc_id, data)
 
-        patient = data.get('patient', {})
-        medications = data.get('medications', [])
-        prescriptions = data.get('prescriptions', [])
-        timestamp = data.get('timestamp', pd.Timestamp.now().strftime('%Y-%m-%d'))
-
-        # Generate PDF
-        file_name = f"prescription_{patient.get('n', 'Unknown').replace(' ', '')}{timestamp}.pdf"
-        file_path = os.path.join(app.config['DOCS_FOLDER'], file_name)
-        doc = SimpleDocTemplate(file_path, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Title
-        story.append(Paragraph("Emergency Medical Information", styles['Title']))
-        story.append(Spacer(1, 12))
-
-        # Patient Info
-        story.append(Paragraph(f"PATIENT: {patient.get('n', 'Unknown')}", styles['Normal']))
-        if patient.get('g', 'U') != 'U':
-            story.append(Paragraph(f"GENDER: {patient.get('g')}", styles['Normal']))
-        if patient.get('e', 'None') != 'None':
-            story.append(Paragraph(f"EMERGENCY CONTACT: {patient.get('e')}", styles['Normal']))
-        story.append(Spacer(1, 12))
-
-        # Medications
-        story.append(Paragraph("MEDICATIONS:", styles['Heading2']))
-        for i, med in enumerate(medications, 1):
-            story.append(Paragraph(f"{i}. {med.get('n', 'Unknown')}: {med.get('d', 'N/A')} ({med.get('date', 'N/A')})", styles['Normal']))
-        story.append(Spacer(1, 12))
-
-        # Prescription Details
-        story.append(Paragraph("PRESCRIPTION DETAILS:", styles['Heading2']))
-        for i, p in enumerate(prescriptions, 1):
-            doctor = p.get('doctor', 'Unknown')
-            story.append(Paragraph(f"{i}. Date: {p.get('date', 'N/A')}, Doctor: {doctor}", styles['Normal']))
-            clean_text = p.get('structured_text', 'No details available').replace('', '').replace('*', '')
-            story.append(Paragraph(clean_text, styles['Normal']))
-            story.append(Spacer(1, 6))
-        story.append(Spacer(1, 12))
-
-        # Footer
-        story.append(Paragraph(f"Generated: {timestamp}", styles['Normal']))
-
-        doc.build(story)
-        url = f"http://localhost:5000/docs/{file_name}"
+        # ?format=pdf (or Accept: application/pdf) streams the document back directly
+        wants_pdf = request.accept_mimetypes.best_match(["application/json", "application/pdf"]) == "application/pdf"
+        if request.args.get('format') == 'pdf' or wants_pdf:
+            return pdf_response(doc_id, pdf)
+        url = f"{request.host_url}docs/{doc_id}.pdf"
         return jsonify({"url": url})
     except Exception as e:
         app.logger.error(f"Error generating prescription doc: {e}")
@@ -385,6 +760,16 @@ def home():
 @app.route('/docs/<filename>', methods=['GET'])
 def serve_doc(filename):
     try:
+        doc_id = filename[:-4] if filename.endswith('.pdf') else ''
+        if re.fullmatch(r'[0-9a-f]{64}', doc_id):
+            pdf = doc_cache.get(doc_id)
+            if pdf is MISSING:
+                data = doc_payloads.get(doc_id)
+                if data is MISSING:
+                    return jsonify({"error": "Document not found"}), 404
+                pdf = render_prescription_doc(doc_id, data)
+            return pdf_response(doc_id, pdf)
+        # Documents written to docs/ by earlier versions
         return send_from_directory(app.config['DOCS_FOLDER'], filename)
     except Exception as e:
         app.logger.error(f"Error serving document {filename}: {e}")
@@ -393,9 +778,7 @@ def serve_doc(filename):
 @app.route('/prescriptions/<int:id>', methods=['DELETE'])
 def delete_prescription(id):
     try:
-        prescriptions = load_json(PRESCRIPTIONS_FILE)
-        prescriptions = [p for p in prescriptions if p['id'] != id]
-        save_json(PRESCRIPTIONS_FILE, prescriptions)
+        store.delete("prescriptions", id)
         return jsonify({"status": "success", "message": f"Prescription {id} deleted"})
     except Exception as e:
         app.logger.error(f"Error deleting prescription {id}: {e}")
@@ -404,9 +787,7 @@ def delete_prescription(id):
 @app.route('/medications/<int:id>', methods=['DELETE'])
 def delete_medication(id):
     try:
-        medications = load_json(MEDICATIONS_FILE)
-        medications = [m for m in medications if m['id'] != id]
-        save_json(MEDICATIONS_FILE, medications)
+        store.delete("medications", id)
         return jsonify({"status": "success", "message": f"Medication {id} deleted"})
     except Exception as e:
         app.logger.error(f"Error deleting medication {id}: {e}")
@@ -423,9 +804,7 @@ def profile():
 @app.route('/reminders/<int:id>', methods=['DELETE'])
 def delete_reminder(id):
     try:
-        reminders = load_json(REMINDERS_FILE)
-        reminders = [r for r in reminders if r['id'] != id]
-        save_json(REMINDERS_FILE, reminders)
+        store.delete("reminders", id)
         return jsonify({"status": "success", "message": f"Reminder {id} deleted"})
     except Exception as e:
         app.logger.error(f"Error deleting reminder {id}: {e}")
@@ -440,33 +819,26 @@ def get_pharmacies():
         return jsonify({"error": "Latitude and Longitude are required"}), 400
     
     try:
-        GEOAPIFY_API_KEY = os.getenv("GEOAPIFY_API_KEY")
-        if not GEOAPIFY_API_KEY:
+        lat, lon = parse_coordinates(lat, lon)
+    except ValueError:
+        return jsonify({"error": "Latitude and Longitude must be valid coordinates"}), 400
+
+    try:
+        if not pharmacy_finder.api_key:
             app.logger.error("Geoapify API key not set")
             return jsonify({"error": "Geoapify API key missing"}), 500
 
-        response = requests.get("https://api.geoapify.com/v2/places", params={
-            "categories": "healthcare.pharmacy",
-            "filter": f"circle:{lon},{lat},50000",
-            "bias": f"proximity:{lon},{lat}",
-            "limit": 10,
-            "apiKey": GEOAPIFY_API_KEY
-        })
-        
-        response.raise_for_status()
-        data = response.json()
-        
-        pharmacies = [{
-            "id": pharmacy["properties"].get("place_id", f"pharm-{secrets.token_hex(4)}"),
-            "name": pharmacy["properties"].get("name", "Unnamed Pharmacy"),
-            "address": pharmacy["properties"].get("formatted", "Address not available")
-        } for pharmacy in data.get("features", [])]
-        
-        return jsonify(pharmacies)
+        return jsonify(pharmacy_finder.nearby(lat, lon))
     except requests.exceptions.RequestException as e:
         app.logger.error(f"Error fetching pharmacies: {str(e)}")
         return jsonify({"error": f"Failed to fetch pharmacy data: {str(e)}"}), 500
 
+def valid_turns(history):
+    if not isinstance(history, list):
+        return []
+    return [turn for turn in history
+            if isinstance(turn, dict) and turn.get("role") in ("user", "model") and isinstance(turn.get("parts"), list)]
+
 @app.route('/chat-gemini', methods=['POST'])
 def chat_gemini():
     try:
@@ -474,24 +846,47 @@ def chat_gemini():
         if not data or 'chat' not in data:
             return jsonify({"error": "Message is required"}), 400
 
-        message = data['chat']
-        history = data.get('history', [])
+        user_message = data['chat']
+        # A known session_id uses the server-side history; otherwise the client's history is used
+        session_id = data.get('session_id')
+        history = chat_sessions.get(session_id) if session_id else None
+        if history is None:
+            session_id = None
+            history = valid_turns(data.get('history', []))
 
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(message)
+        contents = trim_history(history + [message("user", user_message)], CHAT_TOKEN_BUDGET)
 
-        bot_response = response.text.strip() if response.text else "No response from AI."
+        def finish(bot_response):
+            updated_history = history + [message("user", user_message), message("model", bot_response)]
+            return {"text": bot_response, "history": updated_history,
+                    "session_id": chat_sessions.save(session_id, updated_history)}
 
-        updated_history = history + [
-            {"role": "user", "parts": [{"text": message}]},
-            {"role": "model", "parts": [{"text": bot_response}]}
-        ]
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            return Response(stream_with_context(stream_chat(contents, finish)), mimetype="text/event-stream",
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        return jsonify({"text": bot_response, "history": updated_history})
+        response = chat_model.get().generate_content(contents)
+        bot_response = response.text.strip() if response.text else "No response from AI."
+        return jsonify(finish(bot_response))
     except Exception as e:
         app.logger.error(f"Error in chat-gemini: {str(e)}")
         return jsonify({"error": f"Failed to process chat request: {str(e)}"}), 500
 
+def stream_chat(contents, finish):
+    # Forward each chunk as a "token" event as soon as the model produces it
+    parts = []
+    try:
+        for chunk in chat_model.get().generate_content(contents, stream=True):
+            if chunk.text:
+                parts.append(chunk.text)
+                yield f"event: token\ndata: {json.dumps({'text': chunk.text})}\n\n"
+        result = finish("".join(parts).strip() or "No response from AI.")
+    except Exception as e:
+        app.logger.error(f"Error in chat-gemini stream: {str(e)}")
+        yield f"event: failed\ndata: {json.dumps({'error': f'Failed to process chat request: {str(e)}'})}\n\n"
+        return
+    yield f"event: done\ndata: {json.dumps(result)}\n\n"
+
 @app.route('/find-alternatives', methods=['POST'])
 def find_alternatives():
     try:
@@ -499,12 +894,14 @@ def find_alternatives():
         if not data or 'drugs' not in data:
             return jsonify({"error": "Drug names are required"}), 400
 
+        mentions = None
         # Option 1: Use specific drug names provided in the request
         if isinstance(data['drugs'], list) and data['drugs']:
             drug_names = data['drugs']
         # Option 2: Extract from prescription text
         elif 'prescription_text' in data and data['prescription_text']:
-            drug_names = extract_drug_names(data['prescription_text'])
+            mentions = extract_drug_names(data['prescription_text'])
+            drug_names = list(dict.fromkeys(mention["name"] for mention in mentions))
         else:
             return jsonify({"error": "No valid drug names or prescription text provided"}), 400
 
@@ -514,21 +911,84 @@ def find_alternatives():
         # Find alternatives
         alternatives = fetch_alternatives(drug_names)
         
-        # Save to file
-        alternatives_data = load_json(ALTERNATIVES_FILE, {})
-        alternatives_data.update(alternatives)
-        save_json(ALTERNATIVES_FILE, alternatives_data)
-        
+        # Save to store
+        store.update_alternatives(alternatives)
+
+        if mentions is not None:
+            return jsonify({"alternatives": alternatives, "mentions": mentions})
         return jsonify({"alternatives": alternatives})
     except Exception as e:
         app.logger.error(f"Error finding alternatives: {str(e)}")
         return jsonify({"error": f"Failed to find alternatives: {str(e)}"}), 500
 
+@app.route('/admin/cache-stats', methods=['GET'])
+def cache_stats():
+    try:
+        return jsonify({"rxnav": rxnav.stats(), "analysis": analysis_cache.stats(), "llm": analyzer.stats(),
+                        "responses": versioned.stats(),
+                        "documents": doc_cache.stats(), "pharmacies": pharmacy_finder.stats(),
+                        "upload_archive": upload_archive.stats() if upload_archive is not None else None})
+    except Exception as e:
+        app.logger.error(f"Error fetching cache stats: {str(e)}")
+        return jsonify({"error": f"Failed to fetch cache stats: {str(e)}"}), 500
+
+@app.route('/admin/analysis-cache', methods=['DELETE'])
+def clear_analysis_cache():
+    try:
+        analysis_cache.clear()
+        return jsonify({"status": "success", "message": "Analysis cache cleared"})
+    except Exception as e:
+        app.logger.error(f"Error clearing analysis cache: {str(e)}")
+        return jsonify({"error": f"Failed to clear analysis cache: {str(e)}"}), 500
+
+@app.route('/admin/analysis-cache/<content_hash>', methods=['DELETE'])
+def invalidate_analysis(content_hash):
+    try:
+        if not analysis_cache.delete(analysis_cache_key(content_hash.lower())):
+            return jsonify({"error": "Entry not found"}), 404
+        return jsonify({"status": "success", "message": f"Analysis for {content_hash} invalidated"})
+    except Exception as e:
+        app.logger.error(f"Error invalidating analysis {content_hash}: {str(e)}")
+        return jsonify({"error": f"Failed to invalidate analysis: {str(e)}"}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/admin/profiler', methods=['GET', 'POST', 'DELETE'])
+def admin_profiler():
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler is disabled, set ENABLE_PROFILER=true"}), 403
+    if SERVER_WORKERS > 1:
+        return jsonify({"error": "The profiler samples a single process, run gunicorn with WEB_CONCURRENCY=1"}), 409
+    try:
+        if request.method == 'POST':
+            body = request.get_json(silent=True) or {}
+            interval = float(body.get("interval_ms", 10)) / 1000
+            duration = float(body["duration"]) if body.get("duration") else None
+            if not 0.001 <= interval <= 1:
+                raise ValueError("interval_ms must be between 1 and 1000")
+            profiler.start(interval, duration)
+            return jsonify(profiler.status())
+        if request.method == 'DELETE':
+            profiler.stop()
+        # Collapsed stacks, ready for flamegraph.pl or speedscope
+        if request.method == 'DELETE' or request.args.get('format') == 'folded':
+            return Response(profiler.folded(), mimetype="text/plain")
+        return jsonify(profiler.status())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        app.logger.error(f"Error controlling profiler: {str(e)}")
+        return jsonify({"error": f"Failed to control profiler: {str(e)}"}), 500
+
 @app.route('/get-all-alternatives', methods=['GET'])
 def get_all_alternatives():
     try:
-        alternatives_data = load_json(ALTERNATIVES_FILE, {})
-        return jsonify({"alternatives": alternatives_data})
+        return versioned.respond(request, "all-alternatives", "drug_alternatives",
+                                 lambda: {"alternatives": store.all_alternatives()})
     except Exception as e:
         app.logger.error(f"Error fetching alternatives: {str(e)}")
         return jsonify({"error": f"Failed to fetch alternatives: {str(e)}"}), 500
@@ -536,15 +996,52 @@ def get_all_alternatives():
 @app.route('/get-alternatives/<drug_name>', methods=['GET'])
 def get_drug_alternatives(drug_name):
     try:
-        alternatives_data = load_json(ALTERNATIVES_FILE, {})
-        drug_alternatives = alternatives_data.get(drug_name.lower(), [])
-        return jsonify({
-            "drug": drug_name,
-            "alternatives": drug_alternatives
-        })
+        # Case-insensitive; a brand name returns its generics and their other brands
+        return jsonify(alternatives_index.get().lookup(drug_name))
     except Exception as e:
         app.logger.error(f"Error fetching alternatives for {drug_name}: {str(e)}")
         return jsonify({"error": f"Failed to fetch alternatives: {str(e)}"}), 500
 
+@app.route('/search-alternatives', methods=['GET'])
+def search_alternatives():
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({"error": "Query parameter q is required"}), 400
+    try:
+        limit = min(int(request.args.get('limit', '10')), MAX_SEARCH_RESULTS)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    try:
+        return jsonify({"query": query, "results": alternatives_index.get().search(query, limit)})
+    except Exception as e:
+        app.logger.error(f"Error searching alternatives for {query}: {str(e)}")
+        return jsonify({"error": f"Failed to search alternatives: {str(e)}"}), 500
+
+def preload():
+    """Load every lazy dependency and model artifact now.
+
+    Call this in a pre-fork server's master process (e.g. gunicorn --preload
+    with SMARTRX_PRELOAD=1) so workers share the loaded pages copy-on-write
+    instead of each paying the cold-start cost.
+    """
+    for module in ("cv2", "pytesseract", "pypdfium2", "pandas", "prescription_pdf", "ocr"):
+        importlib.import_module(module)
+
+    for resource in (generic_table, analysis_model):
+        try:
+            resource.get()
+        except Exception as e:
+            app.logger.error(f"Preload failed: {e}")
+    # Keep preloaded objects out of future GC passes so their pages stay shared
+    gc.freeze()
+
+# Under `python App.py` the OCR pool's forkserver workers re-import this file as __mp_main__; they need no models
+if os.getenv("SMARTRX_PRELOAD", "").lower() in ("1", "true") and __name__ != "__mp_main__":
+    preload()
+
+# Development server; production runs under gunicorn with gunicorn.conf.py
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
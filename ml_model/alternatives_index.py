@@ -0,0 +1,96 @@
+import bisect
+
+from drug_matcher import normalize
+
+
+class AlternativesIndex:
+    """Case-insensitive lookups over the stored drug alternatives.
+
+    ``alternatives`` maps a generic drug to its brand names, as stored. The
+    index keeps that mapping under normalized keys, plus the reverse mapping
+    from each brand to every generic that lists it, so both directions are a
+    dict lookup. Type-ahead search bisects a sorted list of every word
+    position in every name: "pm" finds "Panadol PM" as well as names that
+    start with it.
+    """
+
+    def __init__(self, alternatives):
+        self.generics = {}
+        self.brands = {}
+        for drug, brands in alternatives.items():
+            key = normalize(drug)
+            if not key:
+                continue
+            entry = self.generics.setdefault(key, {"name": " ".join(drug.split()), "alternatives": []})
+            entry["alternatives"] = list(dict.fromkeys(entry["alternatives"] + list(brands)))
+            for brand in brands:
+                if not normalize(brand):
+                    continue
+                brand_entry = self.brands.setdefault(normalize(brand), {"name": brand, "generics": []})
+                if entry["name"] not in brand_entry["generics"]:
+                    brand_entry["generics"].append(entry["name"])
+
+        suffixes = set()
+        for kind, entries in (("generic", self.generics), ("brand", self.brands)):
+            for key in entries:
+                words = key.split(" ")
+                for i in range(len(words)):
+                    suffixes.add((" ".join(words[i:]), i > 0, kind, key))
+        self._suffixes = sorted(suffixes)
+        self._suffix_keys = [suffix[0] for suffix in self._suffixes]
+
+    def __len__(self):
+        return len(self.generics)
+
+    def alternatives(self, drug):
+        """Brand alternatives of a generic drug, or an empty list."""
+        entry = self.generics.get(normalize(drug))
+        return list(entry["alternatives"]) if entry else []
+
+    def generics_for(self, brand):
+        """Generic drugs that list ``brand`` among their alternatives."""
+        entry = self.brands.get(normalize(brand))
+        return list(entry["generics"]) if entry else []
+
+    def lookup(self, name):
+        """Everything known about ``name``, whether it is a generic, a brand or both.
+
+        Returns ``{"drug", "alternatives", "generics"}``: a brand's alternatives
+        are the other brands of its generics.
+        """
+        key = normalize(name)
+        generic = self.generics.get(key)
+        brand = self.brands.get(key)
+        generics = brand["generics"] if brand else []
+        alternatives = dict.fromkeys(generic["alternatives"] if generic else [])
+        for drug in generics:
+            alternatives.update(dict.fromkeys(alt for alt in self.generics[normalize(drug)]["alternatives"]
+                                              if normalize(alt) != key))
+        display = (generic or brand or {}).get("name", name)
+        return {"drug": display, "alternatives": list(alternatives), "generics": list(generics)}
+
+    def search(self, prefix, limit=10):
+        """Names with a word starting with ``prefix``, whole-name matches first.
+
+        Returns ``[{"name", "type", "generics"}]``; ``type`` is "generic" or "brand".
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._suffix_keys, prefix)
+        # Keys only; at most ``limit`` of either kind are kept, and results are built for the survivors
+        leading, inner = {}, {}
+        for suffix, is_inner, kind, key in self._suffixes[start:]:
+            if not suffix.startswith(prefix) or len(leading) >= limit:
+                break
+            if not is_inner:
+                leading[kind, key] = None
+                inner.pop((kind, key), None)
+            elif (kind, key) not in leading and len(inner) < limit:
+                inner[kind, key] = None
+        return [self._result(kind, key) for kind, key in [*leading, *inner][:limit]]
+
+    def _result(self, kind, key):
+        if kind == "generic":
+            return {"name": self.generics[key]["name"], "type": kind, "generics": []}
+        return {"name": self.brands[key]["name"], "type": kind, "generics": list(self.brands[key]["generics"])}
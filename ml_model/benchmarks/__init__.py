@@ -0,0 +1 @@
+"""Stand-alone benchmarks for the backend; run them from ml_model/ with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from alternatives_index import AlternativesIndex
+
+
+def synthetic_alternatives(generics, brands_per_generic, seed=0):
+    rng = random.Random(seed)
+    syllables = ["ra", "zo", "lin", "cet", "mab", "vir", "pril", "tan", "dol", "xo", "fen", "quin"]
+
+    def name():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(3, 5))).title()
+
+    brand_pool = [f"{name()} {rng.choice(['', 'PM', 'Extra', 'Forte', 'XR'])}".strip() for _ in range(generics * 5)]
+    return {name(): rng.sample(brand_pool, brands_per_generic) for _ in range(generics)}
+
+
+def per_query(label, fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    elapsed = time.perf_counter() - start
+    print(f"{label:34s} {elapsed / len(queries) * 1e6:10.1f} us/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alternatives lookups: re-reading the JSON file versus the in-memory index")
+    parser.add_argument("--generics", type=int, default=5000)
+    parser.add_argument("--brands", type=int, default=30, help="brands per generic")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    alternatives = synthetic_alternatives(args.generics, args.brands)
+    path = os.path.join(tempfile.mkdtemp(), "drug_alternatives.json")
+    with open(path, "w") as f:
+        json.dump(alternatives, f)
+
+    rng = random.Random(1)
+    generics = rng.choices(list(alternatives), k=args.queries)
+    brands = [rng.choice(alternatives[generic]) for generic in generics]
+    prefixes = [brand[:3] for brand in brands]
+
+    def old_forward(drug):
+        # The original handler: read the whole file, then look up the lowercased name
+        with open(path) as f:
+            return json.load(f).get(drug.lower(), [])
+
+    def scan_reverse(brand):
+        return [drug for drug, names in alternatives.items() if brand in names]
+
+    def scan_prefix(prefix):
+        prefix = prefix.lower()
+        return sorted({name for names in alternatives.values() for name in names if name.lower().startswith(prefix)})[:10]
+
+    start = time.perf_counter()
+    index = AlternativesIndex(alternatives)
+    print(f"{len(alternatives)} generics, {len(index.brands)} brands; index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    hits = sum(bool(old_forward(drug)) for drug in generics[:20])
+    print(f"old lookup found {hits}/20 capitalized names; index found "
+          f"{sum(bool(index.alternatives(drug)) for drug in generics[:20])}/20")
+
+    per_query("forward, re-read JSON (old)", old_forward, generics[:20])
+    per_query("forward, index", index.alternatives, generics)
+    per_query("reverse, scan", scan_reverse, brands[:20])
+    per_query("reverse, index", index.generics_for, brands)
+    per_query("prefix, scan", scan_prefix, prefixes[:20])
+    per_query("prefix, index", lambda prefix: index.search(prefix, 10), prefixes)
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import threading
+
+import requests
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+from chat import estimate_tokens
+from benchmarks.stats import percentile
+
+ML_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start_app(latency, chunk_latency, budget):
+    """Serve App.py with the stub chat model on a free port; returns the base URL."""
+    os.environ.update(GEMINI_BACKEND="stub", GEMINI_STUB_LATENCY=str(latency),
+                      GEMINI_STUB_CHUNK_LATENCY=str(chunk_latency), CHAT_TOKEN_BUDGET=str(budget))
+    os.chdir(tempfile.mkdtemp())
+    sys.path.insert(0, ML_MODEL_DIR)
+    import App
+    server = make_server("127.0.0.1", 0, App.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", App
+
+
+def blocking(url, body):
+    start = time.perf_counter()
+    data = requests.post(f"{url}/chat-gemini", json=body).json()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, data
+
+
+def streaming(url, body):
+    start = time.perf_counter()
+    first = None
+    event = None
+    with requests.post(f"{url}/chat-gemini", json={**body, "stream": True}, stream=True) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: "):
+                if first is None and event == "token":
+                    first = time.perf_counter() - start
+                if event == "done":
+                    data = json.loads(line[6:])
+    return first, time.perf_counter() - start, data
+
+
+def conversation(url, call, turns, model):
+    """Run one session of ``turns`` messages; returns first-token times, totals and prompt tokens per turn."""
+    firsts, totals, prompt_tokens = [], [], []
+    session_id = None
+    for turn in range(turns):
+        body = {"chat": f"Question {turn}: can I take paracetamol with my other medicines?"}
+        if session_id:
+            body["session_id"] = session_id
+        first, total, data = call(url, body)
+        session_id = data["session_id"]
+        firsts.append(first)
+        totals.append(total)
+        prompt_tokens.append(sum(estimate_tokens(p["text"]) for c in model.last_contents for p in c["parts"]))
+    return firsts, totals, prompt_tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time to first token and prompt size of /chat-gemini, blocking vs streaming")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub seconds before the first chunk")
+    parser.add_argument("--chunk-latency", type=float, default=0.02, help="stub seconds between chunks")
+    parser.add_argument("--budget", type=int, default=600, help="CHAT_TOKEN_BUDGET")
+    args = parser.parse_args()
+
+    url, App = start_app(args.latency, args.chunk_latency, args.budget)
+    model = App.chat_model.get()
+    for label, call in (("blocking", blocking), ("streaming", streaming)):
+        firsts, totals, tokens = conversation(url, call, args.turns, model)
+        print(f"{label:9s}  first token p50 {percentile(firsts, 50) * 1000:7.1f} ms  p99 {percentile(firsts, 99) * 1000:7.1f} ms  "
+              f"complete p50 {percentile(totals, 50) * 1000:7.1f} ms")
+    print(f"prompt tokens per turn with budget {args.budget}: first {tokens[0]}, last {tokens[-1]}, max {max(tokens)}")
@@ -0,0 +1,87 @@
+import re
+import json
+import time
+import pickle
+import random
+import argparse
+
+from drug_names import DrugNameScanner
+from drug_matcher import normalize
+from benchmarks.synthetic import SAMPLE_LINES
+
+INSTRUCTIONS = [
+    "Take one tablet after food and drink plenty of water",
+    "Avoid driving or operating machinery if drowsy",
+    "Patient should return for review after seven days",
+    "Continue the course even if symptoms improve earlier",
+    "Apply the cream twice daily over the affected area",
+]
+
+
+def old_extract(text):
+    """The previous heuristic: every word over three letters not in a small blacklist."""
+    words = re.findall(r'\b[a-zA-Z]+\b', text.lower())
+    blacklist = {"take", "tablet", "for", "days", "and", "if", "the", "a", "of", "to", "patient", "should", "is"}
+    return list(set(word for word in words if word not in blacklist and len(word) > 3))
+
+
+def vocabulary(extra, seed=0):
+    with open("medicine_mapping.json") as f:
+        mapping = json.load(f)
+    names = [row["doctor_written_name"] for row in mapping] + [row["actual_name"] for row in mapping]
+    with open("label_encoders.pkl", "rb") as f:
+        encoders = pickle.load(f)
+    names += [str(name) for column in ("MEDICINE_NAME", "GENERIC_NAME") for name in encoders[column].classes_]
+    with open("data/drug_alternatives.json") as f:
+        names += list(json.load(f))
+    # Synthetic names to show that scan time doesn't grow with the vocabulary
+    rng = random.Random(seed)
+    syllables = ["ra", "zo", "lin", "cet", "mab", "vir", "pril", "tan", "dol", "xo", "fen", "quin"]
+    names += ["".join(rng.choice(syllables) for _ in range(rng.randint(3, 5))).title() for _ in range(extra)]
+    return list(dict.fromkeys(names))
+
+
+def document(names, size, seed=0):
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        line = rng.choice(SAMPLE_LINES + INSTRUCTIONS)
+        if rng.random() < 0.3:
+            line += f" {rng.choice(names)} {rng.choice((5, 10, 250, 500))} mg"
+        parts.append(line)
+        length += len(line) + 1
+    return "\n".join(parts)
+
+
+def throughput(label, fn, text, known, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    not_drugs = sum(1 for name in result if normalize(name) not in known)
+    print(f"{label:22s} {len(text) / best / 1e6:8.2f} MB/s  {len(result):6d} names returned, "
+          f"{not_drugs:5d} not drugs  ({len(text) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drug-name extraction throughput on large prescription text")
+    parser.add_argument("--megabytes", type=float, default=2.0)
+    parser.add_argument("--extra-names", type=int, nargs="+", default=[0, 10000, 50000],
+                        help="synthetic names added to the real vocabulary")
+    args = parser.parse_args()
+
+    for extra in args.extra_names:
+        names = vocabulary(extra)
+        text = document(names, int(args.megabytes * 1e6))
+        start = time.perf_counter()
+        scanner = DrugNameScanner(names)
+        build = time.perf_counter() - start
+        patterns = sorted((re.escape(key) for key in scanner.names), key=len, reverse=True)
+        alternation = re.compile(r"\b(?:" + "|".join(patterns) + r")\b", re.IGNORECASE)
+        print(f"vocabulary {len(scanner)} names, automaton built in {build * 1000:.0f} ms")
+        throughput("old word filter", old_extract, text, scanner.names)
+        # Backtracks through every alternative at each position, so only a slice is timed
+        throughput("regex alternation", lambda t: set(alternation.findall(t)), text[:200000], scanner.names, repeat=1)
+        throughput("aho-corasick", lambda t: {match["name"] for match in scanner.find(t)}, text, scanner.names)
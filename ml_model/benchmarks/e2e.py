@@ -0,0 +1,252 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import zlib
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import requests
+from werkzeug.serving import make_server
+
+from stubs import rxnav as rxnav_stub, geoapify as geoapify_stub
+from benchmarks.stats import percentile
+from benchmarks.synthetic import SAMPLE_LINES, prescription_page
+from benchmarks.chat_stream import QuietHandler
+
+ML_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("upload", "find-alternatives", "reminders", "generate-prescription-doc", "pharmacies")
+STAGE_SAMPLE = re.compile(r'^smartrx_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+# Medicines the RxNav stub knows, plus some it answers "not found" for
+DRUGS = ["Paracetamol", "Aspirin", "Levosalbutamol", "Cetirizine", "Metformin", "Amoxicillin", "Omeprazole"]
+
+
+class StubTesseract:
+    """Stands in for ``pytesseract.image_to_string`` when the tesseract binary isn't available.
+
+    Preprocessing still runs for real; the text returned is picked from
+    ``texts`` by a checksum of the image, so distinct scans give distinct text.
+    """
+
+    def __init__(self, texts, latency):
+        self.texts = texts
+        self.latency = latency
+
+    def __call__(self, image, config=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.texts[zlib.crc32(image.tobytes()) % len(self.texts)]
+
+
+def prescription_texts(count, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        drugs = rng.sample(DRUGS, k=3)
+        lines = [f"{n}) {drug} {rng.choice((50, 75, 250, 500))} mg - {rng.choice(('once', 'twice'))} daily"
+                 for n, drug in enumerate(drugs, 1)]
+        texts.append("\n".join([SAMPLE_LINES[0], f"Patient: P{i}  Age: {20 + i % 60}  Gender: F", *lines]))
+    return texts
+
+
+def load_app(args):
+    """Start the stub servers and import App.py wired to them; returns (App, stub servers)."""
+    rxnav = rxnav_stub.start(latency=args.rxnav_latency)
+    geoapify = geoapify_stub.start(latency=args.geoapify_latency)
+    os.environ.update(
+        GEMINI_BACKEND="stub", GEMINI_STUB_LATENCY=str(args.gemini_latency),
+        RXNAV_BASE_URL=f"http://127.0.0.1:{rxnav.server_port}/REST",
+        GEOAPIFY_BASE_URL=f"http://127.0.0.1:{geoapify.server_port}", GEOAPIFY_API_KEY="stub",
+        UPLOAD_WORKERS=str(args.upload_workers), UPLOAD_QUEUE_SIZE="1024",
+    )
+    if args.model:
+        os.environ["MEDICINE_MODEL_PATH"] = os.path.abspath(args.model)
+    os.chdir(tempfile.mkdtemp())
+    sys.path.insert(0, ML_MODEL_DIR)
+    if args.ocr == "stub":
+        import pytesseract
+        pytesseract.image_to_string = StubTesseract(prescription_texts(1000), args.ocr_latency)
+    import App
+
+    # Unknown drugs are part of the mix; their "not found" warnings would drown the report
+    logging.getLogger("rxnav").setLevel(logging.ERROR)
+    seed_reminders(App, args.reminders)
+    return App, (rxnav, geoapify)
+
+
+def start_stack(args):
+    """Start the stub servers and App.py on free ports; returns (base URL, App, stub servers)."""
+    App, servers = load_app(args)
+    server = make_server("127.0.0.1", 0, App.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", App, servers
+
+
+def seed_reminders(App, count):
+    rng = random.Random(0)
+    with App.store.transaction():
+        for i in range(count):
+            App.store.insert("reminders", {
+                "medication": rng.choice(DRUGS), "title": f"Reminder {i}",
+                "date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "time": f"{rng.randint(6, 22)}:{rng.choice(('00', '30'))}",
+                "recurring": rng.choice(("none", "none", "none", "daily", "weekly", "monthly")),
+                "completed": False,
+            })
+
+
+def request_factory(scenario, count, seed=0):
+    """Return ``make(i)`` giving ``(method, path, requests kwargs)`` for request ``i``."""
+    rng = random.Random(seed)
+    if scenario == "upload":
+        images = []
+        for i in range(count):
+            image, _ = prescription_page(seed=seed * 100000 + i)
+            images.append(cv2.imencode(".png", image)[1].tobytes())
+        return lambda i: ("POST", "/upload", {"params": {"wait": "true"},
+                                              "files": {"file": (f"rx_{i}.png", images[i], "image/png")}})
+    if scenario == "find-alternatives":
+        bodies = [{"drugs": rng.sample(DRUGS, k=3)} for _ in range(count)]
+        return lambda i: ("POST", "/find-alternatives", {"json": bodies[i]})
+    if scenario == "reminders":
+        months = [rng.randint(1, 12) for _ in range(count)]
+        return lambda i: ("GET", "/reminders", {"params": {"start": f"2026-{months[i]:02d}-01",
+                                                           "end": f"2026-{months[i]:02d}-28", "limit": "50"}})
+    if scenario == "generate-prescription-doc":
+        # One payload in four repeats an earlier one, as when a user re-shares a document
+        picks = [rng.randrange(i) if i and rng.random() < 0.25 else i for i in range(count)]
+        bodies = [{
+            "patient": {"n": f"Patient {seed}-{n}", "g": "F", "e": "555-0100"},
+            "medications": [{"n": drug, "d": "500 mg", "date": "2026-01-01"} for drug in DRUGS[:n % 5 + 1]],
+            "prescriptions": [{"date": "2026-01-01", "doctor": "Dr. Vel", "structured_text": SAMPLE_LINES[2]}],
+            "timestamp": "2026-01-01",
+        } for n in picks]
+        return lambda i: ("POST", "/generate-prescription-doc", {"json": bodies[i]})
+    if scenario == "pharmacies":
+        points = [(12.9 + rng.random() * 0.2, 77.5 + rng.random() * 0.2) for _ in range(count)]
+        return lambda i: ("GET", "/api/pharmacies", {"params": {"lat": points[i][0], "lon": points[i][1]}})
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+def stage_totals(url):
+    totals = {}
+    for line in requests.get(f"{url}/metrics").text.splitlines():
+        match = STAGE_SAMPLE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            totals.setdefault(stage, {"sum": 0.0, "count": 0})[kind] = float(value)
+    return totals
+
+
+def run(url, scenario, concurrency, count, seed):
+    make = request_factory(scenario, count, seed)
+    local = threading.local()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(i):
+        nonlocal errors
+        method, path, kwargs = make(i)
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = local.session.request(method, f"{url}{path}", **kwargs)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += response.status_code >= 400
+
+    before = stage_totals(url)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(count)))
+    elapsed = time.perf_counter() - start
+    after = stage_totals(url)
+
+    stages = {}
+    for stage, total in after.items():
+        calls = total["count"] - before.get(stage, {}).get("count", 0)
+        if calls:
+            seconds = total["sum"] - before.get(stage, {}).get("sum", 0.0)
+            stages[stage] = {"calls": int(calls), "mean_ms": seconds / calls * 1000}
+    return {
+        "requests_per_s": count / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "errors": errors,
+        "stages": stages,
+    }
+
+
+def report(name, result):
+    print(f"{name:34s} {result['requests_per_s']:8.1f} req/s  p50 {result['p50_ms']:8.1f} ms  "
+          f"p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}")
+    for stage, timing in sorted(result["stages"].items(), key=lambda item: -item[1]["mean_ms"] * item[1]["calls"]):
+        print(f"    {stage:30s} {timing['mean_ms']:9.2f} ms mean  x{timing['calls']}")
+
+
+def regressions(results, baseline, threshold, min_delta_ms):
+    """Stages whose mean time grew by more than ``threshold`` (and ``min_delta_ms``) over the baseline."""
+    found = []
+    for name, result in results.items():
+        for stage, timing in result["stages"].items():
+            previous = baseline.get(name, {}).get("stages", {}).get(stage)
+            if previous is None:
+                continue
+            delta = timing["mean_ms"] - previous["mean_ms"]
+            if delta > min_delta_ms and timing["mean_ms"] > previous["mean_ms"] * (1 + threshold):
+                found.append(f"{name} {stage}: {previous['mean_ms']:.2f} ms -> {timing['mean_ms']:.2f} ms "
+                             f"(+{delta / previous['mean_ms'] * 100:.0f}%)")
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end throughput, latency and per-stage timings against local stub APIs")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario and concurrency level")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="stub Gemini seconds per call")
+    parser.add_argument("--rxnav-latency", type=float, default=0.05, help="stub RxNav seconds per request")
+    parser.add_argument("--geoapify-latency", type=float, default=0.1, help="stub Geoapify seconds per request")
+    parser.add_argument("--ocr", choices=("tesseract", "stub"), default="tesseract",
+                        help="'stub' replaces only the tesseract call, for machines without the binary")
+    parser.add_argument("--ocr-latency", type=float, default=0.2, help="seconds per page for --ocr stub")
+    parser.add_argument("--model", help="medicine_model.pkl to use for generic name prediction")
+    parser.add_argument("--upload-workers", type=int, default=2)
+    parser.add_argument("--reminders", type=int, default=5000, help="reminders seeded into the store")
+    parser.add_argument("--save", help="write the results as JSON, e.g. to use as a baseline")
+    parser.add_argument("--baseline", help="compare with saved results and exit 1 on stage regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown per stage")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    # start_stack() moves into a scratch directory
+    save, baseline = (os.path.abspath(path) if path else None for path in (args.save, args.baseline))
+
+    url, App, servers = start_stack(args)
+    results = {}
+    for scenario in args.scenarios:
+        for seed, concurrency in enumerate(args.concurrency, 1):
+            name = f"{scenario} c={concurrency}"
+            results[name] = run(url, scenario, concurrency, args.requests, seed)
+            report(name, results[name])
+
+    if save:
+        with open(save, "w") as f:
+            json.dump(results, f, indent=2)
+    if baseline:
+        with open(baseline) as f:
+            found = regressions(results, json.load(f), args.threshold, args.min_delta_ms)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print(f"No stage slowed down by more than {args.threshold:.0%} against {args.baseline}")
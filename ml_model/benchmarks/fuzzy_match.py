@@ -0,0 +1,88 @@
+import time
+import random
+import string
+import argparse
+import tracemalloc
+
+from drug_matcher import MAX_FUZZY_DISTANCE, FuzzyMatcher
+from benchmarks.stats import percentile
+
+
+def corrupt(name, edits, rng):
+    """Apply OCR-like substitutions, insertions, deletions and swaps."""
+    chars = list(name)
+    for _ in range(edits):
+        op = rng.choice("sidt")
+        i = rng.randrange(len(chars)) if chars else 0
+        if op == "s" and chars:
+            chars[i] = rng.choice(string.ascii_lowercase + "01l")
+        elif op == "i":
+            chars.insert(i, rng.choice(string.ascii_lowercase))
+        elif op == "d" and len(chars) > 1:
+            del chars[i]
+        elif op == "t" and i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def synthetic_vocabulary(size, rng):
+    syllables = ["ab", "ce", "ta", "mol", "ox", "zin", "cil", "pra", "lo", "vir", "dex", "tri", "na", "pen", "fen"]
+    names = set()
+    while len(names) < size:
+        names.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).capitalize())
+    return sorted(names)
+
+
+def run(names, queries, max_distance, k):
+    start = time.perf_counter()
+    matcher = FuzzyMatcher(names, max_distance=max_distance)
+    build = time.perf_counter() - start
+
+    # Measure memory with a second build; tracing slows allocation down
+    tracemalloc.start()
+    probe = FuzzyMatcher(names, max_distance=max_distance)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del probe
+
+    latencies = []
+    correct = 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        matches = matcher.lookup(query, k=k)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        correct += bool(matches) and matches[0][0] == expected
+
+    # What the app actually uses: best() abstains rather than guess, so wrong answers should be rare
+    answers = [matcher.best(query) for query, _ in queries]
+    right = sum(answer is not None and answer[0] == expected for answer, (_, expected) in zip(answers, queries))
+    abstained = answers.count(None)
+
+    print(f"vocabulary: {len(matcher)} names, {len(matcher.index)} index keys, max distance {max_distance}")
+    print(f"build: {build * 1000:.1f} ms, index memory: {current / 1024 ** 2:.2f} MB (peak {peak / 1024 ** 2:.2f} MB)")
+    print(f"query latency over {len(queries)} queries: p50 {percentile(latencies, 50):.1f} us, "
+          f"p99 {percentile(latencies, 99):.1f} us, max {max(latencies):.1f} us")
+    print(f"top-1 accuracy: {correct / len(queries):.3f}")
+    print(f"best(): {right / len(queries):.3f} right, {(len(queries) - right - abstained) / len(queries):.3f} wrong, "
+          f"{abstained / len(queries):.3f} abstained")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build time, memory and query latency of the fuzzy drug-name index")
+    parser.add_argument("--mapping", default="medicine_mapping.json")
+    parser.add_argument("--vocab", type=int, help="use a synthetic vocabulary of this size instead")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--max-distance", type=int, default=MAX_FUZZY_DISTANCE)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    if args.vocab:
+        names = synthetic_vocabulary(args.vocab, rng)
+    else:
+        names = list(FuzzyMatcher.from_mapping_file(args.mapping).names.values())
+    queries = []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        queries.append((corrupt(name.lower(), rng.choice([0, 1, 1, 2]), rng), name))
+    run(names, queries, args.max_distance, args.k)
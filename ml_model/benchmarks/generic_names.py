@@ -0,0 +1,74 @@
+import json
+import time
+import pickle
+import random
+import argparse
+
+import pandas as pd
+from sklearn.tree import DecisionTreeClassifier
+
+from generic_names import GenericNameTable, UNKNOWN_MEDICINE
+
+
+def per_name_predict(model, label_encoders, medicine_name):
+    # The original App.py path: array scan, one-row DataFrame, predict, inverse transform
+    if medicine_name in label_encoders["MEDICINE_NAME"].classes_:
+        medicine_encoded = label_encoders["MEDICINE_NAME"].transform([medicine_name])
+        predicted_label = model.predict(pd.DataFrame({"MEDICINE_NAME": medicine_encoded}))
+        return label_encoders["GENERIC_NAME"].inverse_transform(predicted_label)[0]
+    return UNKNOWN_MEDICINE
+
+
+def stand_in_model(label_encoders, mapping_path="medicine_mapping.json"):
+    """Fit a classifier on medicine_mapping.json when the trained model file isn't available."""
+    with open(mapping_path, "r") as f:
+        rows = json.load(f)
+    known = set(label_encoders["GENERIC_NAME"].classes_)
+    rows = [r for r in rows if r["actual_name"] in known and r["doctor_written_name"] in label_encoders["MEDICINE_NAME"].classes_]
+    X = pd.DataFrame({"MEDICINE_NAME": label_encoders["MEDICINE_NAME"].transform([r["doctor_written_name"] for r in rows])})
+    y = label_encoders["GENERIC_NAME"].transform([r["actual_name"] for r in rows])
+    return DecisionTreeClassifier(random_state=0).fit(X, y)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(model, label_encoders, names, repeat):
+    start = time.perf_counter()
+    table = GenericNameTable.from_model(model, label_encoders)
+    build = time.perf_counter() - start
+
+    old = timed(lambda: [per_name_predict(model, label_encoders, n) for n in names], repeat)
+    new = timed(lambda: table.predict_many(names), repeat)
+    assert [p["generic"] for p in table.predict_many(names)] == [per_name_predict(model, label_encoders, n) for n in names]
+
+    print(f"table build: {build * 1000:.2f} ms for {len(table)} medicines")
+    print(f"per-name path: {old * 1e6 / len(names):10.2f} us/name  ({old * 1000:.2f} ms per {len(names)} names)")
+    print(f"lookup table:  {new * 1e6 / len(names):10.2f} us/name  ({new * 1000:.3f} ms per {len(names)} names)")
+    print(f"speedup: {old / new:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-name generic prediction versus the precomputed table")
+    parser.add_argument("--model", help="trained medicine_model.pkl (default: stand-in fitted on medicine_mapping.json)")
+    parser.add_argument("--encoders", default="label_encoders.pkl")
+    parser.add_argument("--names", type=int, default=500, help="names per batch, about 20%% unknown")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.encoders, "rb") as f:
+        label_encoders = pickle.load(f)
+    if args.model:
+        with open(args.model, "rb") as f:
+            model = pickle.load(f)
+    else:
+        model = stand_in_model(label_encoders)
+
+    rng = random.Random(0)
+    known = list(label_encoders["MEDICINE_NAME"].classes_)
+    names = [rng.choice(known) if rng.random() < 0.8 else f"Unknown{i}" for i in range(args.names)]
+    run(model, label_encoders, names, args.repeat)
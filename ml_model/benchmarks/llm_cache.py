@@ -0,0 +1,88 @@
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+from cache import DiskCache, MISSING
+from llm import PROMPT, PrescriptionAnalyzer, SingleFlight, normalize_text, parse_response
+from stubs.gemini import StubGenerativeModel
+from benchmarks.stats import percentile
+from benchmarks.synthetic import SAMPLE_LINES
+
+
+class NullCache:
+    """Never hits, to measure coalescing alone."""
+
+    def get(self, key, default=MISSING):
+        return default
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class Direct:
+    """The old path: one model call per request."""
+
+    def __init__(self, model):
+        self.model = model
+        self.flight = SingleFlight()
+
+    def analyze(self, text):
+        return parse_response(self.model.generate_content(PROMPT.format(text=normalize_text(text))).text)
+
+
+def run(label, analyzer, model, texts, clients):
+    latencies = []
+    lock = threading.Lock()
+    queue = list(texts)
+
+    def client():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                text = queue.pop()
+            start = time.perf_counter()
+            analyzer.analyze(text)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:10s} {len(texts) / elapsed:8.1f} req/s  p50 {percentile(latencies, 50) * 1000:7.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  model calls {model.calls:4d}  "
+          f"coalesced {analyzer.flight.coalesced}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI analysis with and without the response cache and request coalescing")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct prescriptions among the requests")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub model seconds per call")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    prescriptions = ["\n".join(rng.sample(SAMPLE_LINES, k=5)) for _ in range(args.distinct)]
+    # Same prescriptions with OCR-style whitespace noise, which normalization absorbs
+    texts = [rng.choice(prescriptions).replace(" ", rng.choice([" ", "  "]), 1) for _ in range(args.requests)]
+
+    model = StubGenerativeModel(latency=args.latency)
+    run("direct", Direct(model), model, texts, args.clients)
+
+    model = StubGenerativeModel(latency=args.latency)
+    run("coalesced", PrescriptionAnalyzer(lambda: model, NullCache(), "stub"), model, texts, args.clients)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = StubGenerativeModel(latency=args.latency)
+        cache = DiskCache(f"{tmp}/llm.db")
+        run("cached", PrescriptionAnalyzer(lambda: model, cache, "stub"), model, texts, args.clients)
@@ -0,0 +1,44 @@
+import os
+import time
+import argparse
+import tempfile
+
+import cv2
+
+from ocr import OcrPool
+from benchmarks.synthetic import prescription_page
+
+
+def run(pages, workers_list):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(pages):
+            image, _ = prescription_page(seed=i)
+            path = os.path.join(tmp, f"page_{i}.png")
+            cv2.imwrite(path, image)
+            paths.append((path, 0))
+
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+        for workers in workers_list:
+            pool = OcrPool(workers)
+            # Warm the pool so process start-up isn't counted
+            list(pool.ocr_pages(paths[:workers]))
+            start = time.perf_counter()
+            for _, _, error in pool.ocr_pages(paths):
+                if error is not None:
+                    raise error
+            elapsed = time.perf_counter() - start
+            pool.shutdown()
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {pages / elapsed:>9.2f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Batch OCR throughput versus process pool size")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, max(cpus // 2, 1), cpus}))
+    args = parser.parse_args()
+    run(args.pages, args.workers)
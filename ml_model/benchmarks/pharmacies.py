@@ -0,0 +1,94 @@
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+import requests
+
+from cache import DiskCache
+from pharmacies import PharmacyFinder
+from stubs import geoapify
+from benchmarks.stats import percentile
+
+
+class Direct:
+    """The old path: one Geoapify call per request, no session reuse."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def nearby(self, lat, lon):
+        response = requests.get(f"{self.base_url}/v2/places", params={
+            "categories": "healthcare.pharmacy",
+            "filter": f"circle:{lon},{lat},50000",
+            "bias": f"proximity:{lon},{lat}",
+            "limit": 10,
+            "apiKey": "stub"
+        })
+        response.raise_for_status()
+        return response.json()["features"]
+
+
+def nearest_ids(lat, lon, grid):
+    return [feature["properties"]["place_id"] for feature in geoapify.pharmacies_near(lat, lon, 50000, grid)[:10]]
+
+
+def run(label, finder, server, points, clients, check=False):
+    latencies = []
+    answers = []
+    lock = threading.Lock()
+    queue = list(points)
+    served = server.requests_served
+
+    def client():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                lat, lon = queue.pop()
+            start = time.perf_counter()
+            places = finder.nearby(lat, lon)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                if check:
+                    answers.append((lat, lon, [place["id"] for place in places]))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    # Cached answers must still be the exact 10 nearest, whichever cells they came from
+    wrong = sum(ids != nearest_ids(lat, lon, server.RequestHandlerClass.grid) for lat, lon, ids in answers)
+    print(f"{label:8s} {len(points) / elapsed:8.1f} req/s  p50 {percentile(latencies, 50) * 1000:7.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  upstream calls {server.requests_served - served:5d}"
+          + (f"  not exact {wrong}" if check else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/api/pharmacies lookups with and without the geohash cell cache")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200, help="distinct user locations")
+    parser.add_argument("--spread", type=float, default=0.15, help="degrees the users are spread over")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub Geoapify seconds per call")
+    parser.add_argument("--grid", type=float, default=geoapify.GRID_DEGREES, help="degrees between stub pharmacies")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Users clustered in one city; each user refreshes a few times
+    users = [(12.9 + rng.random() * args.spread, 77.5 + rng.random() * args.spread) for _ in range(args.users)]
+    points = [rng.choice(users) for _ in range(args.requests)]
+
+    server = geoapify.start(latency=args.latency, grid=args.grid)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    run("direct", Direct(base_url), server, points, args.clients)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        finder = PharmacyFinder(DiskCache(f"{tmp}/pharmacies.db"), "stub", base_url=base_url)
+        run("tiled", finder, server, points, args.clients, check=True)
+        run("warm", finder, server, points, args.clients, check=True)
+    server.shutdown()
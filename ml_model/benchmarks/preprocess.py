@@ -0,0 +1,102 @@
+import os
+import time
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from ocr import preprocess_legacy, preprocess_adaptive, image_to_text
+from benchmarks.synthetic import prescription_page
+
+PIPELINES = {"legacy": preprocess_legacy, "adaptive": preprocess_adaptive}
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def char_accuracy(predicted, truth):
+    predicted, truth = " ".join(predicted.split()), " ".join(truth.split())
+    if not truth:
+        return 1.0 if not predicted else 0.0
+    return max(0.0, 1 - edit_distance(predicted, truth) / len(truth))
+
+
+def synthetic_samples():
+    """Pages at scan and 12 MP phone-photo sizes, with rotation, blur and sensor noise."""
+    rng = np.random.default_rng(0)
+    for seed in range(3):
+        page, truth = prescription_page(seed=seed)
+        yield f"scan-{seed}", page, truth
+
+        photo = cv2.resize(page, (3000, 4000), interpolation=cv2.INTER_CUBIC)
+        yield f"photo-{seed}", photo, truth
+
+        matrix = cv2.getRotationMatrix2D((1500, 2000), 3 + seed, 1.0)
+        skewed = cv2.warpAffine(photo, matrix, (3000, 4000), borderValue=255)
+        noisy = cv2.GaussianBlur(skewed, (5, 5), 0).astype(np.int16) + rng.normal(0, 8, skewed.shape).astype(np.int16)
+        yield f"photo-skewed-{seed}", np.clip(noisy, 0, 255).astype(np.uint8), truth
+
+
+def folder_samples(folder):
+    """Images in ``folder`` with a same-named .txt file holding the expected text."""
+    for name in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(name)
+        truth_path = os.path.join(folder, f"{stem}.txt")
+        if ext.lower() not in (".png", ".jpg", ".jpeg", ".tif", ".tiff") or not os.path.exists(truth_path):
+            continue
+        with open(truth_path, "r") as f:
+            truth = f.read()
+        yield stem, cv2.imread(os.path.join(folder, name), cv2.IMREAD_GRAYSCALE), truth
+
+
+def measure(pipeline, image, truth):
+    tracemalloc.start()
+    start = time.perf_counter()
+    processed = pipeline(image)
+    preprocess_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    text = image_to_text(processed)
+    ocr_time = time.perf_counter() - start
+    return {
+        "accuracy": char_accuracy(text, truth),
+        "preprocess_ms": preprocess_time * 1000,
+        "ocr_ms": ocr_time * 1000,
+        "peak_mb": peak / 1024 ** 2,
+        "megapixels": processed.size / 1e6,
+    }
+
+
+def run(samples):
+    totals = {name: [] for name in PIPELINES}
+    header = f"{'sample':<18} {'pipeline':<9} {'accuracy':>8} {'prep ms':>8} {'ocr ms':>8} {'peak MB':>8} {'MP':>6}"
+    print(header)
+    print("-" * len(header))
+    for label, image, truth in samples:
+        for name, pipeline in PIPELINES.items():
+            result = measure(pipeline, image, truth)
+            totals[name].append(result)
+            print(f"{label:<18} {name:<9} {result['accuracy']:>8.3f} {result['preprocess_ms']:>8.1f} "
+                  f"{result['ocr_ms']:>8.1f} {result['peak_mb']:>8.1f} {result['megapixels']:>6.1f}")
+    print("-" * len(header))
+    for name, results in totals.items():
+        mean = {key: sum(r[key] for r in results) / len(results) for key in results[0]}
+        print(f"{'mean':<18} {name:<9} {mean['accuracy']:>8.3f} {mean['preprocess_ms']:>8.1f} "
+              f"{mean['ocr_ms']:>8.1f} {mean['peak_mb']:>8.1f} {mean['megapixels']:>6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OCR accuracy, latency and memory of the legacy and adaptive preprocessing")
+    parser.add_argument("--images", help="folder of images with matching .txt ground truth (default: synthetic set)")
+    args = parser.parse_args()
+    run(folder_samples(args.images) if args.images else synthetic_samples())
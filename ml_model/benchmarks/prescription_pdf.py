@@ -0,0 +1,66 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate
+
+from cache import MemoryCache, MISSING
+from prescription_pdf import build_story, payload_hash, render
+
+
+def payload(i, rng):
+    return {
+        "patient": {"n": f"Patient {i}", "g": rng.choice("MF"), "e": "98450 00000"},
+        "medications": [{"n": f"Drug{rng.randint(0, 300)}", "d": "500 mg twice daily", "date": "2026-10-01"}
+                        for _ in range(rng.randint(2, 6))],
+        "prescriptions": [{"date": "2026-10-01", "doctor": "Dr. Vel",
+                           "structured_text": "**Medications:**\n* **Paracetamol:** 500 mg, twice daily\n" * 3}],
+        "timestamp": "2026-10-16",
+    }
+
+
+def old_render(data, folder):
+    # The previous path: a fresh stylesheet per call and a file written to docs/
+    getSampleStyleSheet()
+    path = os.path.join(folder, f"prescription_{data['patient']['n'].replace(' ', '')}{data['timestamp']}.pdf")
+    SimpleDocTemplate(path, pagesize=letter).build(build_story(data))
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def rate(label, fn, payloads):
+    start = time.perf_counter()
+    for data in payloads:
+        fn(data)
+    elapsed = time.perf_counter() - start
+    print(f"{label:30s} {len(payloads) / elapsed:9.1f} docs/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Documents per second for /generate-prescription-doc rendering")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct payloads for the cached run")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    unique = [payload(i, rng) for i in range(args.docs)]
+    repeated = [unique[rng.randrange(args.distinct)] for _ in range(args.docs)]
+    cache = MemoryCache()
+
+    def cached(data):
+        doc_id = payload_hash(data)
+        pdf = cache.get(doc_id)
+        if pdf is MISSING:
+            pdf = render(data)
+            cache.set(doc_id, pdf)
+        return pdf
+
+    render(unique[0])  # warm up imports and fonts
+    with tempfile.TemporaryDirectory() as folder:
+        rate("old (stylesheet + file)", lambda data: old_render(data, folder), unique)
+    rate("in memory, shared styles", render, unique)
+    rate(f"cached ({args.distinct} distinct payloads)", cached, repeated)
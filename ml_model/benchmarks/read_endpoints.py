@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from benchmarks.stats import percentile
+
+ML_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = fn()
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000, len(response.data), response.status_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repeat loads of /prescriptions: rebuilt, cached, compressed and 304")
+    parser.add_argument("--prescriptions", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    sys.path.insert(0, ML_MODEL_DIR)
+    import App
+    from flask import jsonify
+
+    rng = random.Random(0)
+    with App.store.transaction():
+        for i in range(args.prescriptions):
+            drugs = [f"Drug{rng.randint(0, 500)}" for _ in range(3)]
+            App.store.insert("prescriptions", {
+                "filename": f"scan_{i}.png", "date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "structured_text": "**Medications:**\n" + "\n".join(f"* **Drug{rng.randint(0, 500)}:** 500 mg" for _ in range(5)),
+                "generic_predictions": {drug: {"generic": "Generic", "matched": drug, "distance": 0} for drug in drugs},
+            })
+
+    client = App.app.test_client()
+
+    def rebuilt():
+        with App.app.test_request_context():
+            response = jsonify(App.store.all("prescriptions"))
+        return response
+
+    etag = client.get("/prescriptions").headers["ETag"]
+    results = {
+        "rebuilt every time (old)": timed(rebuilt, args.repeat),
+        "cached bytes": timed(lambda: client.get("/prescriptions"), args.repeat),
+        "cached gzip": timed(lambda: client.get("/prescriptions", headers={"Accept-Encoding": "gzip"}), args.repeat),
+        "If-None-Match (304)": timed(lambda: client.get("/prescriptions", headers={"If-None-Match": etag}), args.repeat),
+    }
+    print(f"/prescriptions with {args.prescriptions} records")
+    for label, (ms, size, status) in results.items():
+        print(f"{label:26s} {ms:8.2f} ms  {size:9d} bytes  (HTTP {status})")
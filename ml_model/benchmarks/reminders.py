@@ -0,0 +1,65 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from storage import Store
+from reminders import ReminderSchedule
+from benchmarks.stats import percentile
+
+
+def populate(store, one_offs, series, rng):
+    start = datetime(2026, 1, 1)
+    with store.transaction():
+        for i in range(one_offs):
+            due = start + timedelta(minutes=rng.randrange(365 * 24 * 60))
+            store.insert("reminders", {"title": f"Refill {i}", "date": due.strftime("%Y-%m-%d"),
+                                       "time": due.strftime("%H:%M"), "recurring": "none", "completed": False})
+        for i in range(series):
+            due = start + timedelta(days=rng.randrange(300), hours=rng.randrange(24))
+            store.insert("reminders", {"title": f"Take {i}", "date": due.strftime("%Y-%m-%d"),
+                                       "time": due.strftime("%H:%M"),
+                                       "recurring": rng.choice(["daily", "daily", "weekly", "monthly"]),
+                                       "completed": False})
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000, percentile(samples, 99) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reminder range queries, next-due and completion against store size")
+    parser.add_argument("--one-offs", type=int, default=50000)
+    parser.add_argument("--series", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Store(os.path.join(tmp, "bench.db"))
+        populate(store, args.one_offs, args.series, rng)
+        schedule = ReminderSchedule(store)
+        day = datetime(2026, 10, 16)
+
+        def full_list_filter():
+            # The old client-side path: fetch everything, filter one day
+            [r for r in store.all("reminders") if r["date"] == "2026-10-16"]
+
+        results = {
+            "full list + filter (old)": timed(full_list_filter, max(args.repeat // 10, 3)),
+            "one day, first page of 50": timed(lambda: schedule.between(day, day + timedelta(days=1)), args.repeat),
+            "next 10 due": timed(lambda: schedule.next_due(day, 10), args.repeat),
+            "complete one-off": timed(lambda: schedule.complete(rng.randrange(1, args.one_offs)), args.repeat),
+            "complete occurrence": timed(lambda: schedule.complete(args.one_offs + 1 + rng.randrange(args.series),
+                                                                   f"2026-10-{rng.randrange(1, 29):02d}"), args.repeat),
+        }
+        print(f"{args.one_offs} one-off reminders, {args.series} recurring series")
+        for label, (p50, p99) in results.items():
+            print(f"{label:28s} p50 {p50:8.2f} ms  p99 {p99:8.2f} ms")
@@ -0,0 +1,126 @@
+import os
+import time
+import signal
+import socket
+import argparse
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.e2e import load_app, request_factory, run, SCENARIOS
+from benchmarks.chat_stream import QuietHandler
+
+
+def serve_prefork(App, workers):
+    """Fork ``workers`` threaded servers sharing one listening socket, as gunicorn's gthread workers do.
+
+    Returns (base URL, worker pids).
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1024)
+    port = sock.getsockname()[1]
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                server = make_server("127.0.0.1", port, App.app, threaded=True,
+                                     request_handler=QuietHandler, fd=sock.fileno())
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    sock.close()
+    return f"http://127.0.0.1:{port}", pids
+
+
+def stop(pids):
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def cold_caches(App):
+    # Every round pays for its own Gemini and RxNav calls
+    for cache in (App.rxnav_cache, App.analysis_cache, App.llm_cache):
+        cache.clear()
+
+
+def poll_jobs(url, count, seed):
+    """Submit uploads without waiting and poll them to completion; returns the number of 404s seen."""
+    make = request_factory("upload", count, seed)
+    session = requests.Session()
+    status_urls = []
+    for i in range(count):
+        _, path, kwargs = make(i)
+        kwargs = {**kwargs, "params": {}}
+        # A fresh connection per request, so the submits spread over the workers
+        status_urls.append(requests.post(f"{url}{path}", **kwargs).json()["status_url"])
+    missing = 0
+    pending = set(status_urls)
+    while pending:
+        for status_url in list(pending):
+            response = session.get(f"{url}{status_url}", headers={"Connection": "close"})
+            missing += response.status_code == 404
+            if response.ok and response.json()["status"] in ("done", "failed"):
+                pending.discard(status_url)
+        time.sleep(0.05)
+    return missing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and tail latency versus pre-forked workers, "
+                                                 "with and without overlapping RxNav and Gemini")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["upload", "find-alternatives"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=64, help="requests per scenario and round")
+    parser.add_argument("--prefetch", choices=("on", "off", "both"), default="both",
+                        help="RXNAV_PREFETCH setting(s) to compare on /upload")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="stub Gemini seconds per call")
+    parser.add_argument("--rxnav-latency", type=float, default=0.1, help="stub RxNav seconds per request")
+    parser.add_argument("--geoapify-latency", type=float, default=0.1, help="stub Geoapify seconds per request")
+    parser.add_argument("--ocr", choices=("tesseract", "stub"), default="stub",
+                        help="'stub' replaces only the tesseract call, for machines without the binary")
+    parser.add_argument("--ocr-latency", type=float, default=0.05, help="seconds per page for --ocr stub")
+    parser.add_argument("--model", help="medicine_model.pkl to use for generic name prediction")
+    parser.add_argument("--upload-workers", type=int, default=4, help="upload job threads per worker")
+    parser.add_argument("--reminders", type=int, default=0, help="reminders seeded into the store")
+    args = parser.parse_args()
+
+    # Load everything in the parent before forking, like gunicorn --preload
+    os.environ["SMARTRX_PRELOAD"] = "1"
+    App, servers = load_app(args)
+
+    # One unmeasured round fills drug_alternatives, the vocabulary prefetching reads from
+    url, pids = serve_prefork(App, 1)
+    run(url, "upload", args.concurrency, args.requests, 0)
+    stop(pids)
+
+    print(f"stub latencies: OCR {args.ocr_latency * 1000:.0f} ms, Gemini {args.gemini_latency * 1000:.0f} ms, "
+          f"RxNav {args.rxnav_latency * 1000:.0f} ms per request (two per drug)")
+    modes = {"on": [True], "off": [False], "both": [False, True]}[args.prefetch]
+    for workers in args.workers:
+        for seed, scenario in enumerate(args.scenarios, 1):
+            for prefetch in (modes if scenario == "upload" else modes[-1:]):
+                App.RXNAV_PREFETCH = prefetch
+                cold_caches(App)
+                url, pids = serve_prefork(App, workers)
+                try:
+                    result = run(url, scenario, args.concurrency, args.requests, seed * 1000 + workers)
+                finally:
+                    stop(pids)
+                label = f"{scenario}{' prefetch' if prefetch and scenario == 'upload' else ''} workers={workers}"
+                print(f"{label:40s} {result['requests_per_s']:8.1f} req/s  p50 {result['p50_ms']:8.1f} ms  "
+                      f"p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}")
+
+    App.RXNAV_PREFETCH = modes[-1]
+    url, pids = serve_prefork(App, max(args.workers))
+    try:
+        missing = poll_jobs(url, 16, 99)
+    finally:
+        stop(pids)
+    print(f"/jobs polls answered by a worker that didn't run the job: {'all found' if not missing else f'{missing} 404s'}")
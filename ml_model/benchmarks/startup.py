@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ML_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so nothing is imported yet
+CHILD = """
+import sys, time, json
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import App
+imported = time.perf_counter()
+client = App.app.test_client()
+timings = {{"import_ms": (imported - start) * 1000}}
+for method, url, body in {requests!r}:
+    begin = time.perf_counter()
+    client.open(url, method=method, json=body)
+    timings[f"first {{method}} {{url}} ms"] = (time.perf_counter() - begin) * 1000
+    begin = time.perf_counter()
+    client.open(url, method=method, json=body)
+    timings[f"second {{method}} {{url}} ms"] = (time.perf_counter() - begin) * 1000
+heavy = ["cv2", "pandas", "sklearn", "reportlab", "google.generativeai", "pytesseract"]
+timings["heavy modules loaded"] = [m for m in heavy if m in sys.modules]
+print(json.dumps(timings))
+"""
+
+REQUESTS = [
+    ("GET", "/reminders", None),
+    ("POST", "/predict-generic", {"names": ["Aceta", "Alatrol"]}),
+]
+
+
+def measure(preload, runs):
+    env = dict(os.environ, SMARTRX_PRELOAD="1" if preload else "0")
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cwd:
+            output = subprocess.run(
+                [sys.executable, "-W", "ignore", "-c", CHILD.format(path=ML_MODEL_DIR, requests=REQUESTS)],
+                cwd=cwd, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time and first-request latency of App.py")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for preload in (False, True):
+        results = measure(preload, args.runs)
+        print(f"\n{'preload' if preload else 'lazy'} (median of {args.runs} runs)")
+        for key in results[0]:
+            values = [r[key] for r in results]
+            if isinstance(values[0], list):
+                print(f"  {key:<40} {', '.join(values[0]) or '-'}")
+            else:
+                print(f"  {key:<40} {sorted(values)[len(values) // 2]:9.1f}")
@@ -0,0 +1,26 @@
+import random
+
+import cv2
+import numpy as np
+
+SAMPLE_LINES = [
+    "Dr. Akshara Vel, SMS Hospital, Pune",
+    "Patient: A. Kumar  Age: 42  Gender: M",
+    "1) Paracetamol 500 mg - 1 tablet twice daily",
+    "2) Levosalbutamol 2 mg - 1 tablet at night",
+    "3) Aspirin 75 mg - once daily after food",
+    "Take plenty of fluids and rest for 5 days",
+    "Review after one week if symptoms persist",
+]
+
+
+def prescription_page(seed=0, width=1240, height=1754, lines=None):
+    """Render a synthetic A4-at-150-DPI prescription page; returns (grayscale image, text)."""
+    rng = random.Random(seed)
+    lines = lines or rng.sample(SAMPLE_LINES, k=len(SAMPLE_LINES))
+    image = np.full((height, width), 255, dtype=np.uint8)
+    y = 120
+    for line in lines:
+        cv2.putText(image, line, (80, y), cv2.FONT_HERSHEY_SIMPLEX, 1.1, 0, 2, cv2.LINE_AA)
+        y += rng.randint(70, 110)
+    return image, "\n".join(lines)
@@ -0,0 +1,62 @@
+import os
+import time
+import hashlib
+import argparse
+import tempfile
+
+import cv2
+
+from ocr import load_page
+from benchmarks.synthetic import prescription_page
+
+
+def old_path(data, folder, index):
+    # The previous handler: write the upload to disk while hashing, then read it back
+    path = os.path.join(folder, f"{index}_prescription.png")
+    digest = hashlib.sha256()
+    with open(path, "wb") as f:
+        for start in range(0, len(data), 64 * 1024):
+            chunk = data[start:start + 64 * 1024]
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest(), cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+
+def new_path(data):
+    return hashlib.sha256(data).hexdigest(), load_page(data)
+
+
+def per_upload(label, fn, uploads):
+    start = time.perf_counter()
+    for index, data in enumerate(uploads):
+        _, image = fn(data, index)
+        assert image is not None
+    elapsed = time.perf_counter() - start
+    print(f"{label:26s} {elapsed / len(uploads) * 1000:8.2f} ms/upload")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload handling: save to disk and imread versus imdecode from memory")
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--fsync", action="store_true", help="fsync each saved file, as on a slow or network disk")
+    args = parser.parse_args()
+
+    uploads = []
+    for seed in range(args.uploads):
+        image, _ = prescription_page(seed=seed)
+        uploads.append(cv2.imencode(".png", image)[1].tobytes())
+    print(f"{len(uploads)} PNG uploads, {sum(map(len, uploads)) / len(uploads) / 1024:.0f} KiB on average")
+
+    with tempfile.TemporaryDirectory() as folder:
+        def disk(data, index):
+            result = old_path(data, folder, index)
+            if args.fsync:
+                fd = os.open(os.path.join(folder, f"{index}_prescription.png"), os.O_RDONLY)
+                os.fsync(fd)
+                os.close(fd)
+            return result
+
+        per_upload("save + imread (old)", disk, uploads)
+        leftover = len(os.listdir(folder))
+    per_upload("imdecode from memory", lambda data, _: new_path(data), uploads)
+    print(f"old path left {leftover} files behind; the new one writes none")
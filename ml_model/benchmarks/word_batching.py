@@ -0,0 +1,77 @@
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from word_inference import DynamicBatcher, IMG_SIZE, load_model
+from benchmarks.stats import percentile
+
+
+class StandInModel:
+    """Dense softmax layer with the CNN's input shape, used when no trained model is given.
+
+    Like a real network it has a fixed per-call overhead, which is what batching amortizes.
+    """
+
+    def __init__(self, classes=200, call_overhead_ms=2.0, seed=0):
+        rng = np.random.default_rng(seed)
+        self.weights = rng.standard_normal((IMG_SIZE[0] * IMG_SIZE[1], classes)).astype(np.float32) * 0.01
+        self.call_overhead = call_overhead_ms / 1000
+
+    def predict_on_batch(self, batch):
+        time.sleep(self.call_overhead)
+        logits = batch.reshape(len(batch), -1) @ self.weights
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def run(model, clients, requests_per_client, max_batch_size, max_wait_ms):
+    batcher = DynamicBatcher(lambda batch: np.asarray(model.predict_on_batch(batch)), max_batch_size, max_wait_ms)
+    image = np.random.default_rng(1).random((IMG_SIZE[1], IMG_SIZE[0], 1), dtype=np.float32)
+    batcher.predict(image)  # warm-up
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        mine = []
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            batcher.predict(image)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    # Leave the warm-up batch out
+    mean_batch = (batcher.items - 1) / (batcher.batches - 1)
+    print(f"max batch {max_batch_size:3d}: {len(latencies) / elapsed:8.1f} words/s  "
+          f"p50 {percentile(latencies, 50) * 1000:6.2f} ms  p99 {percentile(latencies, 99) * 1000:6.2f} ms  "
+          f"mean batch {mean_batch:5.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and latency of the word classifier against batch size")
+    parser.add_argument("--model", help="model saved by pre_Ml.py (default: numpy stand-in)")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent callers")
+    parser.add_argument("--requests", type=int, default=50, help="words per caller")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32")
+    args = parser.parse_args()
+
+    if args.model:
+        model, _ = load_model(args.model)
+    else:
+        print("using numpy stand-in model (pass --model for the trained CNN)")
+        model = StandInModel()
+
+    for size in (int(s) for s in args.batch_sizes.split(",")):
+        run(model, args.clients, args.requests, size, args.max_wait_ms)
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Returned by DiskCache.get when a key is absent, so a cached None
+# (a remembered "not found") can be told apart from a miss.
+MISSING = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires) WHERE expires IS NOT NULL;
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals (id, entries, bytes)
+    SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM cache;
+CREATE TRIGGER IF NOT EXISTS cache_totals_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_totals_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_totals_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 1;
+END;
+COMMIT;
+"""
+
+# Eviction trims to this fraction of the limits, so it runs once per batch of
+# inserts rather than on every one
+EVICT_TO = 0.9
+# Access times of cache hits are written in batches of this many keys (or after
+# ACCESS_FLUSH_SECONDS), so reads don't each take SQLite's write lock
+ACCESS_FLUSH_KEYS = 256
+ACCESS_FLUSH_SECONDS = 5.0
+
+
+class DiskCache:
+    """Persistent key/value cache with TTL expiry and LRU eviction.
+
+    Values are stored as JSON in a small SQLite file so they survive restarts
+    and are shared by every worker process on the host. Eviction keeps the
+    cache under ``max_entries`` and, if given, ``max_bytes``.
+
+    Entry count and total size are kept in a one-row table by triggers, so
+    checking the limits costs one primary-key read however large the cache
+    is. LRU order is approximate: access times of hits are buffered in memory
+    and written in batches.
+    """
+
+    def __init__(self, path, max_entries=10000, max_bytes=None, default_ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._touched = {}
+        self._touched_since = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+            self._touched = {}
+        return self._conn
+
+    def _touch(self, conn, key, now):
+        self._touched[key] = now
+        if len(self._touched) >= ACCESS_FLUSH_KEYS or time.monotonic() - self._touched_since >= ACCESS_FLUSH_SECONDS:
+            self._flush_access(conn)
+
+    def _flush_access(self, conn):
+        if self._touched:
+            # One write transaction for the whole batch; in autocommit each row would be its own
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("UPDATE cache SET accessed = ? WHERE key = ?",
+                                 [(accessed, key) for key, accessed in self._touched.items()])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._touched = {}
+        self._touched_since = time.monotonic()
+
+    def _totals(self, conn):
+        return conn.execute("SELECT entries, bytes FROM cache_totals WHERE id = 1").fetchone()
+
+    def get(self, key, default=MISSING):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._touched.pop(key, None)
+                self.misses += 1
+                return default
+            self._touch(conn, key, now)
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        payload = json.dumps(value)
+        expires = now + ttl if ttl else None
+        with self._lock:
+            conn = self._connection()
+            # An upsert, not INSERT OR REPLACE, so the update trigger keeps the totals right
+            conn.execute(
+                "INSERT INTO cache (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "expires = excluded.expires, accessed = excluded.accessed",
+                (key, payload, len(payload), expires, now),
+            )
+            self._touched.pop(key, None)
+            count, total = self._totals(conn)
+            if count > self.max_entries or (self.max_bytes is not None and total > self.max_bytes):
+                self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        self._flush_access(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired entries go first, then the least recently used down to the low-water mark
+            conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+            count, total = self._totals(conn)
+            target_entries = int(self.max_entries * EVICT_TO)
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                    (count - target_entries,),
+                )
+                count, total = self._totals(conn)
+            if self.max_bytes is not None and total > self.max_bytes:
+                # Walk from least recently used until enough bytes are freed.
+                excess = total - int(self.max_bytes * EVICT_TO)
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed"):
+                    victims.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        with self._lock:
+            self._touched.pop(key, None)
+            cursor = self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        with self._lock:
+            self._touched = {}
+            self._connection().execute("DELETE FROM cache")
+
+    def stats(self):
+        with self._lock:
+            count, total = self._totals(self._connection())
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+class MemoryCache:
+    """In-process LRU for byte strings, bounded by total size and entry age.
+
+    For values that are cheap to rebuild but too large to be worth a disk round trip
+    (rendered documents, for example). Each worker process has its own.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl is not None and now - entry[1] > self.ttl):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic())
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
@@ -0,0 +1,65 @@
+import secrets
+
+from cache import MISSING
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def _text(turn):
+    return "".join(part.get("text", "") for part in turn.get("parts", []) if isinstance(part, dict))
+
+
+def message(role, text):
+    return {"role": role, "parts": [{"text": text}]}
+
+
+def trim_history(history, budget):
+    """Keep the most recent turns that fit in ``budget`` tokens.
+
+    The last turn is always kept. The result starts with a user turn, as
+    the Gemini API expects, so a dangling model reply at the cut is dropped.
+    """
+    kept = []
+    used = 0
+    for turn in reversed(history):
+        cost = estimate_tokens(_text(turn))
+        if kept and used + cost > budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    while len(kept) > 1 and kept[0].get("role") != "user":
+        kept.pop(0)
+    return kept
+
+
+class ChatSessions:
+    """Server-side chat histories, so clients don't resend the whole conversation.
+
+    Histories live in ``cache`` (see cache.DiskCache), so every worker process
+    on the host answers for every session. The cache's TTL, renewed on each
+    save, expires idle sessions and its entry limit drops the least recently
+    used ones. Stored histories are trimmed to ``max_tokens`` so they stay
+    bounded however long the conversation runs.
+    """
+
+    def __init__(self, cache, max_tokens=16000):
+        self.cache = cache
+        self.max_tokens = max_tokens
+
+    def get(self, session_id):
+        """Return the session's history, or None if it is unknown or expired."""
+        history = self.cache.get(session_id)
+        return None if history is MISSING else history
+
+    def save(self, session_id, history):
+        """Store ``history`` and return its session id, creating one when ``session_id`` is None."""
+        session_id = session_id or secrets.token_urlsafe(16)
+        self.cache.set(session_id, trim_history(history, self.max_tokens))
+        return session_id
+
+    def __len__(self):
+        return self.cache.stats()["entries"]
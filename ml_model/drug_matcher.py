@@ -0,0 +1,108 @@
+import json
+from itertools import combinations
+
+# A wrong generic name is worse than none: guess only for long names, one edit away
+MIN_FUZZY_LENGTH = 6
+MAX_FUZZY_DISTANCE = 1
+
+
+def normalize(name):
+    """Lookup key for a drug name: lowercase, single spaces. Every name index shares it."""
+    return " ".join(name.lower().split())
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance (adjacent swaps count as one edit).
+
+    Returns ``max_distance + 1`` as soon as the distance is known to exceed it.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word, max_distance):
+    """All strings reachable from ``word`` by removing up to ``max_distance`` characters."""
+    variants = {word}
+    for count in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), count):
+            variants.add("".join(c for i, c in enumerate(word) if i not in positions))
+    return variants
+
+
+class FuzzyMatcher:
+    """Approximate drug-name lookup using a symmetric-delete (SymSpell style) index.
+
+    Every known name is stored under all of its deletion variants, so a query
+    only has to generate its own deletions and verify the few candidates they
+    hit, instead of comparing against the whole vocabulary.
+    """
+
+    def __init__(self, names, max_distance=MAX_FUZZY_DISTANCE):
+        self.max_distance = max_distance
+        self.names = {}
+        self.index = {}
+        for name in names:
+            key = normalize(name)
+            if not key or key in self.names:
+                continue
+            self.names[key] = name
+            for variant in _deletes(key, max_distance):
+                self.index.setdefault(variant, []).append(key)
+
+    @classmethod
+    def from_mapping_file(cls, path, max_distance=MAX_FUZZY_DISTANCE):
+        with open(path, "r") as f:
+            rows = json.load(f)
+        return cls(dict.fromkeys(row["doctor_written_name"] for row in rows), max_distance)
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, query, k=5, max_distance=None):
+        """Return up to ``k`` ``(name, distance)`` pairs, closest first."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        key = normalize(query)
+        if key in self.names:
+            return [(self.names[key], 0)][:k]
+        seen = set()
+        matches = []
+        for variant in _deletes(key, max_distance):
+            for candidate in self.index.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(key, candidate, max_distance)
+                if distance <= max_distance:
+                    matches.append((distance, candidate))
+        matches.sort()
+        return [(self.names[candidate], distance) for distance, candidate in matches[:k]]
+
+    def best(self, query, max_distance=None):
+        """Closest known name as ``(name, distance)``, or None.
+
+        Exact matches always return. Otherwise the query must be at least
+        ``MIN_FUZZY_LENGTH`` characters, within ``max_distance`` edits, and
+        closer to one name than to any other; short or ambiguous names are not guessed.
+        """
+        key = normalize(query)
+        if key in self.names:
+            return self.names[key], 0
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None
+        matches = self.lookup(query, k=2, max_distance=max_distance)
+        if not matches or (len(matches) > 1 and matches[1][1] == matches[0][1]):
+            return None
+        return matches[0]
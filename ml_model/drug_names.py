@@ -0,0 +1,93 @@
+from collections import deque
+
+from drug_matcher import normalize
+
+
+class DrugNameScanner:
+    """Finds known drug names in free text with an Aho-Corasick automaton.
+
+    Every vocabulary name, multi-word ones included, is compiled into one
+    trie with failure links, so a scan reads the text once however large the
+    vocabulary is. Matching ignores case and treats any run of whitespace as a
+    single space. Names must not run into surrounding letters, though digits
+    may follow ("aspirin75"). Overlapping matches resolve to the leftmost,
+    longest name ("Azithromycin Dihydrate" over "Azithromycin").
+    """
+
+    def __init__(self, names, min_length=3):
+        self.names = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for name in names:
+            key = normalize(str(name))
+            if len(key) < min_length or key in self.names:
+                continue
+            self.names[key] = " ".join(str(name).split())
+            node = 0
+            for char in key:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = self._goto[node][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = child
+            self._out[node] = (key,)
+        self._link()
+
+    def _link(self):
+        # Breadth-first, so every node's failure target is final before its children need it
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                target = fail[node]
+                while target and char not in goto[target]:
+                    target = fail[target]
+                fail[child] = goto[target].get(char, 0)
+                out[child] = out[child] + out[fail[child]]
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, text):
+        """Drug names in ``text`` in reading order, as ``{"name", "text", "start", "end"}``.
+
+        ``name`` is the vocabulary spelling; ``start``/``end`` index ``text``.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        # Original index of each character fed to the automaton, to map matches back
+        origin = []
+        candidates = []
+        node = 0
+        previous_space = True
+        for index, char in enumerate(text):
+            if char.isspace():
+                if previous_space:
+                    continue
+                previous_space = True
+                chars = " "
+            else:
+                previous_space = False
+                chars = char.lower()
+            for symbol in chars:
+                origin.append(index)
+                while node and symbol not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(symbol, 0)
+                for key in out[node]:
+                    start = origin[len(origin) - len(key)]
+                    end = index + 1
+                    if (start == 0 or not text[start - 1].isalpha()) and (end == len(text) or not text[end].isalpha()):
+                        candidates.append((start, -end, key))
+
+        matches = []
+        last_end = 0
+        for start, end, key in sorted(candidates):
+            if start >= last_end:
+                last_end = -end
+                matches.append({"name": self.names[key], "text": text[start:last_end], "start": start, "end": last_end})
+        return matches
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+UNKNOWN_MEDICINE = "Unknown Medicine"
+
+
+def prediction(generic, matched=None, distance=None):
+    """A generic-name answer with the known name it came from.
+
+    ``distance`` is 0 for exact matches and the edit count for fuzzy ones;
+    both fields are None when nothing matched.
+    """
+    return {"generic": generic, "matched": matched, "distance": distance}
+
+
+class GenericNameTable:
+    """Brand -> generic lookups precomputed from the trained classifier.
+
+    The model maps one categorical input (the encoded medicine name) to a
+    generic name, so running it once over every known class gives a table
+    that answers each later query with a single dict lookup.
+
+    Names that miss the table are resolved through an optional fuzzy
+    ``matcher`` to the closest known medicine, so small OCR errors still map.
+    Every answer carries the name it matched and the edit distance, so
+    callers can tell a fuzzy match from an exact one.
+    """
+
+    def __init__(self, mapping, matcher=None, fallback=None):
+        self.mapping = mapping
+        self.matcher = matcher
+        self.fallback = fallback or {}
+
+    @classmethod
+    def from_model(cls, model, label_encoders, matcher=None, fallback=None):
+        names = label_encoders["MEDICINE_NAME"].classes_
+        encoded = label_encoders["MEDICINE_NAME"].transform(names)
+        predicted = model.predict(pd.DataFrame({"MEDICINE_NAME": encoded}))
+        generics = label_encoders["GENERIC_NAME"].inverse_transform(np.asarray(predicted))
+        return cls({str(name): str(generic) for name, generic in zip(names, generics)}, matcher, fallback)
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def __contains__(self, name):
+        return name in self.mapping
+
+    def _resolve(self, name):
+        match = self.matcher.best(name) if self.matcher is not None else None
+        if match is None:
+            return prediction(UNKNOWN_MEDICINE)
+        matched, distance = match
+        generic = self.mapping.get(matched) or self.fallback.get(matched)
+        if generic is None:
+            return prediction(UNKNOWN_MEDICINE)
+        return prediction(generic, matched, distance)
+
+    def predict(self, name):
+        generic = self.mapping.get(name)
+        return prediction(generic, name, 0) if generic is not None else self._resolve(name)
+
+    def predict_many(self, names):
+        get = self.mapping.get
+        results = [get(name) for name in names]
+        return [prediction(generic, name, 0) if generic is not None else self._resolve(name)
+                for name, generic in zip(names, results)]
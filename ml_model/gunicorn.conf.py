@@ -0,0 +1,48 @@
+# Production server for the backend; from ml_model/ run:
+#     gunicorn -c gunicorn.conf.py App:app
+#
+# Pre-forked processes give OCR and model inference every core, and threads
+# inside each worker keep requests that wait on Gemini, RxNav or Geoapify from
+# holding up the rest. The app is loaded once in the master (see App.preload)
+# and shared copy-on-write by the workers.
+import os
+import glob
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(max(min(os.cpu_count() or 1, 4), 2))))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "16"))
+# Streaming endpoints (/jobs/<id>/events, /chat-gemini) hold a thread for as long
+# as the client listens; gthread workers keep heartbeating meanwhile
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+# No max_requests: upload jobs run on threads inside the worker and would die with it
+
+os.environ.setdefault("SMARTRX_PRELOAD", "1")
+# Every worker gets its own batch OCR pool; split the cores between them
+os.environ.setdefault("OCR_PROCESSES", str(max((os.cpu_count() or 1) // workers, 1)))
+# The app refuses per-process tools such as the profiler when there are several workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Workers write metrics to files here and /metrics in any worker sums them. It
+# has to be set before the app (and prometheus_client) is imported.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "smartrx-metrics"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+accesslog = "-"
+access_log_format = '%(h)s "%(r)s" %(s)s %(b)s %(M)sms %({x-request-id}o)s'
+
+
+def on_starting(server):
+    # Files left by an earlier run would be added to this run's counters
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    # Drop the worker's live gauges; its counters and histograms keep counting towards the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
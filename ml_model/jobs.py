@@ -0,0 +1,271 @@
+import time
+import queue
+import contextvars
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+
+from cache import MISSING
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    """A unit of background work whose stage results can be polled or streamed."""
+
+    def __init__(self, job_id, on_change=None):
+        self.id = job_id
+        self.status = QUEUED
+        self.stages = OrderedDict()
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self._events = []
+        self._cond = threading.Condition()
+        self._on_change = on_change
+        self._publishing = threading.Lock()
+
+    def _emit(self, event, data):
+        with self._cond:
+            self._events.append({"event": event, "data": data})
+            index = len(self._events) - 1
+            self.updated = time.time()
+            self._cond.notify_all()
+        if self._on_change is not None:
+            # One at a time, so the last copy published is the newest
+            with self._publishing:
+                self._on_change(self, index)
+
+    def start(self):
+        with self._cond:
+            self.status = RUNNING
+        self._emit("status", {"status": RUNNING})
+
+    def add_stage(self, name, data):
+        """Record the result of a finished stage and notify listeners."""
+        with self._cond:
+            self.stages[name] = data
+        self._emit("stage", {"stage": name, "result": data})
+
+    def finish(self, result):
+        with self._cond:
+            self.result = result
+            self.status = DONE
+        self._emit(DONE, result)
+
+    def fail(self, error):
+        with self._cond:
+            self.error = error
+            self.status = FAILED
+        self._emit(FAILED, {"error": error})
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def events_since(self, index, timeout=None):
+        """Block until events after ``index`` exist (or ``timeout``); return (events, finished)."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._events) > index or self.finished, timeout)
+            return self._events[index:], self.finished
+
+    def event(self, index):
+        with self._cond:
+            return self._events[index]
+
+    def wait(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.finished, timeout)
+
+    def to_dict(self):
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stages": dict(self.stages),
+                "result": self.result,
+                "error": self.error,
+                "created": self.created,
+                "updated": self.updated,
+            }
+
+    def header(self):
+        """``to_dict()`` without the stage results, which live in the events, plus the event count."""
+        with self._cond:
+            header = self.to_dict()
+            del header["stages"]
+            header["events"] = len(self._events)
+            return header
+
+
+class SharedJob:
+    """Read-only view of a job owned by another worker process.
+
+    Built from what the owner publishes to the shared cache: a header under
+    ``job:<id>`` and each event under ``job:<id>:<n>``. The header is re-read
+    every ``poll_interval`` seconds while waiting, and only events not seen
+    yet are fetched.
+    """
+
+    def __init__(self, job_id, shared, header, poll_interval=0.25):
+        self.id = job_id
+        self._shared = shared
+        self._header = header
+        self._events = []
+        self.poll_interval = poll_interval
+        self._load_events()
+
+    @property
+    def status(self):
+        return self._header["status"]
+
+    @property
+    def result(self):
+        return self._header["result"]
+
+    @property
+    def error(self):
+        return self._header["error"]
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def _load_events(self):
+        while len(self._events) < self._header["events"]:
+            event = self._shared.get(f"job:{self.id}:{len(self._events)}")
+            if event is MISSING:
+                # Expired or evicted; the header and later polls still work
+                break
+            self._events.append(event)
+
+    def _poll(self, ready, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ready():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+            header = self._shared.get(f"job:{self.id}")
+            if header is not MISSING:
+                self._header = header
+                self._load_events()
+        return True
+
+    def events_since(self, index, timeout=None):
+        self._poll(lambda: len(self._events) > index or self.finished, timeout)
+        return self._events[index:], self.finished
+
+    def wait(self, timeout=None):
+        return self._poll(lambda: self.finished, timeout)
+
+    def to_dict(self):
+        stages = {event["data"]["stage"]: event["data"]["result"] for event in self._events
+                  if event["event"] == "stage"}
+        return {"job_id": self.id, "status": self.status, "stages": stages, "result": self.result,
+                "error": self.error, "created": self._header["created"], "updated": self._header["updated"]}
+
+
+class JobQueue:
+    """Bounded queue of jobs run by a fixed pool of daemon worker threads.
+
+    Workers start on the first submit so that pre-forked server processes each
+    get their own threads. With a ``shared`` cache (see cache.DiskCache), every
+    change to a job is also published there, so any process on the host can
+    answer for it; a poll that lands on another worker still finds the job.
+    ``on_depth`` is called with the number of waiting jobs whenever it changes.
+    """
+
+    def __init__(self, workers=2, max_queued=16, retention=200, shared=None, on_depth=None):
+        self.workers = workers
+        self.retention = retention
+        self.shared = shared
+        self.on_depth = on_depth
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for _ in range(self.workers - len(self._threads)):
+                thread = threading.Thread(target=self._work, daemon=True, name="job-worker")
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job, fn, args, context = self._queue.get()
+            if self.on_depth is not None:
+                self.on_depth(self._queue.qsize())
+            try:
+                job.start()
+                job.finish(context.run(fn, job, *args))
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                job.fail(str(e))
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        # Drop the oldest finished jobs beyond the retention limit.
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
+
+    def submit(self, fn, *args):
+        """Queue ``fn(job, *args)``; its return value becomes the job result.
+
+        Raises QueueFull when ``max_queued`` jobs are already waiting. The job
+        runs in a copy of the caller's context, so context variables such as
+        the request's trace id carry over to the worker.
+        """
+        self._ensure_workers()
+        job = Job(secrets.token_hex(8), on_change=self._publish if self.shared is not None else None)
+        if self.shared is not None:
+            # Before queueing, so this first header can't overwrite a worker's later one
+            self._publish(job)
+        with self._lock:
+            self._prune()
+            try:
+                self._queue.put_nowait((job, fn, args, contextvars.copy_context()))
+            except queue.Full:
+                if self.shared is not None:
+                    self.shared.delete(f"job:{job.id}")
+                raise QueueFull("Job queue is full")
+            self._jobs[job.id] = job
+            if self.on_depth is not None:
+                self.on_depth(self._queue.qsize())
+        return job
+
+    def _publish(self, job, index=None):
+        # The new event and a small header, so publishing costs the same however long the job runs
+        try:
+            if index is not None:
+                self.shared.set(f"job:{job.id}:{index}", job.event(index))
+            self.shared.set(f"job:{job.id}", job.header())
+        except Exception as e:
+            # Only other processes read the copy; the job itself carries on
+            logger.error(f"Error publishing job {job.id}: {e}")
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.shared is None:
+            return job
+        header = self.shared.get(f"job:{job_id}")
+        return None if header is MISSING else SharedJob(job_id, self.shared, header)
+
+    def depth(self):
+        return self._queue.qsize()
@@ -0,0 +1,57 @@
+import threading
+
+
+class Lazy:
+    """Build an expensive resource on first use, exactly once, from any thread.
+
+    ``get()`` runs ``factory`` the first time and returns the cached result
+    afterwards. A failed build is not cached, so the next call retries.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self.factory()
+                    self._loaded = True
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+
+class Versioned:
+    """A value derived from one store collection, rebuilt after that collection changes.
+
+    ``get()`` compares the collection's version (see Store.version) with the
+    one the value was built at, so an unchanged collection costs one indexed
+    read and every worker process notices writes made by the others.
+    """
+
+    def __init__(self, store, collection, factory):
+        self.store = store
+        self.collection = collection
+        self.factory = factory
+        self._value = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = self.store.version(self.collection)[0]
+        with self._lock:
+            if self._version != version:
+                self._value = self.factory()
+                self._version = version
+            return self._value
@@ -0,0 +1,155 @@
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+
+from cache import MISSING
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prompt or the response schema changes so stale answers are not reused
+PROMPT_VERSION = "2"
+
+PROMPT = """
+Extract the following prescription text into JSON with exactly these keys:
+- "patient": {{"name", "age", "gender"}}
+- "doctor": {{"name", "hospital", "license_number"}}
+- "medications": a list of {{"name", "dosage", "frequency"}}
+- "special_instructions": a list of strings (dietary advice, warnings, or extra instructions)
+Use null for anything the text does not state. Reply with JSON only.
+Prescription Text: {text}
+"""
+
+NOT_SPECIFIED = "Not specified"
+
+
+def normalize_text(text):
+    """Collapse whitespace and blank lines, which OCR varies without changing the meaning."""
+    lines = (" ".join(line.split()) for line in text.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result or error."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def _field(value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return NOT_SPECIFIED
+    return str(value).strip()
+
+
+def render_structured_text(data):
+    """Format the JSON answer as the labelled sections the frontend displays and parses."""
+    patient = data.get("patient") or {}
+    doctor = data.get("doctor") or {}
+    lines = [
+        "**Patient Information:**",
+        f"* Name: {_field(patient.get('name'))}",
+        f"* Age: {_field(patient.get('age'))}",
+        f"* Gender: {_field(patient.get('gender'))}",
+        "",
+        "**Doctor Information:**",
+        f"* Name: {_field(doctor.get('name'))}",
+        f"* Hospital/Clinic: {_field(doctor.get('hospital'))}",
+        f"* License Number: {_field(doctor.get('license_number'))}",
+        "",
+        "**Medications:**",
+    ]
+    for med in data.get("medications") or []:
+        details = ", ".join(_field(med.get(key)) for key in ("dosage", "frequency"))
+        lines.append(f"* **{_field(med.get('name'))}:** {details}")
+    lines += ["", "**Special Instructions:**"]
+    lines += [f"* {instruction}" for instruction in data.get("special_instructions") or []] or [f"* {NOT_SPECIFIED}"]
+    return "\n".join(lines)
+
+
+def parse_response(text):
+    """Turn a JSON-mode reply into ``{"structured_text", "medications"}``.
+
+    ``medications`` is the list of medicine names. Raises ValueError when the reply
+    is not the expected JSON object.
+    """
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("AI response is not a JSON object")
+    meds = [med for med in data.get("medications") or [] if isinstance(med, dict) and med.get("name")]
+    data["medications"] = meds
+    return {
+        "structured_text": render_structured_text(data),
+        "medications": list(dict.fromkeys(str(med["name"]).strip() for med in meds))
+    }
+
+
+class PrescriptionAnalyzer:
+    """Structures OCR text with an LLM, caching answers and coalescing identical requests.
+
+    Answers are cached by the normalized text, the model name and PROMPT_VERSION.
+    Identical texts submitted while a call is in flight wait for that call
+    instead of starting their own. Failed calls are not cached.
+    """
+
+    def __init__(self, get_model, cache, model_name, ttl=None):
+        self.get_model = get_model
+        self.cache = cache
+        self.model_name = model_name
+        self.ttl = ttl
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    def cache_key(self, normalized_text):
+        digest = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+        return f"v{PROMPT_VERSION}:{self.model_name}:{digest}"
+
+    def analyze(self, text):
+        normalized = normalize_text(text)
+        key = self.cache_key(normalized)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        return self.flight.do(key, lambda: self._generate(key, normalized))
+
+    def _generate(self, key, text):
+        # Another caller may have finished the same text between our miss and taking the lead
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        self.calls += 1
+        response = self.get_model().generate_content(
+            PROMPT.format(text=text),
+            generation_config={"response_mime_type": "application/json"}
+        )
+        result = parse_response(response.text or "")
+        self.cache.set(key, result, ttl=self.ttl)
+        return result
+
+    def stats(self):
+        return {**self.cache.stats(), "model_calls": self.calls, "coalesced": self.flight.coalesced}
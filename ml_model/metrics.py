@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import prometheus_client
+from prometheus_client import multiprocess
+
+# Only the samples themselves; *_created series would double the output
+prometheus_client.disable_created_metrics()
+
+# Seconds; spans a cache hit (milliseconds) up to a slow multi-page OCR or model call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Id of the request (or job) being handled, attached to every log line
+trace_id = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace_id():
+    return secrets.token_hex(8)
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds ``record.trace_id`` so formatters can include ``%(trace_id)s``."""
+
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+class _Metric:
+    """Keyword-label front for a prometheus_client metric: ``inc(stage="ocr")``."""
+
+    def __init__(self, metric):
+        self._metric = metric
+
+    def _child(self, labels):
+        return self._metric.labels(**labels) if labels else self._metric
+
+
+class Counter(_Metric):
+    def inc(self, amount=1, **labels):
+        self._child(labels).inc(amount)
+
+
+class Gauge(_Metric):
+    def set(self, value, **labels):
+        self._child(labels).set(value)
+
+
+class Histogram(_Metric):
+    def observe(self, value, **labels):
+        self._child(labels).observe(value)
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text exposition format.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set (gunicorn.conf.py does), every
+    process writes its samples to files there and ``render()`` sums them, so
+    any worker's /metrics covers all workers and the batch OCR pool.
+    Otherwise metrics are kept in this process.
+    """
+
+    def __init__(self):
+        self._registry = prometheus_client.CollectorRegistry()
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name, make):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = make()
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(name, lambda: Counter(
+            prometheus_client.Counter(name, help, labelnames, registry=self._registry)))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(name, lambda: Histogram(
+            prometheus_client.Histogram(name, help, labelnames, buckets=buckets, registry=self._registry)))
+
+    def gauge(self, name, help, labelnames=()):
+        """A gauge set by its owner; across processes, the values of live processes are summed."""
+        return self._register(name, lambda: Gauge(
+            prometheus_client.Gauge(name, help, labelnames, registry=self._registry, multiprocess_mode="livesum")))
+
+    def render(self):
+        if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            return prometheus_client.generate_latest(self._registry)
+        combined = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(combined)
+        return prometheus_client.generate_latest(combined)
+
+
+registry = Registry()
+STAGE_SECONDS = registry.histogram("smartrx_stage_duration_seconds",
+                                   "Time spent in each processing stage", ("stage",))
+STAGE_ERRORS = registry.counter("smartrx_stage_errors_total",
+                                "Processing stages that raised an exception", ("stage",))
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the block (or decorated function) under ``stage``.
+
+    Exceptions are counted in ``smartrx_stage_errors_total`` and re-raised.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
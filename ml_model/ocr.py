@@ -0,0 +1,373 @@
+import os
+import cv2
+import math
+import multiprocessing
+import struct
+import numpy as np
+import pytesseract
+import pypdfium2 as pdfium
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from metrics import timed
+from uploads import sniff_format
+
+TESSERACT_CONFIG = r'--oem 3 --psm 6'
+MULTI_PAGE_EXTENSIONS = {'tif', 'tiff'}
+
+# PDF pages are rasterized at this resolution before OCR
+PDF_DPI = int(os.getenv("PDF_DPI", "200"))
+# A text layer with fewer characters than this is treated as a scan and OCR'd
+PDF_MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", "20"))
+
+# "adaptive" sizes, crops and deskews each image; "legacy" always upscales 2x
+PREPROCESS_MODE = os.getenv("PREPROCESS_MODE", "adaptive")
+# Tesseract is most accurate with text roughly this many pixels tall
+TARGET_TEXT_HEIGHT = 32
+# Text is analysed on a copy no larger than this to keep estimation cheap
+ANALYSIS_MAX_SIDE = 1600
+
+
+# Every function taking a ``source`` accepts a file path or the bytes of an
+# upload; paths are typed by extension, bytes by their magic bytes.
+
+def _extension(path):
+    return path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+
+
+def _is_bytes(source):
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def _format(source):
+    if _is_bytes(source):
+        return sniff_format(source) or ''
+    return _extension(source)
+
+
+def _describe(source):
+    return f"{len(source)}-byte upload" if _is_bytes(source) else source
+
+
+def _tiff_page_count(data):
+    # Walk the chain of image file directories instead of decoding every page
+    order = '<' if bytes(data[:2]) == b'II' else '>'
+    offset, = struct.unpack_from(f'{order}I', data, 4)
+    pages, seen = 0, set()
+    while offset and offset not in seen and offset + 2 <= len(data):
+        seen.add(offset)
+        pages += 1
+        entries, = struct.unpack_from(f'{order}H', data, offset)
+        next_offset = offset + 2 + entries * 12
+        if next_offset + 4 > len(data):
+            break
+        offset, = struct.unpack_from(f'{order}I', data, next_offset)
+    return pages
+
+
+def count_pages(source):
+    kind = _format(source)
+    if kind == 'pdf':
+        pdf = pdfium.PdfDocument(source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    if kind in MULTI_PAGE_EXTENSIONS:
+        return max(_tiff_page_count(source) if _is_bytes(source) else cv2.imcount(source), 1)
+    return 1
+
+
+def _pdf_page_text(page):
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range().strip()
+    finally:
+        textpage.close()
+
+
+def _render_pdf_page(page, dpi=PDF_DPI):
+    bitmap = page.render(scale=dpi / 72, grayscale=True)
+    try:
+        image = bitmap.to_numpy().copy()
+    finally:
+        bitmap.close()
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.shape[2] >= 3 else image[:, :, 0]
+    return image
+
+
+def iter_pdf_pages(source, dpi=PDF_DPI, min_text_chars=PDF_MIN_TEXT_CHARS):
+    """Stream a PDF one page at a time.
+
+    Yields ``(page, text, image)``: pages with an embedded text layer give the
+    text and no image, scanned pages give a grayscale raster and no text. Only
+    the current page is ever held in memory.
+    """
+    pdf = pdfium.PdfDocument(source)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            try:
+                text = _pdf_page_text(page)
+                if len(text) >= min_text_chars:
+                    yield index, text, None
+                else:
+                    yield index, None, _render_pdf_page(page, dpi)
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+
+
+def load_page(source, page=0):
+    """Read one page of an image or PDF as grayscale, or None if it can't be decoded."""
+    kind = _format(source)
+    if kind == 'pdf':
+        pdf = pdfium.PdfDocument(source)
+        try:
+            pdf_page = pdf[page]
+            try:
+                return _render_pdf_page(pdf_page)
+            finally:
+                pdf_page.close()
+        finally:
+            pdf.close()
+    if _is_bytes(source):
+        # Decoded straight from memory; the upload never touches the disk
+        buffer = np.frombuffer(source, np.uint8)
+        if kind in MULTI_PAGE_EXTENSIONS:
+            ok, images = cv2.imdecodemulti(buffer, cv2.IMREAD_GRAYSCALE, range=(page, page + 1))
+            return images[0] if ok and images else None
+        return cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+    if kind in MULTI_PAGE_EXTENSIONS:
+        ok, images = cv2.imreadmulti(source, start=page, count=1, flags=cv2.IMREAD_GRAYSCALE)
+        return images[0] if ok and images else None
+    return cv2.imread(source, cv2.IMREAD_GRAYSCALE)
+
+
+def preprocess_legacy(image):
+    image = cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    processed = cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 2)
+    return processed
+
+
+def analyse_text_layout(image):
+    """Estimate text height, text bounding box and skew angle of a grayscale page.
+
+    Returns ``(text_height, (x, y, w, h), angle)`` in full-resolution pixels,
+    or None when no text-like components are found.
+    """
+    factor = min(1.0, ANALYSIS_MAX_SIDE / max(image.shape[:2]))
+    small = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA) if factor < 1 else image
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return None
+
+    stats = stats[1:]
+    widths, heights, areas = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT], stats[:, cv2.CC_STAT_AREA]
+    # Glyph-like components: not specks, not page borders or photos, not long rules
+    page_height = small.shape[0]
+    glyphs = (areas >= 4) & (heights >= 3) & (heights < page_height * 0.2) & (widths < heights * 8)
+    if glyphs.sum() < 5:
+        return None
+    stats = stats[glyphs]
+    text_height = float(np.median(stats[:, cv2.CC_STAT_HEIGHT])) / factor
+
+    x0 = stats[:, cv2.CC_STAT_LEFT].min()
+    y0 = stats[:, cv2.CC_STAT_TOP].min()
+    x1 = (stats[:, cv2.CC_STAT_LEFT] + stats[:, cv2.CC_STAT_WIDTH]).max()
+    y1 = (stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT]).max()
+    box = tuple(int(round(v / factor)) for v in (x0, y0, x1 - x0, y1 - y0))
+
+    # Skew: smear glyphs into line blobs and take the median angle of the long ones
+    glyph_height = max(int(np.median(stats[:, cv2.CC_STAT_HEIGHT])), 1)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (glyph_height * 2, 1))
+    lines = cv2.dilate(binary, kernel)
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    angles = []
+    for contour in contours:
+        (_, _), (rect_w, rect_h), rect_angle = cv2.minAreaRect(contour)
+        if rect_w < rect_h:
+            rect_w, rect_h = rect_h, rect_w
+            rect_angle -= 90
+        if rect_w > rect_h * 5 and rect_w > glyph_height * 6:
+            # Fold into (-45, 45]; the returned angle is the rotation that levels the lines
+            angles.append((rect_angle + 45) % 90 - 45)
+    angle = float(np.median(angles)) if angles else 0.0
+    return text_height, box, angle
+
+
+def preprocess_adaptive(image, target_text_height=TARGET_TEXT_HEIGHT, max_skew=15.0):
+    layout = analyse_text_layout(image)
+    if layout is None:
+        return preprocess_legacy(image)
+    text_height, (x, y, w, h), angle = layout
+
+    # Crop to the text region with a margin of about one line
+    margin = int(text_height * 1.5)
+    y0, y1 = max(y - margin, 0), min(y + h + margin, image.shape[0])
+    x0, x1 = max(x - margin, 0), min(x + w + margin, image.shape[1])
+    image = image[y0:y1, x0:x1]
+
+    # Deskew; larger angles are more likely layout noise than real rotation
+    if 0.5 <= abs(angle) <= max_skew:
+        rows, cols = image.shape[:2]
+        matrix = cv2.getRotationMatrix2D((cols / 2, rows / 2), angle, 1.0)
+        image = cv2.warpAffine(image, matrix, (cols, rows), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE)
+
+    # Upscale only small text and shrink oversized text instead of always doubling
+    scale = min(max(target_text_height / text_height, 0.35), 3.0)
+    if scale > 1.15:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    elif scale < 0.85:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        scale = 1.0
+
+    # Threshold window follows the (rescaled) text size
+    block = max(int(text_height * scale * 1.5) | 1, 15)
+    return cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 10)
+
+
+@timed("preprocess_image")
+def preprocess_array(image, mode=None):
+    if (mode or PREPROCESS_MODE) == "legacy":
+        return preprocess_legacy(image)
+    return preprocess_adaptive(image)
+
+
+def preprocess_image(source, page=0):
+    image = load_page(source, page)
+    if image is None:
+        raise ValueError(f"Could not read image: {_describe(source)}")
+    return preprocess_array(image)
+
+
+@timed("tesseract")
+def image_to_text(processed_image):
+    return pytesseract.image_to_string(processed_image, config=TESSERACT_CONFIG).strip()
+
+
+def _ocr_pdf_page(pdf, page):
+    pdf_page = pdf[page]
+    try:
+        text = _pdf_page_text(pdf_page)
+        if len(text) >= PDF_MIN_TEXT_CHARS:
+            return text
+        return image_to_text(preprocess_array(_render_pdf_page(pdf_page)))
+    finally:
+        pdf_page.close()
+
+
+def ocr_page(source, page=0):
+    if _format(source) == 'pdf':
+        pdf = pdfium.PdfDocument(source)
+        try:
+            return _ocr_pdf_page(pdf, page)
+        finally:
+            pdf.close()
+    return image_to_text(preprocess_image(source, page))
+
+
+def ocr_page_range(source, pages):
+    """OCR several pages of one file, opening it once.
+
+    Returns ``[(page, text, error)]`` in the order given, with exactly one of
+    text/error set, so one bad page doesn't lose the rest.
+    """
+    pdf = pdfium.PdfDocument(source) if _format(source) == 'pdf' else None
+    results = []
+    try:
+        for page in pages:
+            try:
+                text = _ocr_pdf_page(pdf, page) if pdf is not None else ocr_page(source, page)
+                results.append((page, text, None))
+            except Exception as e:
+                results.append((page, None, e))
+    finally:
+        if pdf is not None:
+            pdf.close()
+    return results
+
+
+def iter_page_texts(source):
+    """Yield ``(page, text)`` for every page of an image, multi-page TIFF or PDF, one at a time."""
+    if _format(source) == 'pdf':
+        for page, text, image in iter_pdf_pages(source):
+            yield page, text if text is not None else image_to_text(preprocess_array(image))
+        return
+    for page in range(count_pages(source)):
+        yield page, ocr_page(source, page)
+
+
+def _init_worker():
+    # One tesseract thread per process; parallelism comes from the pool itself.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+class OcrPool:
+    """Process pool that preprocesses and OCRs pages on all cores.
+
+    The executor is created on first use, and again after a fork, so each
+    server process owns its own pool. Workers come from a forkserver rather
+    than a fork of the server, which by then runs request and job threads
+    whose held locks a forked child would inherit locked.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            context = multiprocessing.get_context("forkserver")
+            # Workers fork from a server that has imported this module, not re-run __main__
+            context.set_forkserver_preload([__name__])
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_worker)
+            self._pid = os.getpid()
+        return self._executor
+
+    def ocr_pages(self, pages):
+        """OCR ``(source, page)`` pairs in parallel.
+
+        Yields ``(index, text, error)`` in completion order, where ``index``
+        is the position in ``pages`` and exactly one of text/error is set.
+
+        Pages of one file go out as contiguous chunks, at most one per
+        worker, so an uploaded file's bytes are pickled to the pool a few
+        times rather than once per page, and each chunk opens the file once.
+        Results arrive a chunk at a time.
+        """
+        executor = self._get_executor()
+        files = {}
+        for index, (source, page) in enumerate(pages):
+            # Paths compare by value; uploaded bytes by identity, to avoid hashing them
+            key = source if isinstance(source, str) else id(source)
+            files.setdefault(key, (source, []))[1].append((index, page))
+
+        futures = {}
+        for source, items in files.values():
+            size = math.ceil(len(items) / self.workers)
+            for start in range(0, len(items), size):
+                chunk = items[start:start + size]
+                future = executor.submit(ocr_page_range, source, [page for _, page in chunk])
+                futures[future] = [index for index, _ in chunk]
+        for future in as_completed(futures):
+            indexes = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                for index in indexes:
+                    yield index, None, e
+                continue
+            for index, (_, text, error) in zip(indexes, results):
+                yield index, text, error
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
@@ -0,0 +1,203 @@
+import math
+import logging
+import secrets
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import MISSING
+from llm import SingleFlight
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+GEOAPIFY_BASE_URL = "https://api.geoapify.com"
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_M = 6371008.8
+
+
+def geohash(lat, lon, precision):
+    """Standard base-32 geohash of a point; precision 5 cells are about 4.9 x 4.9 km."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        span, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (span[0] + span[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            span[0] = mid
+        else:
+            span[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def geohash_bounds(tile):
+    """``(south, west, north, east)`` of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in tile:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            span = lon_range if even else lat_range
+            mid = (span[0] + span[1]) / 2
+            if value >> shift & 1:
+                span[0] = mid
+            else:
+                span[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def geohash_cell_size(precision):
+    """``(height, width)`` in degrees of every geohash cell of this length."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_coordinates(lat, lon):
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Latitude must be within [-90, 90] and longitude within [-180, 180]")
+    return lat, lon
+
+
+class PharmacyFinder:
+    """Nearby pharmacy search that shares Geoapify lookups between nearby requests.
+
+    Places are fetched per geohash cell, not per request, so every user near
+    a cell shares its lookup. A cell asks for the ``tile_limit`` places
+    nearest its centre, out to ``radius`` past its corners, so any point in
+    the cell has its whole search circle in reach. A request starts at the
+    cell about ``radius`` across. If that cell came back full and cannot
+    vouch for the ``limit`` nearest to the point, the request moves to the
+    point's smaller cell, whose centre is closer, down to ``max_precision``
+    and at most ``max_fetches`` cells in all. Cells are cached for ``ttl``
+    seconds and concurrent misses on a cell share one upstream call.
+    """
+
+    def __init__(self, cache, api_key, base_url=GEOAPIFY_BASE_URL, radius=50000, max_precision=6,
+                 max_fetches=3, limit=10, tile_limit=50, ttl=24 * 3600, timeout=10, max_connections=8):
+        self.cache = cache
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.radius = radius
+        self.max_precision = max_precision
+        self.max_fetches = max_fetches
+        self.limit = limit
+        self.tile_limit = tile_limit
+        self.ttl = ttl
+        self.timeout = timeout
+        self.upstream_calls = 0
+        self.flight = SingleFlight()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def nearby(self, lat, lon, limit=None):
+        """Up to ``limit`` pharmacies within ``radius`` of the point, nearest first."""
+        limit = limit or self.limit
+        found = {}
+        start = self.start_precision(lat)
+        for precision in range(start, max(start, self.max_precision) + 1)[:self.max_fetches]:
+            tile = geohash(lat, lon, precision)
+            cell = self.tile_places(tile)
+            for place in cell["places"]:
+                distance = distance_m(lat, lon, place["lat"], place["lon"])
+                if distance <= self.radius:
+                    found[place["id"]] = (distance, place)
+            ranked = sorted(found.values(), key=lambda pair: pair[0])
+            # The cell holds every place within ``covered`` of its centre, so it vouches for
+            # everything within that circle less the point's distance from the centre
+            south, west, north, east = geohash_bounds(tile)
+            certain = cell["covered"] - distance_m(lat, lon, (south + north) / 2, (west + east) / 2)
+            if certain >= self.radius or len(ranked) >= limit and ranked[limit - 1][0] <= certain:
+                break
+        return [{"id": place["id"], "name": place["name"], "address": place["address"],
+                 "distance": round(distance)}
+                for distance, place in ranked[:limit]]
+
+    def start_precision(self, lat):
+        """The geohash precision whose cells at this latitude are closest to ``radius`` across."""
+        def mismatch(precision):
+            height, width = geohash_cell_size(precision)
+            across = math.hypot(height, width * math.cos(math.radians(lat))) * 111320
+            return abs(math.log(across / self.radius))
+        return min(range(1, self.max_precision + 1), key=mismatch)
+
+    def tile_places(self, tile):
+        key = f"circle:{self.radius}:{self.tile_limit}:{tile}"
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        return self.flight.do(key, lambda: self._fetch_tile(key, tile))
+
+    def _fetch_tile(self, key, tile):
+        # Another caller may have filled the tile while this one waited for the flight
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        south, west, north, east = geohash_bounds(tile)
+        lat, lon = (south + north) / 2, (west + east) / 2
+        # Cells narrow towards the poles, so the far corner is on the side nearer the equator
+        corner = max(distance_m(lat, lon, south, east), distance_m(lat, lon, north, east))
+        reach = math.ceil(self.radius + corner)
+        self.upstream_calls += 1
+        with timed("geoapify"):
+            response = self.session.get(f"{self.base_url}/v2/places", params={
+                "categories": "healthcare.pharmacy",
+                "filter": f"circle:{lon},{lat},{reach}",
+                "bias": f"proximity:{lon},{lat}",
+                "limit": self.tile_limit,
+                "apiKey": self.api_key
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            features = response.json().get("features", [])
+        places = [place for place in map(_place, features) if place is not None]
+        # A full answer is cut off at its farthest place; anything beyond may be missing
+        covered = reach if len(features) < self.tile_limit else \
+            max((distance_m(lat, lon, place["lat"], place["lon"]) for place in places), default=0)
+        cell = {"places": places, "covered": covered}
+        self.cache.set(key, cell, ttl=self.ttl)
+        return cell
+
+    def stats(self):
+        return {**self.cache.stats(), "upstream_calls": self.upstream_calls,
+                "coalesced": self.flight.coalesced}
+
+
+def _place(feature):
+    properties = feature.get("properties", {})
+    coordinates = (feature.get("geometry") or {}).get("coordinates") or [None, None]
+    lat = properties.get("lat", coordinates[1])
+    lon = properties.get("lon", coordinates[0])
+    if lat is None or lon is None:
+        logger.warning(f"Skipping pharmacy without coordinates: {properties.get('place_id')}")
+        return None
+    return {
+        "id": properties.get("place_id", f"pharm-{secrets.token_hex(4)}"),
+        "name": properties.get("name", "Unnamed Pharmacy"),
+        "address": properties.get("formatted", "Address not available"),
+        "lat": lat,
+        "lon": lon,
+    }
@@ -1,61 +1,162 @@
-import pandas as pd
-import numpy as np
 import os
-import cv2
+import json
+import time
 import pickle
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 
 
 csv_path = "/home/sbragul26/codher/training_labels.csv"  # Update this path
 image_folder = "/home/sbragul26/codher/training_words"  # Update this path
+cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "training_words")
 
-df = pd.read_csv(csv_path)
+IMG_SIZE = (128, 128)
 
-label_encoder = LabelEncoder()
-df["MEDICINE_LABEL"] = label_encoder.fit_transform(df["MEDICINE_NAME"])
 
-IMG_SIZE = (128, 128)
+def _manifest(df, image_folder):
+    """Identify the decoded cache by the image list and each file's size and mtime."""
+    files = []
+    for name in df["IMAGE"]:
+        try:
+            st = os.stat(os.path.join(image_folder, name))
+            files.append([name, st.st_size, st.st_mtime_ns])
+        except OSError:
+            files.append([name, None, None])
+    return {"img_size": list(IMG_SIZE), "files": files}
 
-image_data = []
-labels = []
 
-for index, row in df.iterrows():
-    img_path = os.path.join(image_folder, row["IMAGE"])
-    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)  
+def _decode(path):
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
     if img is None:
-        print(f"Error: Could not read image {img_path}")
-        continue
-    img = cv2.resize(img, IMG_SIZE)  
-    img = img / 255.0 
-    image_data.append(img)
-    labels.append(row["MEDICINE_LABEL"])
+        return None
+    return cv2.resize(img, IMG_SIZE)
+
+
+def build_cache(df, image_folder, cache_dir, workers=None):
+    """Decode and resize every image once into a uint8 memory-mapped array.
+
+    Returns ``(images, valid)``: an ``(N, 128, 128)`` uint8 memmap in ``df``
+    row order and a boolean mask of the rows whose image could be read. Later
+    runs reuse the cache as long as no image was added, removed or modified.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    images_path = os.path.join(cache_dir, "images.npy")
+    valid_path = os.path.join(cache_dir, "valid.npy")
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+
+    manifest = _manifest(df, image_folder)
+    if os.path.exists(manifest_path) and os.path.exists(images_path) and os.path.exists(valid_path):
+        with open(manifest_path, "r") as f:
+            if json.load(f) == manifest:
+                print(f"Using decoded image cache in {cache_dir}")
+                return np.load(images_path, mmap_mode="r"), np.load(valid_path)
+
+    start = time.perf_counter()
+    images = np.lib.format.open_memmap(images_path, mode="w+", dtype=np.uint8,
+                                       shape=(len(df), IMG_SIZE[1], IMG_SIZE[0]))
+    valid = np.zeros(len(df), dtype=bool)
+    paths = [os.path.join(image_folder, name) for name in df["IMAGE"]]
+
+    # cv2 releases the GIL while decoding, so threads use every core without pickling pixels
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for i, img in enumerate(executor.map(_decode, paths, chunksize=64)):
+            if img is None:
+                print(f"Error: Could not read image {paths[i]}")
+                continue
+            images[i] = img
+            valid[i] = True
+    images.flush()
+    del images
+
+    np.save(valid_path, valid)
+    # The manifest is written last, so an interrupted build is never mistaken for a complete one
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    print(f"Decoded {int(valid.sum())} images in {time.perf_counter() - start:.1f}s")
+    return np.load(images_path, mmap_mode="r"), valid
+
+
+def make_dataset(images, labels, indices, batch_size, shuffle):
+    """Stream ``(float32 images, labels)`` batches from the memmap, reshuffled every epoch."""
+    import tensorflow as tf
+
+    def batches():
+        order = np.random.permutation(indices) if shuffle else indices
+        for start in range(0, len(order), batch_size):
+            # Sorted indices within a batch keep reads from the memmap mostly sequential
+            batch = np.sort(order[start:start + batch_size])
+            yield images[batch], labels[batch]
+
+    dataset = tf.data.Dataset.from_generator(batches, output_signature=(
+        tf.TensorSpec((None, IMG_SIZE[1], IMG_SIZE[0]), tf.uint8),
+        tf.TensorSpec((None,), tf.int32),
+    ))
+    dataset = dataset.map(lambda x, y: (tf.cast(x[..., None], tf.float32) / 255.0, y),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def build_model(num_classes):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+
+    model = Sequential([
+        Input(shape=(128, 128, 1)),
+        Conv2D(32, (3, 3), activation='relu'),
+        MaxPooling2D(2, 2),
+        Conv2D(64, (3, 3), activation='relu'),
+        MaxPooling2D(2, 2),
+        Flatten(),
+        Dense(128, activation='relu'),
+        Dropout(0.5),
+        Dense(num_classes, activation='softmax')  # Output layer
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def labels_path_for(model_path):
+    return os.path.splitext(model_path)[0] + "_labels.pkl"
 
 
-X = np.array(image_data).reshape(-1, 128, 128, 1)
-y = np.array(labels)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the handwritten medicine-word CNN")
+    parser.add_argument("--csv", default=csv_path)
+    parser.add_argument("--images", default=image_folder)
+    parser.add_argument("--cache-dir", default=cache_dir, help="where the decoded uint8 images are kept")
+    parser.add_argument("--workers", type=int, default=None, help="decode threads (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--output", default="medicine_model.keras")
+    parser.add_argument("--prepare-only", action="store_true", help="build the image cache and stop")
+    args = parser.parse_args()
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    df = pd.read_csv(args.csv)
+    label_encoder = LabelEncoder()
+    df["MEDICINE_LABEL"] = label_encoder.fit_transform(df["MEDICINE_NAME"])
 
+    images, valid = build_cache(df, args.images, args.cache_dir, args.workers)
+    if args.prepare_only:
+        raise SystemExit(0)
 
-model = Sequential([
-    Conv2D(32, (3,3), activation='relu', input_shape=(128,128,1)),
-    MaxPooling2D(2,2),
-    Conv2D(64, (3,3), activation='relu'),
-    MaxPooling2D(2,2),
-    Flatten(),
-    Dense(128, activation='relu'),
-    Dropout(0.5),
-    Dense(len(label_encoder.classes_), activation='softmax')  # Output layer
-])
+    labels = df["MEDICINE_LABEL"].to_numpy(dtype=np.int32)
+    indices = np.flatnonzero(valid)
+    train_idx, test_idx = train_test_split(indices, test_size=0.2, random_state=42)
 
+    model = build_model(len(label_encoder.classes_))
+    model.fit(make_dataset(images, labels, train_idx, args.batch_size, shuffle=True),
+              epochs=args.epochs,
+              validation_data=make_dataset(images, labels, test_idx, args.batch_size, shuffle=False))
 
-model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-model.fit(X_train, y_train, epochs=10, validation_data=(X_test, y_test))
-with open("medicine_model.pkl", "wb") as f:
-    pickle.dump((model, label_encoder), f)
+    # Native Keras format for the network; only the label encoder is pickled
+    model.save(args.output)
+    with open(labels_path_for(args.output), "wb") as f:
+        pickle.dump(label_encoder, f)
 
-print("✅ Model training complete and saved as medicine_model.pkl")
+    print(f"✅ Model training complete and saved as {args.output} (labels in {labels_path_for(args.output)})")
@@ -5,9 +5,17 @@ import pandas as pd
 import json
 import os
 
-# 🔹 Load trained model
-with open("ml_model/medicine_model.pkl", "rb") as f:
-    model, label_encoder = pickle.load(f)
+# 🔹 Load trained model (native Keras file from pre_Ml.py, or an older pickle)
+model_path = "ml_model/medicine_model.keras"
+if os.path.exists(model_path):
+    import tensorflow as tf
+    from pre_Ml import labels_path_for
+    model = tf.keras.models.load_model(model_path)
+    with open(labels_path_for(model_path), "rb") as f:
+        label_encoder = pickle.load(f)
+else:
+    with open("ml_model/medicine_model.pkl", "rb") as f:
+        model, label_encoder = pickle.load(f)
 
 # 🔹 Load CSV file for mapping
 csv_path = "ml_model/training_labels.csv"  # Update this path
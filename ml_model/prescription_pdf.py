@@ -0,0 +1,78 @@
+import io
+import json
+import hashlib
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+
+def payload_hash(data):
+    """Content hash of a document request; equal payloads produce the same document."""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def styles():
+    # Building the sample stylesheet is a noticeable part of a small render; share one
+    return getSampleStyleSheet()
+
+
+def _paragraph(text, style):
+    # User text goes into reportlab's mini-markup, so <, > and & must be escaped
+    return Paragraph(escape(str(text)), styles()[style])
+
+
+def build_story(data):
+    patient = data.get('patient', {})
+    medications = data.get('medications', [])
+    prescriptions = data.get('prescriptions', [])
+    timestamp = data.get('timestamp')
+    story = []
+
+    # Title
+    story.append(_paragraph("Emergency Medical Information", 'Title'))
+    story.append(Spacer(1, 12))
+
+    # Patient Info
+    story.append(_paragraph(f"PATIENT: {patient.get('n', 'Unknown')}", 'Normal'))
+    if patient.get('g', 'U') != 'U':
+        story.append(_paragraph(f"GENDER: {patient.get('g')}", 'Normal'))
+    if patient.get('e', 'None') != 'None':
+        story.append(_paragraph(f"EMERGENCY CONTACT: {patient.get('e')}", 'Normal'))
+    story.append(Spacer(1, 12))
+
+    # Medications
+    story.append(_paragraph("MEDICATIONS:", 'Heading2'))
+    for i, med in enumerate(medications, 1):
+        story.append(_paragraph(f"{i}. {med.get('n', 'Unknown')}: {med.get('d', 'N/A')} ({med.get('date', 'N/A')})", 'Normal'))
+    story.append(Spacer(1, 12))
+
+    # Prescription Details
+    story.append(_paragraph("PRESCRIPTION DETAILS:", 'Heading2'))
+    for i, p in enumerate(prescriptions, 1):
+        doctor = p.get('doctor', 'Unknown')
+        story.append(_paragraph(f"{i}. Date: {p.get('date', 'N/A')}, Doctor: {doctor}", 'Normal'))
+        clean_text = str(p.get('structured_text', 'No details available')).replace('*', '')
+        story.append(_paragraph(clean_text, 'Normal'))
+        story.append(Spacer(1, 6))
+    story.append(Spacer(1, 12))
+
+    # Footer
+    story.append(_paragraph(f"Generated: {timestamp}", 'Normal'))
+    return story
+
+
+def render(data):
+    """Render the emergency information PDF for ``data`` into bytes.
+
+    ``invariant`` output leaves out the creation date and random document id,
+    so the same payload always renders to the same bytes.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, invariant=1)
+    doc.build(build_story(data))
+    return buffer.getvalue()
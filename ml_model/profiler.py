@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Low-overhead wall-clock profiler that can be switched on in a running server.
+
+    A background thread snapshots every thread's stack each ``interval``
+    seconds and counts identical stacks. ``folded()`` returns them in the
+    collapsed "frame;frame;frame count" format that flamegraph.pl and
+    speedscope read. Nothing runs while the profiler is stopped.
+    """
+
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self.interval = None
+        self.samples = 0
+        self.started = None
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.01, duration=None):
+        """Start sampling, clearing earlier samples; ``duration`` seconds stops it automatically."""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profiler is already running")
+            self._stacks.clear()
+            self.samples = 0
+            self.interval = interval
+            self.started = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,), daemon=True, name="profiler")
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self, duration):
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident != own:
+                        self._stacks[self._collapse(frame)] += 1
+                self.samples += 1
+            if deadline and time.monotonic() >= deadline:
+                break
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def folded(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def status(self):
+        with self._lock:
+            return {"running": self.running, "interval": self.interval, "started": self.started,
+                    "samples": self.samples, "stacks": len(self._stacks)}
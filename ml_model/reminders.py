@@ -0,0 +1,179 @@
+import heapq
+import calendar
+from datetime import datetime, timedelta
+
+DUE_FORMAT = "%Y-%m-%dT%H:%M"
+PERIODS = {"daily": timedelta(days=1), "weekly": timedelta(days=7)}
+RECURRENCES = ("daily", "weekly", "monthly")
+
+
+def due_key(record):
+    """``YYYY-MM-DDTHH:MM`` for a reminder's date and time, or None if the date is unusable.
+
+    The zero-padded form sorts chronologically as a string, so SQLite can index it.
+    """
+    try:
+        day = datetime.strptime(str(record.get("date")), "%Y-%m-%d")
+    except ValueError:
+        return None
+    try:
+        hour, minute = (int(part) for part in str(record.get("time") or "0:00").split(":")[:2])
+        due = day.replace(hour=hour, minute=minute)
+    except ValueError:
+        due = day
+    return due.strftime(DUE_FORMAT)
+
+
+def recurrence(record):
+    recurring = str(record.get("recurring") or "none").lower()
+    return recurring if recurring in RECURRENCES else "none"
+
+
+def parse_time(value, end=False):
+    """Parse an ISO date or datetime; a bare date used as ``end`` covers that whole day.
+
+    Reminders are due in the server's local time, so a datetime with an offset
+    is converted to it before the offset is dropped.
+    """
+    value = value.strip()
+    if len(value) == 10:
+        day = datetime.strptime(value, "%Y-%m-%d")
+        return day + timedelta(days=1) if end else day
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.replace(second=0, microsecond=0)
+
+
+def _add_months(start, months):
+    month = start.month - 1 + months
+    year = start.year + month // 12
+    month = month % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def occurrences(start, recurring, since=None):
+    """Yield the occurrences of a series from the first one at or after ``since``.
+
+    Nothing is materialized: the first index is computed arithmetically and
+    later ones are generated only as the caller consumes them.
+    """
+    since = max(since or start, start)
+    if recurring == "monthly":
+        n = max((since.year - start.year) * 12 + since.month - start.month - 1, 0)
+        while _add_months(start, n) < since:
+            n += 1
+        while True:
+            yield _add_months(start, n)
+            n += 1
+    period = PERIODS[recurring]
+    n = -((start - since) // period)  # ceil((since - start) / period)
+    while True:
+        yield start + n * period
+        n += 1
+
+
+def _occurrence(series, due, completions):
+    day = due.strftime("%Y-%m-%d")
+    return {
+        **series,
+        "date": day,
+        "time": due.strftime("%H:%M"),
+        "due": due.strftime(DUE_FORMAT),
+        "series_start": series.get("date"),
+        "completed": bool(series.get("completed")) or (series["id"], day) in completions,
+    }
+
+
+class ReminderSchedule:
+    """Range and "next due" queries over reminders, backed by the store's ``due`` index.
+
+    One-off reminders come straight from an index range scan. Recurring ones
+    are stored once as a series and expanded into occurrences lazily, merged
+    in ``(due, id)`` order, so a page only generates the occurrences it returns.
+    Completing a single occurrence is recorded separately; completing the
+    series itself ends it.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def between(self, start, end=None, limit=50, cursor=None, completed=None):
+        """Occurrences due in ``[start, end)``, ordered by time, at most ``limit`` of them.
+
+        ``cursor`` is the ``next_cursor`` of the previous page. Returns ``(items, next_cursor)``.
+        """
+        if end is None and completed is not False:
+            raise ValueError("An end time is required unless only incomplete reminders are requested")
+        after = _parse_cursor(cursor)
+        since = max(start, datetime.strptime(after[0], DUE_FORMAT)) if after else start
+        start_key = since.strftime(DUE_FORMAT)
+        end_key = end.strftime(DUE_FORMAT) if end else None
+
+        one_offs = self.store.iter_one_off_reminders(start_key, end_key, after, completed)
+        streams = [_keyed(one_offs)]
+        series_list = self.store.recurring_reminders(end_key)
+        completions = self.store.reminder_completions(
+            [s["id"] for s in series_list], since.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d") if end else None
+        )
+        for series in series_list:
+            streams.append(self._expand(series, since, end, completions))
+
+        items = []
+        for key, item in heapq.merge(*streams):
+            if after and key <= after:
+                continue
+            if completed is not None and item["completed"] != completed:
+                continue
+            items.append(item)
+            if len(items) > limit:
+                break
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = f"{items[-1]['due']}|{items[-1]['id']}"
+        return items, next_cursor
+
+    def next_due(self, after, limit=10):
+        """The next ``limit`` incomplete occurrences due at or after ``after``."""
+        items, _ = self.between(after, None, limit=limit, completed=False)
+        return items
+
+    def _expand(self, series, since, end, completions):
+        start = datetime.strptime(series["due"], DUE_FORMAT)
+        until = parse_time(series["until"], end=True) if series.get("until") else None
+        stop = min(filter(None, (end, until)), default=None)
+        for due in occurrences(start, series["recurring"], since):
+            if stop and due >= stop:
+                return
+            item = _occurrence(series, due, completions)
+            yield (item["due"], item["id"]), item
+
+    def complete(self, id, date=None):
+        """Mark a reminder done; for a recurring series, ``date`` completes just that occurrence.
+
+        Both paths are a single indexed write. Returns False if the reminder doesn't exist.
+        """
+        if date:
+            datetime.strptime(date, "%Y-%m-%d")
+            record = self.store.get("reminders", id)
+            if record is None:
+                return False
+            if recurrence(record) != "none":
+                self.store.complete_occurrence(id, date)
+                return True
+        return self.store.update("reminders", id, completed=True)
+
+
+def _keyed(records):
+    for record in records:
+        yield (record["due"], record["id"]), {**record, "completed": bool(record.get("completed"))}
+
+
+def _parse_cursor(cursor):
+    if not cursor:
+        return None
+    due, _, id = cursor.rpartition("|")
+    datetime.strptime(due, DUE_FORMAT)
+    return due, int(id)
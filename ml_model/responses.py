@@ -0,0 +1,96 @@
+import gzip
+import threading
+from email.utils import formatdate
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used when brotli isn't installed
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the headers would cost more than the saving
+MIN_COMPRESS_BYTES = 1024
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class VersionedResponses:
+    """Serve read endpoints from serialized bytes cached per collection version.
+
+    Each entry keeps the JSON body for the version it was built at, plus its
+    gzip/br encodings once requested. A write bumps the version (see
+    Store.version), which makes the next request rebuild the body. Clients
+    that send the current ETag get a 304 without anything being serialized.
+    """
+
+    def __init__(self, store, serialize):
+        self.store = store
+        self.serialize = serialize
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def respond(self, request, key, collection, build):
+        version, modified = self.store.version(collection)
+        tag = f"{self.store.instance}-{key}-{version}"
+        headers = {
+            "ETag": f'W/"{tag}"',
+            "Last-Modified": formatdate(modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if request.if_none_match:
+            if request.if_none_match.contains_weak(tag):
+                self.not_modified += 1
+                return Response(status=304, headers=headers)
+        elif request.if_modified_since and modified and int(request.if_modified_since.timestamp()) >= modified:
+            self.not_modified += 1
+            return Response(status=304, headers=headers)
+
+        entry = self._entry(key, collection, version, build)
+        encoding = self._negotiate(request, entry["identity"])
+        if encoding is None:
+            return Response(entry["identity"], mimetype="application/json", headers=headers)
+        if encoding not in entry:
+            entry[encoding] = _compress(entry["identity"], encoding)
+        return Response(entry[encoding], mimetype="application/json",
+                        headers={**headers, "Content-Encoding": encoding})
+
+    def _entry(self, key, collection, version, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["version"] == version:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        entry = {"version": version, "identity": self.serialize(build())}
+        # Only keep the body if no write landed while it was being built
+        if self.store.version(collection)[0] == version:
+            with self._lock:
+                self._entries[key] = entry
+        return entry
+
+    def _negotiate(self, request, body):
+        if len(body) < MIN_COMPRESS_BYTES:
+            return None
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def stats(self):
+        with self._lock:
+            cached_bytes = sum(len(body) for entry in self._entries.values()
+                               for name, body in list(entry.items()) if name != "version")
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified,
+                "entries": len(self._entries), "bytes": cached_bytes}
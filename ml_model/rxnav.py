@@ -0,0 +1,138 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import MISSING
+from llm import SingleFlight
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+RXNAV_BASE_URL = "https://rxnav.nlm.nih.gov/REST"
+
+
+class RxNavClient:
+    """RxNav lookups over a pooled HTTP session, backed by a persistent cache.
+
+    Both successful lookups and "not found" answers are cached; the latter get
+    the shorter ``negative_ttl`` so newly added drugs are picked up eventually.
+    Transport errors are never cached.
+
+    With an offline ``index`` (see rxnorm_index.py) names are resolved locally
+    and the network is only used for index misses when ``online_fallback`` is set.
+
+    Concurrent lookups of the same drug share one set of requests, so a
+    ``prefetch`` started early is joined, not repeated, by a later
+    ``fetch_alternatives``.
+    """
+
+    def __init__(self, cache, base_url=RXNAV_BASE_URL, max_workers=8, timeout=10,
+                 ttl=7 * 24 * 3600, negative_ttl=24 * 3600, index=None, online_fallback=True):
+        self.cache = cache
+        self.index = index
+        self.online_fallback = online_fallback
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.max_workers = max_workers
+        self.flight = SingleFlight()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Created on first use, and again after a fork, so each server process owns its threads
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rxnav")
+            self._pid = os.getpid()
+        return self._executor
+
+    def _get_json(self, path, stage):
+        with timed(stage):
+            response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+
+    def get_rxcui(self, drug_name):
+        if self.index is not None:
+            rxcui = self.index.get_rxcui(drug_name)
+            if rxcui or not self.online_fallback:
+                return rxcui
+        key = f"rxcui:{drug_name.strip().lower()}"
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        try:
+            data = self._get_json(f"/rxcui.json?name={quote(drug_name)}", "rxnav_rxcui")
+        except Exception as e:
+            logger.error(f"Error getting RxCUI for {drug_name}: {e}")
+            return None
+        rxcui = (data.get("idGroup", {}).get("rxnormId") or [None])[0]
+        self.cache.set(key, rxcui, ttl=self.ttl if rxcui else self.negative_ttl)
+        return rxcui
+
+    def get_brand_names(self, rxcui):
+        if not rxcui:
+            return []
+        if self.index is not None:
+            brands = self.index.get_brand_names(rxcui)
+            if brands or not self.online_fallback:
+                return brands
+        key = f"brands:{rxcui}"
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            return cached
+        try:
+            data = self._get_json(f"/rxcui/{quote(str(rxcui))}/related.json?tty=BN", "rxnav_brands")
+        except Exception as e:
+            logger.error(f"Error getting brand names for RxCUI {rxcui}: {e}")
+            return []
+        brands = []
+        for group in data.get("relatedGroup", {}).get("conceptGroup", []):
+            for concept in group.get("conceptProperties", []):
+                brands.append(concept["name"])
+        self.cache.set(key, brands, ttl=self.ttl if brands else self.negative_ttl)
+        return brands
+
+    def _lookup(self, drug):
+        return self.flight.do(drug.strip().lower(), lambda: self._lookup_uncoalesced(drug))
+
+    def _lookup_uncoalesced(self, drug):
+        logger.info(f"Searching alternatives for: {drug}...")
+        rxcui = self.get_rxcui(drug)
+        if not rxcui:
+            logger.warning(f"RxCUI not found for '{drug}'")
+            return []
+        brands = self.get_brand_names(rxcui)
+        if brands:
+            logger.info(f"Found {len(brands)} alternatives for '{drug}'")
+        else:
+            logger.warning(f"No brand names found for '{drug}'")
+        return brands
+
+    def fetch_alternatives(self, drug_names):
+        """Look up brand alternatives for all drugs concurrently, keeping input order."""
+        drugs = list(dict.fromkeys(drug_names))
+        results = self._get_executor().map(self._lookup, drugs)
+        return {drug: brands for drug, brands in zip(drugs, results) if brands}
+
+    def prefetch(self, drug_names):
+        """Start looking up ``drug_names`` in the background and return at once.
+
+        Results land in the cache, so callers can overlap RxNav with other
+        slow work and pick them up later with ``fetch_alternatives``.
+        """
+        executor = self._get_executor()
+        for drug in dict.fromkeys(drug_names):
+            executor.submit(self._lookup, drug)
+
+    def stats(self):
+        return {**self.cache.stats(), "coalesced": self.flight.coalesced}
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import argparse
+import threading
+
+from drug_matcher import normalize
+
+# Relationships linking an ingredient concept to its brand names, in either direction.
+TRADENAME_RELATIONS = {"tradename_of", "has_tradename"}
+
+# When several concepts share a name, prefer the one RxNav would return first.
+TTY_PRIORITY = {"IN": 0, "PIN": 1, "MIN": 2, "BN": 3, "SCD": 4, "SBD": 5, "GPCK": 6, "BPCK": 7}
+
+SCHEMA = """
+CREATE TABLE names (
+    name TEXT PRIMARY KEY,
+    rxcui TEXT NOT NULL,
+    rank INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE brands (
+    rxcui TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    brand TEXT NOT NULL,
+    PRIMARY KEY (rxcui, position)
+) WITHOUT ROWID;
+"""
+
+
+def _read_rrf(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n").split("|")
+
+
+def build_index(rrf_dir, out_path, batch_size=50000):
+    """Ingest RXNCONSO.RRF and RXNREL.RRF from an RxNorm release into a SQLite index.
+
+    Only RXNORM-sourced, unsuppressed rows are kept. Returns (names, brand links).
+    """
+    conso_path = os.path.join(rrf_dir, "RXNCONSO.RRF")
+    rel_path = os.path.join(rrf_dir, "RXNREL.RRF")
+    tmp_path = f"{out_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(SCHEMA)
+
+    # RXNCONSO: RXCUI|LAT|TS|LUI|STT|SUI|ISPREF|RXAUI|SAUI|SCUI|SDUI|SAB|TTY|CODE|STR|SRL|SUPPRESS|CVF
+    brand_names = {}
+    batch = []
+    for row in _read_rrf(conso_path):
+        rxcui, sab, tty, name, suppress = row[0], row[11], row[12], row[14], row[16]
+        if sab != "RXNORM" or suppress not in ("N", ""):
+            continue
+        if tty == "BN":
+            brand_names[rxcui] = name
+        batch.append((normalize(name), rxcui, TTY_PRIORITY.get(tty, len(TTY_PRIORITY))))
+        if len(batch) >= batch_size:
+            _insert_names(conn, batch)
+            batch = []
+    _insert_names(conn, batch)
+
+    # RXNREL: RXCUI1|RXAUI1|STYPE1|REL|RXCUI2|RXAUI2|STYPE2|RELA|RUI|SRUI|SAB|SL|DIR|RG|SUPPRESS|CVF
+    brands = {}
+    for row in _read_rrf(rel_path):
+        if row[10] != "RXNORM" or row[7] not in TRADENAME_RELATIONS:
+            continue
+        for concept, other in ((row[0], row[4]), (row[4], row[0])):
+            if other in brand_names and concept not in brand_names:
+                brands.setdefault(concept, {})[brand_names[other]] = None
+
+    links = [(rxcui, i, brand) for rxcui, names in brands.items() for i, brand in enumerate(names)]
+    conn.executemany("INSERT INTO brands (rxcui, position, brand) VALUES (?, ?, ?)", links)
+    name_count = conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, out_path)
+    return name_count, len(links)
+
+
+def _insert_names(conn, batch):
+    # Keep the highest priority concept per normalized name.
+    conn.executemany(
+        "INSERT INTO names (name, rxcui, rank) VALUES (?, ?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET rxcui = excluded.rxcui, rank = excluded.rank "
+        "WHERE excluded.rank < names.rank",
+        batch,
+    )
+
+
+class RxNormIndex:
+    """Read-only, memory-mapped lookups against an index built by ``build_index``.
+
+    ``get_rxcui`` and ``get_brand_names`` return the same shapes as the RxNav
+    based functions in App.py.
+    """
+
+    def __init__(self, path, mmap_size=256 * 1024 * 1024):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_rxcui(self, drug_name):
+        row = self._connection().execute(
+            "SELECT rxcui FROM names WHERE name = ?", (normalize(drug_name),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_brand_names(self, rxcui):
+        if not rxcui:
+            return []
+        rows = self._connection().execute(
+            "SELECT brand FROM brands WHERE rxcui = ? ORDER BY position", (str(rxcui),)
+        )
+        return [row[0] for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline RxNorm brand-name index")
+    parser.add_argument("rrf_dir", help="directory containing RXNCONSO.RRF and RXNREL.RRF (the release's rrf/ folder)")
+    parser.add_argument("--out", default=os.path.join("data", "rxnorm.db"), help="output index path")
+    args = parser.parse_args()
+
+    names, links = build_index(args.rrf_dir, args.out)
+    print(f"Indexed {names} names and {links} brand links into {args.out}")
@@ -0,0 +1,387 @@
+import os
+import json
+import secrets
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+
+from reminders import due_key, recurrence
+
+# Collections stored as rows with an indexed primary key and date; the full
+# record is kept as a JSON body so existing fields round-trip unchanged.
+COLLECTIONS = ("prescriptions", "medications", "reminders")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prescriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_date ON prescriptions(date);
+
+CREATE TABLE IF NOT EXISTS medications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    date TEXT,
+    body TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_date ON reminders(date);
+
+-- Occurrences of recurring reminders that were completed individually
+CREATE TABLE IF NOT EXISTS reminder_completions (
+    reminder_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (reminder_id, date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS drug_alternatives (
+    drug TEXT PRIMARY KEY,
+    brands TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Reminder columns derived from the body so due-time queries can use an index.
+# Added by migration, since databases created before them lack the columns.
+REMINDER_COLUMNS = {"due": "TEXT", "recurring": "TEXT", "completed": "INTEGER"}
+
+REMINDER_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(recurring, due, id);
+"""
+
+# Every write bumps a per-collection version through triggers, so all write
+# paths (and every worker process) agree on when cached responses went stale.
+VERSIONED_TABLES = {
+    "prescriptions": "prescriptions",
+    "medications": "medications",
+    "reminders": "reminders",
+    "reminder_completions": "reminders",
+    "drug_alternatives": "drug_alternatives",
+}
+
+VERSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    collection TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    modified INTEGER NOT NULL DEFAULT 0
+);
+""" + "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS bump_{table}_{op.lower()} AFTER {op} ON {table}
+BEGIN
+    INSERT INTO versions (collection, version, modified) VALUES ('{collection}', 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ON CONFLICT(collection) DO UPDATE SET version = version + 1, modified = excluded.modified;
+END;
+"""
+    for table, collection in VERSIONED_TABLES.items()
+    for op in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+def _check_collection(collection):
+    if collection not in COLLECTIONS:
+        raise ValueError(f"Unknown collection: {collection}")
+
+
+def _row_to_record(row):
+    record = json.loads(row["body"])
+    record["id"] = row["id"]
+    return record
+
+
+def _columns(collection, record):
+    """Indexed column values stored alongside the JSON body."""
+    columns = {"date": record.get("date")}
+    if collection == "medications":
+        columns["name"] = record.get("name")
+    elif collection == "reminders":
+        columns["due"] = due_key(record)
+        columns["recurring"] = recurrence(record)
+        columns["completed"] = int(bool(record.get("completed")))
+    return columns
+
+
+def _reminder(row):
+    record = _row_to_record(row)
+    record["due"] = row["due"]
+    record["recurring"] = row["recurring"]
+    return record
+
+
+class Store:
+    """SQLite-backed storage for prescriptions, medications, reminders and alternatives.
+
+    Each thread gets its own connection; the database runs in WAL mode so readers
+    never block the single writer, and writes go through ``transaction()``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+        conn.executescript(VERSIONS_SCHEMA)
+        # Identifies this database, so versions from a replaced file never look current
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', ?)", (secrets.token_hex(4),))
+        self.instance = conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()["value"]
+
+    def _migrate(self, conn):
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(reminders)")}
+        missing = [name for name in REMINDER_COLUMNS if name not in existing]
+        if missing:
+            with self.transaction():
+                for name in missing:
+                    conn.execute(f"ALTER TABLE reminders ADD COLUMN {name} {REMINDER_COLUMNS[name]}")
+                rows = conn.execute("SELECT id, body FROM reminders").fetchall()
+                conn.executemany(
+                    "UPDATE reminders SET due = :due, recurring = :recurring, completed = :completed WHERE id = :id",
+                    [{**_columns("reminders", json.loads(row["body"])), "id": row["id"]} for row in rows],
+                )
+        conn.executescript(REMINDER_INDEXES)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork, so pre-forked workers open their own.
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed writes atomically; nested calls join the outer transaction."""
+        conn = self._connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        # IMMEDIATE takes the write lock up front so concurrent workers queue
+        # instead of failing on lock upgrade half way through.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def version(self, collection):
+        """``(version, modified)`` of a collection; both grow with every write to it."""
+        row = self._connection().execute(
+            "SELECT version, modified FROM versions WHERE collection = ?", (collection,)
+        ).fetchone()
+        return (row["version"], row["modified"]) if row else (0, 0)
+
+    # Collections
+
+    def all(self, collection):
+        _check_collection(collection)
+        rows = self._connection().execute(f"SELECT id, body FROM {collection} ORDER BY id")
+        return [_row_to_record(row) for row in rows]
+
+    def get(self, collection, id):
+        _check_collection(collection)
+        row = self._connection().execute(f"SELECT id, body FROM {collection} WHERE id = ?", (id,)).fetchone()
+        return _row_to_record(row) if row else None
+
+    def between(self, collection, start, end):
+        """Return records whose date falls in [start, end] (ISO date strings)."""
+        _check_collection(collection)
+        rows = self._connection().execute(
+            f"SELECT id, body FROM {collection} WHERE date BETWEEN ? AND ? ORDER BY date, id", (start, end)
+        )
+        return [_row_to_record(row) for row in rows]
+
+    def insert(self, collection, record):
+        """Insert a record and return it with its newly assigned id.
+
+        Ids come from AUTOINCREMENT, so they are never reused after a delete.
+        """
+        _check_collection(collection)
+        record = {k: v for k, v in record.items() if k != "id"}
+        columns = {**_columns(collection, record), "body": json.dumps(record)}
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO {collection} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                list(columns.values()),
+            )
+        return {"id": cursor.lastrowid, **record}
+
+    def add_medication(self, record):
+        """Insert a medication unless one with the same name exists; return the stored row."""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT id, body FROM medications WHERE name = ?", (record.get("name"),)).fetchone()
+            if row:
+                return _row_to_record(row)
+            return self.insert("medications", record)
+
+    def update(self, collection, id, **fields):
+        """Merge ``fields`` into one record. Returns False if the id does not exist."""
+        _check_collection(collection)
+        with self.transaction() as conn:
+            row = conn.execute(f"SELECT id, body FROM {collection} WHERE id = ?", (id,)).fetchone()
+            if row is None:
+                return False
+            record = json.loads(row["body"])
+            record.update(fields)
+            record.pop("id", None)
+            columns = {**_columns(collection, record), "body": json.dumps(record)}
+            conn.execute(
+                f"UPDATE {collection} SET {', '.join(f'{name} = ?' for name in columns)} WHERE id = ?",
+                [*columns.values(), id],
+            )
+        return True
+
+    def delete(self, collection, id):
+        _check_collection(collection)
+        with self.transaction() as conn:
+            cursor = conn.execute(f"DELETE FROM {collection} WHERE id = ?", (id,))
+            if collection == "reminders":
+                conn.execute("DELETE FROM reminder_completions WHERE reminder_id = ?", (id,))
+        return cursor.rowcount > 0
+
+    def page(self, collection, after_id=0, limit=50):
+        """Up to ``limit`` records with ids greater than ``after_id``, in id order."""
+        _check_collection(collection)
+        rows = self._connection().execute(
+            f"SELECT id, body FROM {collection} WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        )
+        return [_row_to_record(row) for row in rows]
+
+    # Reminder schedule (see reminders.py)
+
+    def iter_one_off_reminders(self, start, end=None, after=None, completed=None):
+        """Yield non-recurring reminders due in ``[start, end)`` in ``(due, id)`` order.
+
+        Rows are streamed from the index, so callers that stop early read only what they use.
+        ``after`` is a ``(due, id)`` pair to resume after.
+        """
+        sql = "SELECT id, body, due, recurring FROM reminders WHERE recurring = 'none' AND due >= ?"
+        params = [start]
+        if completed is not None:
+            sql += " AND completed = ?"
+            params.append(int(completed))
+        if end is not None:
+            sql += " AND due < ?"
+            params.append(end)
+        if after is not None:
+            sql += " AND (due, id) > (?, ?)"
+            params += list(after)
+        sql += " ORDER BY due, id"
+        for row in self._connection().execute(sql, params):
+            yield _reminder(row)
+
+    def recurring_reminders(self, before=None):
+        """Active (not completed) recurring series that start before ``before``."""
+        sql = "SELECT id, body, due, recurring FROM reminders WHERE recurring IN ('daily', 'weekly', 'monthly') AND completed = 0"
+        params = []
+        if before is not None:
+            sql += " AND due < ?"
+            params.append(before)
+        return [_reminder(row) for row in self._connection().execute(sql, params)]
+
+    def reminder_completions(self, ids, start, end=None):
+        """``{(reminder_id, date)}`` of occurrences completed between ``start`` and ``end`` (dates)."""
+        if not ids:
+            return set()
+        sql = ("SELECT reminder_id, date FROM reminder_completions WHERE reminder_id IN "
+               "(SELECT value FROM json_each(?)) AND date >= ?")
+        params = [json.dumps(ids), start]
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(end)
+        return {(row["reminder_id"], row["date"]) for row in self._connection().execute(sql, params)}
+
+    def complete_occurrence(self, id, date):
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO reminder_completions (reminder_id, date) VALUES (?, ?)", (id, date))
+
+    # Drug alternatives
+
+    def all_alternatives(self):
+        rows = self._connection().execute("SELECT drug, brands FROM drug_alternatives ORDER BY rowid")
+        return {row["drug"]: json.loads(row["brands"]) for row in rows}
+
+    def get_alternatives(self, drug):
+        row = self._connection().execute("SELECT brands FROM drug_alternatives WHERE drug = ?", (drug,)).fetchone()
+        return json.loads(row["brands"]) if row else []
+
+    def update_alternatives(self, alternatives):
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO drug_alternatives (drug, brands) VALUES (?, ?) "
+                # An unchanged row isn't rewritten, so it doesn't bump the version and stale every ETag
+                "ON CONFLICT(drug) DO UPDATE SET brands = excluded.brands WHERE brands IS NOT excluded.brands",
+                [(drug, json.dumps(list(brands))) for drug, brands in alternatives.items()],
+            )
+
+    # One-time import of the legacy data/*.json files
+
+    def import_json(self, data_folder, force=False):
+        """Copy legacy JSON files into the database once. Returns row counts imported."""
+        counts = {}
+        with self.transaction() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'json_imported'").fetchone()
+            if done and not force:
+                return counts
+            for collection in COLLECTIONS:
+                records = _read_json(os.path.join(data_folder, f"{collection}.json"), [])
+                for record in records:
+                    body = {k: v for k, v in record.items() if k != "id"}
+                    columns = {**_columns(collection, body), "body": json.dumps(body)}
+                    # Keep legacy ids so existing client references stay valid.
+                    if isinstance(record.get("id"), int):
+                        columns["id"] = record["id"]
+                    placeholders = ", ".join("?" for _ in columns)
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO {collection} ({', '.join(columns)}) VALUES ({placeholders})",
+                        list(columns.values()),
+                    )
+                counts[collection] = len(records)
+            alternatives = _read_json(os.path.join(data_folder, "drug_alternatives.json"), {})
+            self.update_alternatives(alternatives)
+            counts["drug_alternatives"] = len(alternatives)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', '1')")
+        return counts
+
+
+def _read_json(file_path, default):
+    if not os.path.exists(file_path):
+        return default
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import legacy data/*.json files into the SQLite store")
+    parser.add_argument("--data", default="data", help="folder containing the legacy JSON files")
+    parser.add_argument("--db", default=os.path.join("data", "smartrx.db"), help="SQLite database path")
+    parser.add_argument("--force", action="store_true", help="import again even if already imported")
+    args = parser.parse_args()
+
+    counts = Store(args.db).import_json(args.data, force=args.force)
+    if counts:
+        for name, count in counts.items():
+            print(f"Imported {count} {name}")
+    else:
+        print("Data already imported; use --force to import again")
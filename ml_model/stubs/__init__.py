@@ -0,0 +1 @@
+"""Local stand-ins for the external APIs the backend calls, for offline tests and benchmarks."""
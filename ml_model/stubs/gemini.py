@@ -0,0 +1,91 @@
+import re
+import json
+import time
+import threading
+
+# "1) Paracetamol 500 mg - 1 tablet twice daily", "Tab. Aspirin 75mg once daily"
+MEDICATION_LINE = re.compile(
+    r"^\s*(?:\d+[.)]\s*)?(?:(?:tab|cap|syp|inj)\.?\s+)?([A-Za-z][A-Za-z-]+(?: [A-Z][A-Za-z-]+)?)\s+"
+    r"(\d+(?:\.\d+)?\s*(?:mg|mcg|g|ml|iu))\b\s*[-,:]?\s*(.*)$",
+    re.IGNORECASE
+)
+DOCTOR_LINE = re.compile(r"^\s*(Dr\.?\s+[^,]+)(?:,\s*(.+))?$")
+PATIENT_LINE = re.compile(r"Patient:\s*(.+?)(?:\s+Age:\s*(\d+))?(?:\s+Gender:\s*(\w+))?\s*$")
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Offline stand-in for ``genai.GenerativeModel`` used by tests and benchmarks.
+
+    A prompt string is treated as a prescription: medications, doctor and
+    patient are pulled out with regexes and returned in the JSON shape the real
+    prompt asks for. A list of chat turns gets a canned reply of ``reply_words``
+    words, which ``stream=True`` yields a few words at a time.
+
+    ``latency`` seconds are slept before the first chunk and ``chunk_latency``
+    before each following one, to mimic a remote model.
+    """
+
+    def __init__(self, model_name="stub", latency=0.0, chunk_latency=0.0, reply_words=60):
+        self.model_name = model_name
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.reply_words = reply_words
+        self.calls = 0
+        self.last_contents = None
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.last_contents = contents
+        if isinstance(contents, str):
+            text = json.dumps(extract(contents.split("Prescription Text:", 1)[-1]))
+        else:
+            text = self._reply(contents)
+        chunks = self._chunks(text)
+        return chunks if stream else StubResponse("".join(chunk.text for chunk in chunks))
+
+    def _reply(self, contents):
+        question = contents[-1]["parts"][0]["text"] if contents else ""
+        words = f"(offline reply to: {question[:60]})".split()
+        filler = ["Please", "consult", "your", "doctor", "or", "pharmacist", "before", "changing", "any", "medication."]
+        words += [filler[i % len(filler)] for i in range(max(self.reply_words - len(words), 0))]
+        return " ".join(words)
+
+    def _chunks(self, text, words_per_chunk=4):
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + words_per_chunk]) + " " for i in range(0, len(words), words_per_chunk)]
+        chunks[-1] = chunks[-1].rstrip(" ")
+        for i, chunk in enumerate(chunks):
+            delay = self.latency if i == 0 else self.chunk_latency
+            if delay:
+                time.sleep(delay)
+            yield StubResponse(chunk)
+
+
+def extract(text):
+    result = {
+        "patient": {"name": None, "age": None, "gender": None},
+        "doctor": {"name": None, "hospital": None, "license_number": None},
+        "medications": [],
+        "special_instructions": []
+    }
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if match := MEDICATION_LINE.match(line):
+            name, dosage, frequency = match.groups()
+            result["medications"].append({"name": name.title(), "dosage": dosage, "frequency": frequency or None})
+        elif match := DOCTOR_LINE.match(line):
+            result["doctor"].update(name=match.group(1).strip(), hospital=match.group(2))
+        elif match := PATIENT_LINE.search(line):
+            result["patient"].update(name=match.group(1).strip(), age=match.group(2), gender=match.group(3))
+        else:
+            result["special_instructions"].append(line)
+    return result
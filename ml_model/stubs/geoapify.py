@@ -0,0 +1,94 @@
+import math
+import zlib
+import argparse
+
+from stubs.common import StubHandler, start_server, serve_until_interrupted
+
+# Synthetic pharmacies sit on a lattice of this many degrees, jittered per cell
+GRID_DEGREES = 0.02
+EARTH_RADIUS_M = 6371008.8
+
+
+def _distance(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _lattice(south, west, north, east, grid):
+    """``(seed, lat, lon)`` of every synthetic pharmacy whose lattice cell meets the box.
+
+    Pharmacies are derived from the lattice cell they fall in, so the same
+    place comes back with the same id and position whatever area is queried.
+    """
+    for row in range(math.floor(south / grid), math.ceil(north / grid) + 1):
+        for col in range(math.floor(west / grid), math.ceil(east / grid) + 1):
+            seed = zlib.crc32(f"{row}:{col}".encode())
+            place_lat = (row + (seed & 0xFFFF) / 0x10000) * grid
+            place_lon = (col + (seed >> 16) / 0x10000) * grid
+            if -90 <= place_lat <= 90:
+                yield seed, place_lat, place_lon
+
+
+def pharmacies_near(lat, lon, radius, grid=GRID_DEGREES):
+    """Every synthetic pharmacy within ``radius`` metres of a point, nearest first."""
+    lat_step = radius / 111320
+    lon_step = radius / (111320 * max(math.cos(math.radians(lat)), 0.01))
+    found = []
+    for seed, place_lat, place_lon in _lattice(lat - lat_step, lon - lon_step, lat + lat_step, lon + lon_step, grid):
+        distance = _distance(lat, lon, place_lat, place_lon)
+        if distance <= radius:
+            found.append((distance, seed, place_lat, place_lon))
+    return [{
+        "type": "Feature",
+        "properties": {
+            "place_id": f"stub-{seed:08x}",
+            "name": f"Pharmacy {seed % 1000:03d}",
+            "formatted": f"{seed % 200 + 1} Stub Street, {place_lat:.4f}, {place_lon:.4f}",
+            "lat": place_lat,
+            "lon": place_lon,
+            "distance": round(distance),
+        },
+        "geometry": {"type": "Point", "coordinates": [place_lon, place_lat]},
+    } for distance, seed, place_lat, place_lon in sorted(found)]
+
+
+class GeoapifyHandler(StubHandler):
+    """Answers /v2/places?filter=circle:lon,lat,radius&limit=... like the Geoapify Places API."""
+
+    grid = GRID_DEGREES
+
+    def route_get(self, path, query):
+        if path != "/v2/places":
+            return 404, {"error": "not found"}
+        try:
+            shape, _, args = query.get("filter", "").partition(":")
+            lon, lat, radius = (float(part) for part in args.split(","))
+            limit = int(query.get("limit", "20"))
+            if shape != "circle":
+                raise ValueError(shape)
+        except ValueError:
+            return 400, {"error": "Bad Request", "message": "expected filter=circle:lon,lat,radius"}
+        return 200, {"type": "FeatureCollection", "features": pharmacies_near(lat, lon, radius, self.grid)[:limit]}
+
+
+def start(host="127.0.0.1", port=0, latency=0.0, grid=GRID_DEGREES):
+    """Start the stub; point the backend at it with GEOAPIFY_BASE_URL=http://host:port.
+
+    ``grid`` is the lattice spacing in degrees; a smaller one packs pharmacies closer, like a city centre.
+    """
+    return start_server(GeoapifyHandler, host, port, latency, grid=grid)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Geoapify Places API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8802)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per request")
+    parser.add_argument("--grid", type=float, default=GRID_DEGREES, help="degrees between synthetic pharmacies")
+    args = parser.parse_args()
+
+    server = start(args.host, args.port, args.latency, args.grid)
+    print(f"Geoapify stub listening on http://{args.host}:{server.server_port}")
+    serve_until_interrupted(server)
@@ -0,0 +1,57 @@
+import os
+import json
+import zlib
+import argparse
+from urllib.parse import unquote
+
+from stubs.common import StubHandler, start_server, serve_until_interrupted
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "drug_alternatives.json")
+
+
+def load_fixture(path=DEFAULT_FIXTURE):
+    """Build {name: (rxcui, brands)} from a drug_alternatives.json style file."""
+    with open(path, "r") as f:
+        alternatives = json.load(f)
+    # Stable synthetic RxCUIs derived from the drug name
+    return {name.lower(): (str(zlib.crc32(name.lower().encode()) % 10**7), brands)
+            for name, brands in alternatives.items()}
+
+
+class RxNavHandler(StubHandler):
+    """Answers /REST/rxcui.json?name=... and /REST/rxcui/<id>/related.json?tty=BN like RxNav."""
+
+    drugs = {}
+
+    def route_get(self, path, query):
+        if path == "/REST/rxcui.json":
+            entry = self.drugs.get(query.get("name", "").strip().lower())
+            id_group = {"name": query.get("name", "")}
+            if entry:
+                id_group["rxnormId"] = [entry[0]]
+            return 200, {"idGroup": id_group}
+        if path.startswith("/REST/rxcui/") and path.endswith("/related.json"):
+            rxcui = unquote(path.split("/")[3])
+            brands = next((b for cui, b in self.drugs.values() if cui == rxcui), [])
+            concepts = [{"rxcui": f"{rxcui}{i}", "name": name, "tty": "BN"} for i, name in enumerate(brands)]
+            group = {"tty": "BN", "conceptProperties": concepts} if concepts else {"tty": "BN"}
+            return 200, {"relatedGroup": {"rxcui": rxcui, "conceptGroup": [group]}}
+        return 404, {"error": "not found"}
+
+
+def start(host="127.0.0.1", port=0, latency=0.0, fixture=DEFAULT_FIXTURE):
+    """Start the stub; point the backend at it with RXNAV_BASE_URL=http://host:port/REST."""
+    return start_server(RxNavHandler, host, port, latency, drugs=load_fixture(fixture))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the RxNav REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per request")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+
+    server = start(args.host, args.port, args.latency, args.fixture)
+    print(f"RxNav stub listening on http://{args.host}:{server.server_port}/REST")
+    serve_until_interrupted(server)
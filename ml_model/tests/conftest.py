@@ -0,0 +1,67 @@
+import os
+import sys
+import pickle
+
+import cv2
+import numpy as np
+import pytest
+
+ML_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_MODEL_DIR)
+
+# What the stubbed tesseract "reads" from every upload; the stub Gemini model parses it
+PRESCRIPTION_TEXT = "\n".join([
+    "Dr. Meera Rao, City Hospital",
+    "Patient: Asha Kumar  Age: 34  Gender: F",
+    "1) Aceta 500 mg - twice daily",
+    "2) Amodiss 400 mg - once daily",
+    "3) Paracetamol 650 mg - when needed",
+])
+MAX_UPLOAD_BYTES = 200_000
+MAX_REQUEST_BYTES = 1_000_000
+
+
+@pytest.fixture(scope="session")
+def App(tmp_path_factory):
+    """App.py wired to the RxNav, Geoapify and Gemini stubs, with a stand-in model and OCR."""
+    from stubs import rxnav as rxnav_stub, geoapify as geoapify_stub
+    from benchmarks.generic_names import stand_in_model
+
+    rxnav = rxnav_stub.start()
+    geoapify = geoapify_stub.start()
+    workdir = tmp_path_factory.mktemp("app")
+    with open(os.path.join(ML_MODEL_DIR, "label_encoders.pkl"), "rb") as f:
+        model = stand_in_model(pickle.load(f), os.path.join(ML_MODEL_DIR, "medicine_mapping.json"))
+    with open(workdir / "medicine_model.pkl", "wb") as f:
+        pickle.dump(model, f)
+
+    os.environ.update(
+        GEMINI_BACKEND="stub",
+        RXNAV_BASE_URL=f"http://127.0.0.1:{rxnav.server_port}/REST",
+        GEOAPIFY_BASE_URL=f"http://127.0.0.1:{geoapify.server_port}", GEOAPIFY_API_KEY="stub",
+        MEDICINE_MODEL_PATH=str(workdir / "medicine_model.pkl"),
+        MAX_UPLOAD_BYTES=str(MAX_UPLOAD_BYTES), MAX_REQUEST_BYTES=str(MAX_REQUEST_BYTES),
+    )
+    os.chdir(workdir)
+    import pytesseract
+    pytesseract.image_to_string = lambda image, config=None, **kwargs: PRESCRIPTION_TEXT
+    import App
+
+    yield App
+    rxnav.shutdown()
+    geoapify.shutdown()
+
+
+@pytest.fixture
+def client(App):
+    return App.app.test_client()
+
+
+@pytest.fixture
+def scan():
+    """A PNG prescription scan; ``scan(seed)`` gives distinct bytes, so uploads don't share a cache entry."""
+    def make(seed=0):
+        image = np.full((240, 480), 255, np.uint8)
+        cv2.putText(image, f"Rx {seed}", (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 0, 3)
+        return cv2.imencode(".png", image)[1].tobytes()
+    return make
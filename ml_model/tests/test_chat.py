@@ -0,0 +1,19 @@
+import os
+
+from cache import DiskCache
+from chat import ChatSessions
+
+
+def test_session_continues_in_another_process(App, client):
+    first = client.post("/chat-gemini", json={"chat": "What is Aceta?"})
+    assert first.status_code == 200
+    session_id = first.json["session_id"]
+
+    # Another worker process opens the same file
+    other = ChatSessions(DiskCache(os.path.join(App.CACHE_FOLDER, "chat.db")))
+    assert other.get(session_id) == first.json["history"]
+
+    second = client.post("/chat-gemini", json={"chat": "And its dose?", "session_id": session_id})
+    assert second.json["session_id"] == session_id
+    assert [turn["role"] for turn in second.json["history"]] == ["user", "model", "user", "model"]
+    assert other.get(session_id) == second.json["history"]
@@ -0,0 +1,30 @@
+import threading
+
+from cache import DiskCache
+from jobs import JobQueue, DONE
+
+
+def test_other_process_sees_job_through_shared_cache(tmp_path):
+    shared = DiskCache(str(tmp_path / "jobs.db"))
+    owner = JobQueue(workers=1, shared=shared)
+    # Stands in for another worker process: no local jobs, same file
+    other = JobQueue(workers=1, shared=DiskCache(str(tmp_path / "jobs.db")))
+    release = threading.Event()
+
+    def work(job):
+        for page in range(3):
+            job.add_stage(f"page_{page + 1}", {"text": f"page {page + 1}"})
+        release.wait(10)
+        return {"pages": 3}
+
+    job = owner.submit(work)
+    seen = other.get(job.id)
+    events, finished = seen.events_since(0, timeout=10)
+    assert events and not finished
+
+    release.set()
+    assert seen.wait(10)
+    assert seen.to_dict() == job.to_dict()
+    events, finished = seen.events_since(0)
+    assert finished
+    assert [event["event"] for event in events] == ["status", "stage", "stage", "stage", DONE]
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from cache import DiskCache
+from pharmacies import PharmacyFinder
+from stubs import geoapify
+
+
+def test_nearest_pharmacies_across_cells(client):
+    # Close to a geohash cell edge, so the nearest places sit in more than one cell
+    lat, lon = 12.9638, 77.6074
+    response = client.get("/api/pharmacies", query_string={"lat": lat, "lon": lon})
+
+    assert response.status_code == 200
+    expected = [feature["properties"]["place_id"] for feature in geoapify.pharmacies_near(lat, lon, 50000)[:10]]
+    assert [place["id"] for place in response.json] == expected
+    distances = [place["distance"] for place in response.json]
+    assert distances == sorted(distances)
+
+
+def test_rejects_bad_coordinates(client):
+    assert client.get("/api/pharmacies", query_string={"lat": 91, "lon": 0}).status_code == 400
+    assert client.get("/api/pharmacies", query_string={"lat": "north"}).status_code == 400
+
+
+@pytest.fixture
+def city(tmp_path):
+    """A finder against a Geoapify stub packed like a city centre, a pharmacy every ~500 m."""
+    server = geoapify.start(grid=0.005)
+    finder = PharmacyFinder(DiskCache(str(tmp_path / "pharmacies.db")), "stub",
+                            base_url=f"http://127.0.0.1:{server.server_port}", radius=10000)
+    yield finder
+    server.shutdown()
+
+
+def test_dense_area_bounds_upstream_calls(city):
+    rng = random.Random(0)
+    points = [(12.95 + rng.random() * 0.05, 77.55 + rng.random() * 0.05) for _ in range(20)]
+
+    for lat, lon in points:
+        before = city.upstream_calls
+        places = city.nearby(lat, lon)
+        assert city.upstream_calls - before <= city.max_fetches
+        expected = geoapify.pharmacies_near(lat, lon, city.radius, grid=0.005)[:10]
+        assert [place["id"] for place in places] == [feature["properties"]["place_id"] for feature in expected]
+    # Neighbours share cells, so cold requests cost less than a call each
+    cold = city.upstream_calls
+    assert cold < len(points)
+
+    for lat, lon in points:
+        city.nearby(lat, lon)
+    assert city.upstream_calls == cold
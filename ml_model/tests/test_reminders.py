@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture
+def reminders(App):
+    """A daily series and a one-off in January 2031, far from anything an upload schedules."""
+    with App.store.transaction():
+        daily = App.store.insert("reminders", {
+            "medication": "Aceta", "title": "Take Aceta", "date": "2031-01-01", "time": "8:00",
+            "recurring": "daily", "completed": False,
+        })
+        once = App.store.insert("reminders", {
+            "medication": "Aceta", "title": "Refill Aceta", "date": "2031-01-03", "time": "09:00",
+            "recurring": "none", "completed": False,
+        })
+    yield daily["id"], once["id"]
+    with App.store.transaction():
+        App.store.delete("reminders", daily["id"])
+        App.store.delete("reminders", once["id"])
+
+
+def occurrences(client, **params):
+    response = client.get("/reminders", query_string=params)
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def test_range_expands_series_in_time_order(client, reminders):
+    daily, once = reminders
+    page = occurrences(client, start="2031-01-01", end="2031-01-03")
+
+    assert [(item["id"], item["due"]) for item in page["reminders"]] == [
+        (daily, "2031-01-01T08:00"),
+        (daily, "2031-01-02T08:00"),
+        (daily, "2031-01-03T08:00"),
+        (once, "2031-01-03T09:00"),
+    ]
+    assert page["next_cursor"] is None
+
+
+def test_range_pages_with_cursor(client, reminders):
+    seen = []
+    cursor = None
+    while True:
+        params = {"start": "2031-01-01", "end": "2031-01-10", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        page = occurrences(client, **params)
+        seen += [item["due"] for item in page["reminders"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 11  # ten daily occurrences and the one-off
+    assert seen == sorted(seen)
+
+
+def test_complete_one_occurrence_of_a_series(client, reminders):
+    daily, _ = reminders
+    response = client.post(f"/reminders/{daily}/complete", json={"date": "2031-01-02"})
+    assert response.status_code == 200
+
+    page = occurrences(client, start="2031-01-01", end="2031-01-03")
+    done = {item["date"]: item["completed"] for item in page["reminders"] if item["id"] == daily}
+    assert done == {"2031-01-01": False, "2031-01-02": True, "2031-01-03": False}
+
+    pending = occurrences(client, start="2031-01-01", end="2031-01-03", completed="false")
+    assert "2031-01-02T08:00" not in [item["due"] for item in pending["reminders"]]
+
+
+def test_complete_one_off(client, reminders):
+    _, once = reminders
+    assert client.post(f"/reminders/{once}/complete").status_code == 200
+
+    page = occurrences(client, start="2031-01-03", end="2031-01-03")
+    assert [item["completed"] for item in page["reminders"] if item["id"] == once] == [True]
+
+
+def test_complete_rejects_unknown_reminder_and_bad_date(client, reminders):
+    daily, _ = reminders
+    assert client.post("/reminders/999999/complete").status_code == 404
+    assert client.post(f"/reminders/{daily}/complete", json={"date": "02/01/2031"}).status_code == 400
+
+
+def test_range_rejects_bad_dates(client):
+    response = client.get("/reminders", query_string={"start": "tomorrow"})
+    assert response.status_code == 400
+
+
+def test_range_converts_offsets_to_server_time(client, reminders):
+    # 08:00 on 2 January, server time, written with a +05:30 offset
+    due = datetime(2031, 1, 2, 8, 0).astimezone()
+    aware = due.astimezone(timezone(timedelta(hours=5, minutes=30))).isoformat()
+
+    page = occurrences(client, start=aware, end="2031-01-02")
+    assert [item["due"] for item in page["reminders"]] == ["2031-01-02T08:00"]
@@ -0,0 +1,61 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/reminders", "/medications", "/prescriptions"])
+def test_unchanged_collection_answers_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.get_data() == b""
+
+
+def test_write_changes_etag(App, client):
+    etag = client.get("/reminders").headers["ETag"]
+    with App.store.transaction():
+        record = App.store.insert("reminders", {"medication": "Aceta", "title": "Take Aceta", "date": "2031-02-01",
+                                                "time": "08:00", "recurring": "none", "completed": False})
+
+    response = client.get("/reminders", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert record["id"] in [item["id"] for item in response.json]
+
+    client.delete(f"/reminders/{record['id']}")
+    assert client.get("/reminders", headers={"If-None-Match": response.headers["ETag"]}).status_code == 200
+
+
+def test_other_collections_keep_their_etag(App, client):
+    etag = client.get("/medications").headers["ETag"]
+    with App.store.transaction():
+        record = App.store.insert("reminders", {"medication": "Aceta", "title": "Take Aceta", "date": "2031-02-02",
+                                                "time": "08:00", "recurring": "none", "completed": False})
+        App.store.delete("reminders", record["id"])
+
+    assert client.get("/medications", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_large_body_is_compressed(App, client):
+    with App.store.transaction():
+        for i in range(40):
+            App.store.add_medication({"name": f"Drug{i}", "description": "Generic " * 10,
+                                      "caution": "Take as directed", "sideEffects": "Consult doctor"})
+
+    response = client.get("/medications", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_unchanged_alternatives_keep_version(App):
+    App.store.update_alternatives({"Zzzoprofen": ["Zzzofen"]})
+    version = App.store.version("drug_alternatives")
+
+    App.store.update_alternatives({"Zzzoprofen": ["Zzzofen"]})
+    assert App.store.version("drug_alternatives") == version
+
+    App.store.update_alternatives({"Zzzoprofen": ["Zzzofen", "Zzzorin"]})
+    assert App.store.version("drug_alternatives")[0] == version[0] + 1
@@ -0,0 +1,99 @@
+import io
+import os
+import json
+import time
+
+from conftest import PRESCRIPTION_TEXT, MAX_UPLOAD_BYTES, MAX_REQUEST_BYTES
+from uploads import UploadArchive
+
+
+def upload(client, data, filename="prescription.png", **params):
+    return client.post("/upload", query_string=params, data={"file": (io.BytesIO(data), filename)})
+
+
+def test_upload_is_analysed(client, scan):
+    response = upload(client, scan(1), wait="true")
+
+    assert response.status_code == 200
+    result = response.json
+    assert result["extracted_text"] == PRESCRIPTION_TEXT
+    assert "Dr. Meera Rao" in result["structured_text"]
+    predictions = result["generic_predictions"]
+    assert list(predictions) == ["Aceta", "Amodiss", "Paracetamol"]
+    assert predictions["Aceta"] == {"generic": "Paracetamol", "matched": "Aceta", "distance": 0}
+    # One edit from a known name: answered, but marked as a fuzzy match
+    assert predictions["Amodiss"] == {"generic": "Metronidazole", "matched": "Amodis", "distance": 1}
+    assert predictions["Paracetamol"]["generic"] == "Unknown Medicine"
+    assert result["alternatives"]["Paracetamol"]
+
+    descriptions = {med["name"]: med["description"] for med in client.get("/medications").json}
+    assert descriptions["Aceta"] == "Paracetamol"
+    assert "please verify" in descriptions["Amodiss"]
+
+
+def test_upload_job_reports_stages(client, scan):
+    response = upload(client, scan(2))
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+
+    deadline = time.monotonic() + 30
+    while (job := client.get(f"/jobs/{job_id}").json)["status"] not in ("done", "failed"):
+        assert time.monotonic() < deadline, job
+        time.sleep(0.05)
+    assert job["status"] == "done", job
+
+    # The stream replays every stage of a finished job, then ends
+    stream = client.get(f"/jobs/{job_id}/events")
+    assert stream.mimetype == "text/event-stream"
+    events = [block.split("\n", 1) for block in stream.get_data(as_text=True).split("\n\n") if block]
+    stages = [json.loads(data.removeprefix("data: "))["stage"] for event, data in events if event == "event: stage"]
+    assert stages == ["ocr", "analysis", "alternatives"]
+
+
+def test_repeated_upload_uses_analysis_cache(App, client, scan):
+    data = scan(3)
+    first = upload(client, data, wait="true").json
+    hits = App.analysis_cache.hits
+    second = upload(client, data, wait="true").json
+
+    assert App.analysis_cache.hits == hits + 1
+    assert second["content_hash"] == first["content_hash"]
+    assert second["generic_predictions"] == first["generic_predictions"]
+
+
+def test_rejects_file_that_is_not_an_image(client):
+    response = upload(client, b"MZ\x90\x00" * 1000, "evil.png")
+    assert response.status_code == 415
+
+
+def test_rejects_file_too_short_to_identify(client):
+    response = upload(client, b"\x89PNG", "tiny.png")
+    assert response.status_code == 415
+
+
+def test_rejects_file_over_upload_limit(client, scan):
+    response = upload(client, scan() + b"\0" * MAX_UPLOAD_BYTES, "big.png")
+    assert response.status_code == 413
+
+
+def test_rejects_request_over_body_limit(client):
+    response = upload(client, b"\0" * (MAX_REQUEST_BYTES + 1), "huge.png")
+    assert response.status_code == 413
+
+
+def test_rejects_unknown_extension(client, scan):
+    response = upload(client, scan(), "prescription.exe")
+    assert response.status_code == 400
+
+
+def test_archive_limits_cover_every_worker(tmp_path):
+    folder = str(tmp_path / "uploads")
+    # Two worker processes archiving to the same folder
+    archives = [UploadArchive(folder, max_files=3), UploadArchive(folder, max_files=3)]
+    for i in range(6):
+        archive = archives[i % 2]
+        archive.submit(f"{i:016x}", "scan.png", b"scan %d" % i)
+        archive.flush()
+
+    assert sorted(os.listdir(folder)) == [f"{i:016x}_scan.png" for i in (3, 4, 5)]
+    assert archives[1].stats()["files"] == 3
@@ -0,0 +1,164 @@
+import io
+import os
+import queue
+import logging
+import threading
+
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of every accepted upload format
+MAGIC_BYTES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+    b"%PDF-": "pdf",
+    b"II*\x00": "tif",
+    b"MM\x00*": "tif",
+}
+MAGIC_LENGTH = max(len(magic) for magic in MAGIC_BYTES)
+
+
+def sniff_format(data):
+    """Format of an upload from its first bytes: "png", "jpg", "pdf", "tif" or None."""
+    head = bytes(data[:MAGIC_LENGTH])
+    for magic, kind in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+class UploadBuffer(io.BytesIO):
+    """In-memory buffer for one uploaded file, filled while the form is parsed.
+
+    The first bytes are checked as soon as they arrive, so a file that isn't an
+    accepted format, or grows past ``max_bytes``, stops the parse (415 / 413)
+    before the rest of the body is read.
+    """
+
+    def __init__(self, max_bytes):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self._checked = False
+
+    def write(self, data):
+        size = self.tell() + len(data)
+        if size > self.max_bytes:
+            raise RequestEntityTooLarge(f"Files are limited to {self.max_bytes} bytes")
+        written = super().write(data)
+        if not self._checked and size >= MAGIC_LENGTH:
+            self._checked = True
+            if sniff_format(self.getbuffer()) is None:
+                raise UnsupportedMediaType("Only PNG, JPEG, TIFF and PDF files are accepted")
+        return written
+
+
+def read_upload(file):
+    """Bytes of an uploaded ``FileStorage``, without copying an UploadBuffer."""
+    if isinstance(file.stream, UploadBuffer):
+        return file.stream.getvalue()
+    return file.read()
+
+
+class UploadArchive:
+    """Keeps copies of uploads on disk, written by a background thread.
+
+    Files are named by content hash, so re-uploads don't pile up and two
+    users' "prescription.png" never overwrite each other. Once the folder
+    holds more than ``max_files`` files or ``max_bytes`` bytes, the oldest are
+    deleted. The folder is rescanned for that after every write, so the limits
+    hold for all the worker processes writing to it together. Archiving is
+    best effort: when ``max_pending`` writes are already waiting, further
+    uploads are skipped rather than slowing requests down.
+    """
+
+    def __init__(self, folder, max_files=1000, max_bytes=1024 * 1024 * 1024, max_pending=64):
+        self.folder = folder
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        os.makedirs(folder, exist_ok=True)
+        entries = self._scan()
+        self._count = len(entries)
+        self._bytes = sum(size for _, _, size in entries)
+
+    def _ensure_thread(self):
+        # Started on first use, and again after a fork, like the job workers
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, daemon=True, name="upload-archive")
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, content_hash, filename, data):
+        """Queue ``data`` for archiving; returns False if the queue is full."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((f"{content_hash[:16]}_{filename}", data))
+            return True
+        except queue.Full:
+            logger.warning(f"Upload archive queue is full, not archiving {filename}")
+            return False
+
+    def _work(self):
+        while True:
+            name, data = self._queue.get()
+            try:
+                self._write(name, data)
+            except Exception as e:
+                logger.error(f"Error archiving {name}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name, data):
+        path = os.path.join(self.folder, name)
+        try:
+            # Same content uploaded again: just mark it as recent
+            os.utime(path)
+            return
+        except FileNotFoundError:
+            pass
+        # Per process, in case another worker is archiving the same upload
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._prune()
+
+    def _scan(self):
+        """``(mtime, name, size)`` of every archived file, oldest first."""
+        entries = []
+        for entry in os.scandir(self.folder):
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+        return sorted(entries)
+
+    def _prune(self):
+        entries = self._scan()
+        count = len(entries)
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if count <= self.max_files and total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+            count -= 1
+            total -= size
+        self._count, self._bytes = count, total
+
+    def flush(self):
+        """Block until every queued upload has been written."""
+        self._queue.join()
+
+    def stats(self):
+        return {"files": self._count, "bytes": self._bytes, "pending": self._queue.qsize()}
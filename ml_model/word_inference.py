@@ -0,0 +1,199 @@
+import os
+import time
+import queue
+import pickle
+import hashlib
+import argparse
+import threading
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+import pandas as pd
+from flask import Flask, request, jsonify
+
+# Same settings as pre_work.py
+IMG_SIZE = (128, 128)
+CONFIDENCE_THRESHOLD = 0.6
+UNKNOWN_DIR = "unknown_images"
+
+
+def decode_word_image(data):
+    """Decode an encoded image (PNG/JPEG bytes) into a normalized 128x128x1 float32 array, or None."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    image = cv2.resize(image, IMG_SIZE).astype(np.float32) / 255.0
+    return image.reshape(IMG_SIZE[1], IMG_SIZE[0], 1)
+
+
+class DynamicBatcher:
+    """Collect single inputs from many threads and run them through ``predict_batch`` together.
+
+    A batch is dispatched as soon as ``max_batch_size`` inputs are waiting, or
+    ``max_wait_ms`` after its first input arrived, whichever comes first.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=5.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Running totals; only the dispatch thread writes them
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="word-batcher")
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        items, futures = zip(*batch)
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            outputs = self.predict_batch(np.stack(items))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, output in zip(futures, outputs):
+            future.set_result(output)
+
+    def stats(self):
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+                "max_batch_size": self.largest_batch}
+
+
+class WordClassifier:
+    """Handwritten medicine-word classifier served through a DynamicBatcher.
+
+    Returns the same fields as pre_work.predict_generic_name, as a dict.
+    """
+
+    def __init__(self, model, label_encoder, medicine_to_generic, max_batch_size=32, max_wait_ms=5.0,
+                 unknown_dir=UNKNOWN_DIR):
+        self.model = model
+        self.label_encoder = label_encoder
+        self.medicine_to_generic = medicine_to_generic
+        self.unknown_dir = unknown_dir
+        os.makedirs(unknown_dir, exist_ok=True)
+        self.batcher = DynamicBatcher(self._predict_batch, max_batch_size, max_wait_ms)
+
+    def _predict_batch(self, batch):
+        # predict_on_batch skips the per-call setup model.predict does
+        return np.asarray(self.model.predict_on_batch(batch))
+
+    def predict(self, data, name="word.png"):
+        return self.predict_many([(data, name)])[0]
+
+    def predict_many(self, crops):
+        """Classify ``(bytes, filename)`` pairs; all crops are queued before waiting on any."""
+        pending = []
+        for data, name in crops:
+            image = decode_word_image(data)
+            pending.append((data, name, None if image is None else self.batcher.submit(image)))
+        return [self._result(data, name, future) for data, name, future in pending]
+
+    def _result(self, data, name, future):
+        if future is None:
+            return {"error": "Invalid image file or path."}
+
+        prediction = future.result()
+        predicted_label = int(np.argmax(prediction))
+        confidence = float(np.max(prediction))
+
+        if confidence < CONFIDENCE_THRESHOLD:
+            # Keep low-confidence crops for relabelling, named by content so repeats don't pile up
+            stem, ext = os.path.splitext(os.path.basename(name))
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            with open(os.path.join(self.unknown_dir, f"{stem}_{digest}{ext or '.png'}"), "wb") as f:
+                f.write(data)
+            return {
+                "Predicted Medicine": "Unknown Medicine",
+                "Generic Name": "Unknown",
+                "Confidence": round(confidence, 2)
+            }
+
+        predicted_medicine = self.label_encoder.inverse_transform([predicted_label])[0]
+        generic_name = self.medicine_to_generic.get(predicted_medicine, "Unknown Generic Name")
+        return {
+            "Predicted Medicine": str(predicted_medicine),
+            "Generic Name": str(generic_name),
+            "Confidence": round(confidence, 2)
+        }
+
+
+def load_model(model_path):
+    """Load ``(model, label_encoder)`` from a ``.keras`` file written by pre_Ml.py, or a legacy pickle."""
+    if model_path.endswith(".keras"):
+        import tensorflow as tf
+        from pre_Ml import labels_path_for
+        with open(labels_path_for(model_path), "rb") as f:
+            label_encoder = pickle.load(f)
+        return tf.keras.models.load_model(model_path), label_encoder
+    with open(model_path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_classifier(model_path, csv_path, **batcher_options):
+    model, label_encoder = load_model(model_path)
+    df = pd.read_csv(csv_path)
+    medicine_to_generic = dict(zip(df["MEDICINE_NAME"], df["GENERIC_NAME"]))
+    return WordClassifier(model, label_encoder, medicine_to_generic, **batcher_options)
+
+
+def create_app(classifier):
+    app = Flask(__name__)
+
+    @app.route('/predict-word', methods=['POST'])
+    def predict_word():
+        files = request.files.getlist('files') or request.files.getlist('file')
+        if not files:
+            return jsonify({"error": "No file part"}), 400
+        # Every crop is queued before waiting, so one request's words share a batch
+        results = classifier.predict_many([(file.read(), file.filename or "word.png") for file in files])
+        return jsonify(results[0] if len(results) == 1 else results)
+
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        return jsonify(classifier.batcher.stats())
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dynamic-batching inference service for the handwritten-word CNN")
+    parser.add_argument("--model", default="medicine_model.keras", help="medicine_model.keras or a legacy .pkl")
+    parser.add_argument("--labels", default="training_labels.csv")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+
+    classifier = load_classifier(args.model, args.labels, max_batch_size=args.max_batch_size,
+                                 max_wait_ms=args.max_wait_ms)
+    create_app(classifier).run(host="0.0.0.0", port=args.port, threaded=True)